@@ -0,0 +1,187 @@
+"""
+Benchmarks for the hot paths on seeded synthetic leagues.
+
+Cases: preprocess_pipeline, train_elo_model, evaluate_model, inference.predict_fn
+and predict_weekly.handler (endpoint mode against in-memory S3/SageMaker stubs
+that score with inference.py). Results are written as JSON; `--compare` checks
+them against a baseline file and exits non-zero when a case got slower by more
+than `--threshold`.
+
+  python benchmarks/bench.py --size small --output benchmarks/results/baseline.json
+  python benchmarks/bench.py --size small --compare benchmarks/results/baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "pipeline" / "steps"))
+sys.path.insert(0, str(REPO_ROOT / "infra" / "cdk" / "lambda"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-2")
+
+import pandas as pd  # noqa: E402
+
+import inference  # noqa: E402
+from benchmarks.fakes import FakeS3  # noqa: E402
+from evaluate import evaluate_model  # noqa: E402
+from pipeline.synthetic import generate_fixtures, generate_league  # noqa: E402
+from preprocess import preprocess_pipeline  # noqa: E402
+from train import train_elo_model  # noqa: E402
+
+# (matches, teams, fixtures scored by inference/handler)
+SIZES: Dict[str, Tuple[int, int, int]] = {
+    "tiny": (500, 8, 50),
+    "small": (10_000, 20, 1_000),
+    "medium": (100_000, 200, 10_000),
+    "large": (1_000_000, 1_000, 100_000),
+}
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+class _Endpoint:
+    """invoke_endpoint stand-in that scores JSON batches with inference.py in-process."""
+
+    def __init__(self, model: Any) -> None:
+        self.model = model
+
+    def invoke_endpoint(self, EndpointName: str, ContentType: str, Accept: str, Body: str) -> Dict[str, Any]:
+        preds = inference.predict_fn(inference.input_fn(Body, ContentType), self.model)
+        body, _ = inference.output_fn(preds, Accept)
+        return {"Body": io.BytesIO(body.encode("utf-8")), "ResponseMetadata": {"RetryAttempts": 0}}
+
+class _SageMaker:
+    def describe_endpoint(self, EndpointName: str) -> Dict[str, Any]:
+        return {"EndpointName": EndpointName, "EndpointStatus": "InService", "EndpointConfigName": "bench"}
+
+@contextmanager
+def _handler_case(model: Any, fixtures: pd.DataFrame) -> Iterator[Callable[[], Any]]:
+    """The handler against in-memory stubs; its module globals and env are restored afterwards."""
+    import metrics
+    import predict_weekly
+
+    s3 = FakeS3()
+    s3.put_object(Bucket="raw", Key="fixtures/bench.csv", Body=fixtures.to_csv(index=False).encode("utf-8"))
+    saved = (predict_weekly.s3, predict_weekly.rt, predict_weekly.sm, metrics.DEFAULT_SINK, os.environ.get("PRED_BUCKET"))
+    predict_weekly.s3, predict_weekly.rt, predict_weekly.sm = s3, _Endpoint(model), _SageMaker()
+    metrics.DEFAULT_SINK = metrics.MemorySink()
+    os.environ.setdefault("PRED_BUCKET", "preds")
+    event = {"endpoint_name": "bench", "fixtures_s3_uri": "s3://raw/fixtures/bench.csv", "gameweek": "GW01", "lifecycle": "persistent", "force": True}
+    try:
+        yield lambda: predict_weekly.handler(event, None)
+    finally:
+        predict_weekly.s3, predict_weekly.rt, predict_weekly.sm, metrics.DEFAULT_SINK, bucket = saved
+        if bucket is None:
+            os.environ.pop("PRED_BUCKET", None)
+
+def run_suite(matches: int, teams: int, n_fixtures: int, repeat: int = 3, seed: int = 0, only: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    raw = generate_league(matches, teams, seed)
+    fixtures = generate_fixtures(raw, n_fixtures, seed)
+    train_df, val_df, test_df = preprocess_pipeline(raw.copy())
+    model, _ = train_elo_model(train_df, val_df)
+    requests = [{"home_team": h, "away_team": a} for h, a in zip(fixtures["home"], fixtures["away"])]
+
+    # Each case is set up only when selected, so a skipped case installs no stubs.
+    cases: Dict[str, Tuple[Callable[[], ContextManager[Callable[[], Any]]], int]] = {
+        "preprocess_pipeline": (lambda: nullcontext(lambda: preprocess_pipeline(raw.copy())), len(raw)),
+        # The grid search replays the training split once per (K, home_adv, regression).
+        "train_elo_model": (lambda: nullcontext(lambda: train_elo_model(train_df, val_df)), len(train_df)),
+        "evaluate_model": (lambda: nullcontext(lambda: evaluate_model(_copy(model), test_df)), len(test_df)),
+        "inference.predict_fn": (lambda: nullcontext(lambda: inference.predict_fn(requests, model)), len(requests)),
+        "predict_weekly.handler": (lambda: _handler_case(model, fixtures), len(fixtures)),
+    }
+    results = {}
+    for name, (case, rows) in cases.items():
+        if only and name not in only:
+            continue
+        with case() as fn:
+            times = _time(fn, 1 if name == "train_elo_model" else repeat)
+        results[name] = {
+            "rows": rows,
+            "runs": len(times),
+            "min_s": round(min(times), 6),
+            "median_s": round(statistics.median(times), 6),
+            "rows_per_s": round(rows / statistics.median(times), 1),
+        }
+    return results
+
+def _copy(model: Any) -> Any:
+    import copy
+
+    return copy.deepcopy(model)
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """Per-case median ratios against the baseline; `regression` is set above 1 + threshold."""
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] > 0 else float("inf")
+        rows.append({"case": name, "baseline_s": base["median_s"], "current_s": cur["median_s"], "ratio": round(ratio, 3), "regression": ratio > 1.0 + threshold})
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--size", choices=sorted(SIZES), default="small")
+    ap.add_argument("--matches", type=int, default=None, help="Override the size preset")
+    ap.add_argument("--teams", type=int, default=None)
+    ap.add_argument("--fixtures", type=int, default=None)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--case", action="append", default=None, help="Run only this case (repeatable)")
+    ap.add_argument("--output", type=Path, default=REPO_ROOT / "benchmarks" / "results" / "latest.json")
+    ap.add_argument("--compare", type=Path, default=None, help="Baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before a case is flagged (0.2 = 20%%)")
+    args = ap.parse_args(argv)
+
+    matches, teams, n_fixtures = SIZES[args.size]
+    matches, teams, n_fixtures = args.matches or matches, args.teams or teams, args.fixtures or n_fixtures
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "matches": matches,
+            "teams": teams,
+            "fixtures": n_fixtures,
+            "seed": args.seed,
+        },
+        "results": run_suite(matches, teams, n_fixtures, args.repeat, args.seed, args.case),
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"{'case':<26}{'rows':>10}{'median_s':>12}{'rows/s':>14}")
+    for name, r in report["results"].items():
+        print(f"{name:<26}{r['rows']:>10}{r['median_s']:>12.4f}{r['rows_per_s']:>14.0f}")
+    print(f"Results: {args.output}")
+
+    if args.compare is None:
+        return 0
+    baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+    if baseline["meta"].get("matches") != matches or baseline["meta"].get("teams") != teams:
+        print("warning: baseline was recorded at a different size; ratios are not comparable")
+    rows = compare(report, baseline, args.threshold)
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else "ok"
+        print(f"{r['case']:<26}{r['baseline_s']:>12.4f}{r['current_s']:>12.4f}{r['ratio']:>8.2f}x  {flag}")
+    return 1 if any(r["regression"] for r in rows) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
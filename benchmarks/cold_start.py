@@ -0,0 +1,291 @@
+"""
+Cold-start harness for the Lambda handlers.
+
+Every function is copied from exactly its bundle (infra/cdk/stacks/lambda_bundles.py)
+into a scratch directory and run in a fresh interpreter, like a new execution
+environment: the handler import (init), a first invocation (which imports boto3
+and builds the pooled clients) and a warm invocation are timed. AWS calls are
+answered in memory by a botocore before-send hook, so requests are still
+serialised and responses parsed, but nothing touches the network. A module missing
+from a bundle fails here as it would in Lambda.
+
+Medians over --runs fresh processes are written as JSON; `--compare` checks them
+against a baseline and exits non-zero when a phase got slower by more than
+`--threshold`, as in bench.py.
+
+  python benchmarks/cold_start.py --output benchmarks/results/cold_start_baseline.json
+  python benchmarks/cold_start.py --compare benchmarks/results/cold_start_baseline.json
+"""
+import argparse
+import importlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PHASES = ["init", "first_invoke", "warm_invoke"]
+
+PACKAGE_ARN = "arn:aws:sagemaker:eu-west-2:123456789012:model-package/wsl-elo/1"
+ENDPOINT = "wsl-elo-endpoint"
+N_FIXTURES = 200
+
+_SAGEMAKER: Dict[str, Dict[str, Any]] = {
+    "DescribeEndpoint": {
+        "EndpointName": ENDPOINT,
+        "EndpointArn": f"arn:aws:sagemaker:eu-west-2:123456789012:endpoint/{ENDPOINT}",
+        "EndpointConfigName": f"{ENDPOINT}-cfg",
+        "EndpointStatus": "InService",
+        "CreationTime": 0,
+        "LastModifiedTime": 0,
+    },
+    "DescribeEndpointConfig": {
+        "EndpointConfigName": f"{ENDPOINT}-cfg",
+        "EndpointConfigArn": f"arn:aws:sagemaker:eu-west-2:123456789012:endpoint-config/{ENDPOINT}-cfg",
+        "ProductionVariants": [{"VariantName": "AllTraffic", "ModelName": f"{ENDPOINT}-model"}],
+        "CreationTime": 0,
+    },
+    "DescribeModel": {
+        "ModelName": f"{ENDPOINT}-model",
+        "ModelArn": f"arn:aws:sagemaker:eu-west-2:123456789012:model/{ENDPOINT}-model",
+        "Containers": [{"ModelPackageName": PACKAGE_ARN}],
+        "CreationTime": 0,
+    },
+    # One unmanaged endpoint, so the sweeper inspects its tags and keeps it.
+    "ListEndpoints": {
+        "Endpoints": [
+            {
+                "EndpointName": ENDPOINT,
+                "EndpointArn": f"arn:aws:sagemaker:eu-west-2:123456789012:endpoint/{ENDPOINT}",
+                "EndpointStatus": "InService",
+                "CreationTime": 0,
+                "LastModifiedTime": 0,
+            }
+        ]
+    },
+    "ListTags": {"Tags": []},
+}
+
+class _Raw(io.BytesIO):
+    """The urllib3 response surface botocore reads bodies through."""
+
+    def stream(self, amt: int = 65536, **_kwargs: Any) -> Any:
+        chunk = self.read(amt)
+        while chunk:
+            yield chunk
+            chunk = self.read(amt)
+
+class FakeAws:
+    """botocore before-send hook answering S3, SageMaker and SageMaker Runtime from memory."""
+
+    def __init__(self, objects: Dict[Tuple[str, str], bytes]) -> None:
+        self.objects = dict(objects)
+        self.calls: List[str] = []
+
+    def __call__(self, request: Any, event_name: str, **_kwargs: Any) -> Any:
+        _, service, op = event_name.split(".")
+        self.calls.append(f"{service}.{op}")
+        if service == "s3":
+            return self._s3(request)
+        if service == "sagemaker-runtime":
+            fixtures = json.loads(_body(request))
+            preds = [{"p_home_win": 0.45, "p_draw": 0.27, "p_away_win": 0.28, "r_home": 1500.0, "r_away": 1500.0}] * len(fixtures)
+            return _response(request.url, 200, {"Content-Type": "application/json"}, json.dumps(preds).encode("utf-8"))
+        return _response(request.url, 200, {"Content-Type": "application/x-amz-json-1.1"}, json.dumps(_SAGEMAKER[op]).encode("utf-8"))
+
+    def _s3(self, request: Any) -> Any:
+        url = urlparse(request.url)
+        bucket, key = url.netloc.split(".")[0], unquote(url.path.lstrip("/"))
+        if request.method == "PUT":
+            body = _body(request)
+            encoding = request.headers.get("Content-Encoding") or b""
+            if b"aws-chunked" in (encoding if isinstance(encoding, bytes) else encoding.encode("ascii")):
+                body = _dechunk(body)
+            self.objects[(bucket, key)] = body
+            return _response(request.url, 200, {"ETag": '"put"'}, b"")
+        body = self.objects.get((bucket, key))
+        if body is None:
+            error = b"" if request.method == "HEAD" else b"<Error><Code>NoSuchKey</Code><Message>The specified key does not exist.</Message></Error>"
+            return _response(request.url, 404, {"Content-Type": "application/xml"}, error)
+        headers = {"ETag": f'"{abs(hash(body)):x}"', "Content-Length": str(len(body)), "Content-Type": "text/csv"}
+        return _response(request.url, 200, headers, b"" if request.method == "HEAD" else body)
+
+def _body(request: Any) -> bytes:
+    body = request.body
+    if hasattr(body, "read"):
+        body.seek(0)
+        body = body.read()
+    return body.encode("utf-8") if isinstance(body, str) else (body or b"")
+
+def _dechunk(body: bytes) -> bytes:
+    """Payload of an aws-chunked upload (botocore streams bodies this way to trail a checksum)."""
+    out, pos = b"", 0
+    while True:
+        eol = body.index(b"\r\n", pos)
+        size = int(body[pos:eol].split(b";")[0], 16)
+        if size == 0:
+            return out
+        out += body[eol + 2 : eol + 2 + size]
+        pos = eol + 2 + size + 2
+
+def _response(url: str, status: int, headers: Dict[str, str], body: bytes) -> Any:
+    from botocore.awsrequest import AWSResponse
+
+    return AWSResponse(url, status, headers, _Raw(body))
+
+def _csv(header: List[str], rows: List[List[Any]]) -> bytes:
+    return "\n".join([",".join(header)] + [",".join(str(v) for v in r) for r in rows]).encode("utf-8") + b"\n"
+
+def scenario(handler: str) -> Tuple[Dict[Tuple[str, str], bytes], List[Dict[str, Any]]]:
+    """(S3 objects, [first event, warm event]) exercising each handler's main path."""
+    pairs = [(f"Team {i}", f"Team {i + 1}") for i in range(N_FIXTURES)]
+    if handler == "deploy_endpoint.handler":
+        event = {"model_package_arn": PACKAGE_ARN, "endpoint_name": ENDPOINT, "lifecycle": "persistent"}
+        return {}, [event, event]
+    if handler == "predict_weekly.handler":
+        fixtures = _csv(["gameweek", "date", "home", "away"], [["GW01", "2025-03-01", h, a] for h, a in pairs])
+        event = {"endpoint_name": ENDPOINT, "fixtures_s3_uri": "s3://raw/fixtures/GW01.csv", "gameweek": "GW01", "lifecycle": "persistent", "force": True}
+        return {("raw", "fixtures/GW01.csv"): fixtures}, [event, event]
+    if handler == "endpoint_lifecycle.sweep_handler":
+        return {}, [{}, {}]
+    if handler == "online_eval.handler":
+        preds = _csv(["gameweek", "date", "home", "away", "p_home_win", "p_draw", "p_away_win", "r_home", "r_away"], [["GW01", "2025-03-01", h, a, 0.45, 0.27, 0.28, 1500.0, 1500.0] for h, a in pairs])
+        header = ["home", "away", "home_score", "away_score"]
+        objects = {
+            ("preds", "predictions/GW01/wsl_predictions.csv"): preds,
+            ("raw", "results/GW01/saturday.csv"): _csv(header, [[h, a, 2, 1] for h, a in pairs[::2]]),
+            ("raw", "results/GW01/sunday.csv"): _csv(header, [[h, a, 0, 0] for h, a in pairs[1::2]]),
+        }
+        return objects, [{"results_s3_uri": f"s3://raw/results/GW01/{day}.csv"} for day in ("saturday", "sunday")]
+    raise ValueError(f"No cold-start scenario for {handler}")
+
+def _child(handler: str) -> Dict[str, Any]:
+    """Runs in the fresh interpreter, with the bundle as the working directory."""
+    module_name, func_name = handler.rsplit(".", 1)
+    start = time.perf_counter()
+    fn = getattr(importlib.import_module(module_name), func_name)
+    timings = {"init": time.perf_counter() - start}
+
+    objects, events = scenario(handler)
+    aws = FakeAws(objects)
+    for phase, event in zip(PHASES[1:], events):
+        start = time.perf_counter()
+        if phase == "first_invoke":
+            importlib.import_module("aws_clients").session().events.register("before-send", aws)
+        fn(event, None)
+        timings[phase] = time.perf_counter() - start
+    return {"timings": timings, "calls": aws.calls}
+
+def _child_env(bundle_dir: Path) -> Dict[str, str]:
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("AWS_", "PYTHON"))}
+    env.update(
+        {
+            # Only the bundle is importable (plus the interpreter's site-packages, as boto3 is in the Lambda runtime).
+            "PYTHONPATH": str(bundle_dir),
+            # /var/task is read-only, so Lambda compiles the bundle's modules on every cold start.
+            "PYTHONDONTWRITEBYTECODE": "1",
+            "AWS_DEFAULT_REGION": "eu-west-2",
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_EC2_METADATA_DISABLED": "true",
+            "RAW_BUCKET": "raw",
+            "PRED_BUCKET": "preds",
+        }
+    )
+    return env
+
+def measure(handler: str, files: List[Path], runs: int = 5) -> Dict[str, List[float]]:
+    """Per-phase timings of `handler` over `runs` fresh interpreters importing only `files`."""
+    timings: Dict[str, List[float]] = {p: [] for p in PHASES}
+    with tempfile.TemporaryDirectory(prefix="cold-start-") as tmp:
+        bundle_dir = Path(tmp)
+        for f in files:
+            shutil.copy2(f, bundle_dir / f.name)
+        for _ in range(runs):
+            proc = subprocess.run(
+                [sys.executable, str(Path(__file__).resolve()), "--child", handler],
+                cwd=bundle_dir,
+                env=_child_env(bundle_dir),
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                raise RuntimeError(f"{handler} failed from its bundle:\n{proc.stderr.strip()[-2000:]}")
+            # Handlers log EMF lines to stdout; the child's report is the last line.
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            for phase, seconds in result["timings"].items():
+                timings[phase].append(seconds)
+    return timings
+
+def run_suite(bundles: Dict[str, List[Path]], runs: int = 5, only: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for handler, files in bundles.items():
+        if only and handler not in only:
+            continue
+        timings = measure(handler, files, runs)
+        for phase in PHASES:
+            results[f"{handler}/{phase}"] = {
+                "runs": len(timings[phase]),
+                "min_s": round(min(timings[phase]), 6),
+                "median_s": round(statistics.median(timings[phase]), 6),
+                "bundle_files": len(files),
+            }
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--runs", type=int, default=5, help="Fresh interpreters per handler")
+    ap.add_argument("--handler", action="append", default=None, help="Measure only this handler (repeatable)")
+    ap.add_argument("--output", type=Path, default=REPO_ROOT / "benchmarks" / "results" / "cold_start.json")
+    ap.add_argument("--compare", type=Path, default=None, help="Baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.3, help="Allowed slowdown before a phase is flagged (0.3 = 30%%)")
+    args = ap.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_child(args.child)))
+        return 0
+
+    sys.path.insert(0, str(REPO_ROOT / "infra" / "cdk"))
+    sys.path.insert(0, str(REPO_ROOT))
+    from benchmarks.bench import compare
+    from stacks.lambda_bundles import BUNDLES
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+        },
+        "results": run_suite(BUNDLES, args.runs, args.handler),
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"{'handler/phase':<48}{'median_ms':>12}{'min_ms':>10}")
+    for name, r in report["results"].items():
+        print(f"{name:<48}{r['median_s'] * 1000:>12.1f}{r['min_s'] * 1000:>10.1f}")
+    print(f"Results: {args.output}")
+
+    if args.compare is None:
+        return 0
+    baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+    rows = compare(report, baseline, args.threshold)
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else "ok"
+        print(f"{r['case']:<48}{r['baseline_s'] * 1000:>12.1f}{r['current_s'] * 1000:>10.1f}{r['ratio']:>8.2f}x  {flag}")
+    return 1 if any(r["regression"] for r in rows) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+"""In-memory AWS stand-ins shared by the benchmarks and the test suite."""
+import io
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+class _Body(io.BytesIO):
+    def iter_lines(self, chunk_size: int = 1024, keepends: bool = False):
+        for line in self.read().splitlines(keepends):
+            yield line
+
+class FakeS3:
+    """In-memory stand-in for the subset of the S3 client API used by the Lambdas."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls.append("put_object")
+        body = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        self.objects[(Bucket, Key)] = {"Body": body, "Metadata": kwargs.get("Metadata", {}), **kwargs}
+        return {"ETag": f'"{hash(body) & 0xFFFFFFFF:08x}"'}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.calls.append("get_object")
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "GetObject")
+        obj = self.objects[(Bucket, Key)]
+        return {"Body": _Body(obj["Body"]), "Metadata": obj["Metadata"]}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self.calls.append("head_object")
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        obj = self.objects[(Bucket, Key)]
+        return {"ETag": f'"{hash(obj["Body"]) & 0xFFFFFFFF:08x}"', "ContentLength": len(obj["Body"]), "Metadata": obj["Metadata"]}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self.calls.append("delete_object")
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def download_file(self, Bucket, Key, Filename):
+        self.calls.append("download_file")
+        Path(Filename).write_bytes(self.objects[(Bucket, Key)]["Body"])
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.calls.append("create_multipart_upload")
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {"Bucket": Bucket, "Key": Key, "Parts": {}, "Args": kwargs}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append("upload_part")
+        self.uploads[UploadId]["Parts"][PartNumber] = bytes(Body)
+        return {"ETag": f'"part-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+        up = self.uploads.pop(UploadId)
+        body = b"".join(up["Parts"][p["PartNumber"]] for p in MultipartUpload["Parts"])
+        self.objects[(Bucket, Key)] = {"Body": body, "Metadata": up["Args"].get("Metadata", {}), **up["Args"]}
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append("abort_multipart_upload")
+        self.uploads.pop(UploadId, None)
+        return {}
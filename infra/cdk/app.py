@@ -23,6 +23,7 @@ iam_stack = IamStack(
     raw_bucket=storage_stack.raw_bucket,
     pred_bucket=storage_stack.pred_bucket,
     kms_key=storage_stack.kms_key,
+    ratings_updates=str(app.node.try_get_context("ratings_updates") or "").lower() in ("1", "true", "yes"),
     env=env,
 )
 
@@ -36,6 +37,11 @@ lambda_stack = LambdaStack(
     pred_bucket=storage_stack.pred_bucket,
     sagemaker_role_arn=iam_stack.sagemaker_role.role_arn,
     lambda_role=iam_stack.lambda_role,
+    predictions_format=app.node.try_get_context("predictions_format") or "csv",
+    pyarrow_layer_arn=app.node.try_get_context("pyarrow_layer_arn"),
+    ratings_update_secret_arn=iam_stack.ratings_update_secret.secret_arn if iam_stack.ratings_update_secret else None,
+    snap_start=str(app.node.try_get_context("snap_start") or "").lower() in ("1", "true", "yes"),
+    provisioned_concurrency=int(app.node.try_get_context("provisioned_concurrency") or 0),
     env=env,
 )
 
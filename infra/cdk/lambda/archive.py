@@ -0,0 +1,212 @@
+import io
+import json
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from botocore.exceptions import ClientError
+
+from elo import SEASON_START_MONTH, season_year
+
+# pyarrow is optional: CSV output and manifest pruning work without it. The
+# Lambda gets it from a layer when Parquet output is enabled.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pq = None
+
+ARCHIVE_PREFIX = "predictions/archive"
+MANIFEST_NAME = "manifest.json"
+FLOAT_FIELDS = ["p_home_win", "p_draw", "p_away_win", "r_home", "r_away"]
+STRING_FIELDS = ["gameweek", "date", "home", "away"]
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Parquet predictions need pyarrow (pip install pyarrow, or attach a pyarrow Lambda layer)")
+
+def season_label(d: Any) -> str:
+    """'2023-24' for any date in the season starting in 2023 (see elo.SEASON_START_MONTH)."""
+    d = d if isinstance(d, date) else date.fromisoformat(str(d)[:10])
+    y = season_year(d, SEASON_START_MONTH)
+    return f"{y}-{(y + 1) % 100:02d}"
+
+def partition_path(season: str, gameweek: str) -> str:
+    return f"season={season}/gameweek={gameweek}/part-0.parquet"
+
+def encode_partition(rows: List[Dict[str, Any]]) -> bytes:
+    """zstd-compressed Parquet for one gameweek's predictions."""
+    _require_pyarrow()
+    schema = pa.schema([(c, pa.string()) for c in STRING_FIELDS] + [(c, pa.float64()) for c in FLOAT_FIELDS])
+    table = pa.table(
+        {**{c: [str(r[c]) for r in rows] for c in STRING_FIELDS}, **{c: [float(r[c]) for r in rows] for c in FLOAT_FIELDS}},
+        schema=schema,
+    )
+    buf = io.BytesIO()
+    pq.write_table(table, buf, compression="zstd")
+    return buf.getvalue()
+
+def partition_entry(rows: List[Dict[str, Any]], gameweek: str, model_package_arn: str = "", prediction_key: str = "") -> Dict[str, Any]:
+    """Manifest entry for one partition; the season is taken from the gameweek's first fixture."""
+    dates = sorted(str(r["date"])[:10] for r in rows)
+    season = season_label(dates[0])
+    return {
+        "season": season,
+        "gameweek": gameweek,
+        "path": partition_path(season, gameweek),
+        "rows": len(rows),
+        "min_date": dates[0],
+        "max_date": dates[-1],
+        "teams": sorted({r["home"] for r in rows} | {r["away"] for r in rows}),
+        "model_package_arn": model_package_arn,
+        "prediction_key": prediction_key,
+        "written_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+def update_manifest(manifest: Dict[str, Any], entry: Dict[str, Any]) -> List[str]:
+    """Add or replace the entry for its gameweek; returns paths of superseded partitions to delete."""
+    stale = [e["path"] for e in manifest["partitions"] if e["gameweek"] == entry["gameweek"] and e["path"] != entry["path"]]
+    manifest["partitions"] = [e for e in manifest["partitions"] if e["gameweek"] != entry["gameweek"]] + [entry]
+    manifest["partitions"].sort(key=lambda e: (e["min_date"], e["gameweek"]))
+    return stale
+
+def find_gameweek(manifest: Dict[str, Any], gameweek: str) -> Optional[Dict[str, Any]]:
+    return next((e for e in manifest["partitions"] if e["gameweek"] == gameweek), None)
+
+def prune(
+    manifest: Dict[str, Any],
+    season: Optional[str] = None,
+    gameweeks: Optional[List[str]] = None,
+    team: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Manifest entries whose partition can contain rows matching every given filter."""
+    return [
+        e
+        for e in manifest["partitions"]
+        if (season is None or e["season"] == season)
+        and (gameweeks is None or e["gameweek"] in gameweeks)
+        and (team is None or team in e["teams"])
+        and (date_from is None or e["max_date"] >= str(date_from)[:10])
+        and (date_to is None or e["min_date"] <= str(date_to)[:10])
+    ]
+
+def _split_root(root: str) -> Tuple[Optional[str], str]:
+    p = urlparse(root)
+    if p.scheme == "s3":
+        return p.netloc, p.path.strip("/")
+    return None, root
+
+def _read_bytes(s3: Any, root: str, rel: str) -> bytes:
+    bucket, prefix = _split_root(root)
+    if bucket is None:
+        return (Path(prefix) / rel).read_bytes()
+    return s3.get_object(Bucket=bucket, Key=f"{prefix}/{rel}")["Body"].read()
+
+def load_manifest(s3: Any, root: str) -> Dict[str, Any]:
+    try:
+        return json.loads(_read_bytes(s3, root, MANIFEST_NAME))
+    except FileNotFoundError:
+        return {"version": 1, "partitions": []}
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return {"version": 1, "partitions": []}
+        raise
+
+def read_predictions(
+    root: str,
+    season: Optional[str] = None,
+    gameweeks: Optional[List[str]] = None,
+    team: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    s3: Any = None,
+) -> "pa.Table":
+    """
+    Predictions from an archive at `root` (s3://bucket/prefix or a local directory).
+
+    Only partitions the manifest says can match are fetched; rows are then filtered
+    on team and date. Call `.to_pandas()` on the result for a DataFrame.
+
+      read_predictions("s3://preds/predictions/archive", season="2024-25", team="Chelsea")
+    """
+    _require_pyarrow()
+    import pyarrow.compute as pc
+
+    if s3 is None and _split_root(root)[0] is not None:
+        import aws_clients
+
+        s3 = aws_clients.client("s3")
+    entries = prune(load_manifest(s3, root), season, gameweeks, team, date_from, date_to)
+    read_cols = None if columns is None else sorted(set(columns) | {"home", "away", "date"})
+    tables = [pq.read_table(io.BytesIO(_read_bytes(s3, root, e["path"])), columns=read_cols) for e in entries]
+    if not tables:
+        schema = pa.schema([(c, pa.string()) for c in STRING_FIELDS] + [(c, pa.float64()) for c in FLOAT_FIELDS])
+        return schema.empty_table().select(columns or schema.names)
+    table = pa.concat_tables(tables)
+    mask = None
+    if team is not None:
+        mask = pc.or_(pc.equal(table["home"], team), pc.equal(table["away"], team))
+    for op, bound in ((pc.greater_equal, date_from), (pc.less_equal, date_to)):
+        if bound is not None:
+            cond = op(table["date"], str(bound)[:10])
+            mask = cond if mask is None else pc.and_(mask, cond)
+    if mask is not None:
+        table = table.filter(mask)
+    return table.select(columns) if columns else table
+
+class ParquetArchiveWriter:
+    """
+    Collect one gameweek's predictions and publish them as a Parquet partition.
+
+    Same interface as MultipartCsvWriter (writerow/rows/upload_seconds, context
+    manager). On close the partition is written under
+    `<prefix>/season=<season>/gameweek=<gameweek>/` and the manifest is updated;
+    a gameweek whose dates moved to another season drops its old partition.
+    """
+
+    def __init__(self, s3: Any, bucket: str, gameweek: str, prefix: str = ARCHIVE_PREFIX, model_package_arn: str = "", prediction_key: str = "") -> None:
+        _require_pyarrow()
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.gameweek = gameweek
+        self.model_package_arn = model_package_arn
+        self.prediction_key = prediction_key
+        self.key: Optional[str] = None
+        self.upload_seconds = 0.0
+        self._rows: List[Dict[str, Any]] = []
+
+    @property
+    def rows(self) -> int:
+        return len(self._rows)
+
+    def __enter__(self) -> "ParquetArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.close()
+
+    def writerow(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+
+    def close(self) -> None:
+        if not self._rows:
+            return
+        body = encode_partition(self._rows)
+        entry = partition_entry(self._rows, self.gameweek, self.model_package_arn, self.prediction_key)
+        start = time.perf_counter()
+        root = f"s3://{self.bucket}/{self.prefix}"
+        manifest = load_manifest(self.s3, root)
+        self.key = f"{self.prefix}/{entry['path']}"
+        self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=body, ContentType="application/vnd.apache.parquet")
+        for path in update_manifest(manifest, entry):
+            self.s3.delete_object(Bucket=self.bucket, Key=f"{self.prefix}/{path}")
+        self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}/{MANIFEST_NAME}", Body=json.dumps(manifest).encode("utf-8"), ContentType="application/json")
+        self.upload_seconds += time.perf_counter() - start
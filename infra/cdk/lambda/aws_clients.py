@@ -0,0 +1,89 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+# Invocation phases where init time is paid ahead of (or outside) a request, so
+# building clients eagerly at import is free rather than a cold-start cost.
+_PREWARM_INIT_TYPES = ("snap-start", "provisioned-concurrency")
+
+# Per-service read timeouts; invoke_endpoint may legitimately take up to 60s.
+_READ_TIMEOUTS = {"sagemaker-runtime": 70}
+
+_lock = threading.Lock()
+_session: Any = None
+_clients: Dict[str, Any] = {}
+
+def client_config(service: str) -> Any:
+    """
+    Connection settings for traffic that stays inside the VPC (S3 gateway endpoint,
+    SageMaker interface endpoints): connects fail fast instead of waiting out the
+    60s default when an endpoint or security group is missing, idle connections
+    are kept alive between invocations, and throttling is retried with backoff.
+    """
+    from botocore.config import Config
+
+    return Config(
+        connect_timeout=float(os.environ.get("AWS_CONNECT_TIMEOUT_S", "3")),
+        read_timeout=float(os.environ.get("AWS_READ_TIMEOUT_S", _READ_TIMEOUTS.get(service, 30))),
+        max_pool_connections=int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "10")),
+        retries={"mode": "standard", "max_attempts": int(os.environ.get("AWS_MAX_ATTEMPTS", "4"))},
+        tcp_keepalive=True,
+    )
+
+def session() -> Any:
+    """The process-wide boto3 session (credentials and endpoint data are resolved once)."""
+    global _session
+    with _lock:
+        if _session is None:
+            import boto3
+
+            _session = boto3.session.Session()
+        return _session
+
+def client(service: str) -> Any:
+    """
+    Pooled client for `service`, built on first use and shared by every module in the
+    process (and across warm invocations), so each connection pool is reused.
+    """
+    c = _clients.get(service)
+    if c is not None:
+        return c
+    s = session()
+    with _lock:
+        if service not in _clients:
+            _clients[service] = s.client(service, config=client_config(service))
+        return _clients[service]
+
+class LazyClient:
+    """
+    Module-level stand-in for a boto3 client, e.g. `s3 = LazyClient("s3")`: importing
+    a handler costs nothing, and the pooled client is built on first attribute access.
+    Tests can still replace the module attribute with a stub.
+    """
+
+    def __init__(self, service: str) -> None:
+        self.service = service
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(client(self.service), name)
+
+    def __repr__(self) -> str:
+        return f"LazyClient({self.service!r})"
+
+def prewarm(*services: str, init_type: Optional[str] = None) -> bool:
+    """
+    Build clients during init when it is snapshotted (SnapStart) or runs before any
+    request (provisioned concurrency); on-demand cold starts stay lazy.
+    """
+    if (init_type or os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE")) not in _PREWARM_INIT_TYPES:
+        return False
+    for service in services:
+        client(service)
+    return True
+
+def reset() -> None:
+    """Drop the session and cached clients (e.g. after credentials or env changed)."""
+    global _session
+    with _lock:
+        _session = None
+        _clients.clear()
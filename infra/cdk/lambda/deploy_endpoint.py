@@ -1,11 +1,13 @@
-import json
 import os
 from datetime import datetime
 from typing import Any, Dict, List
 
-import boto3
+from aws_clients import LazyClient, prewarm
+from endpoint_lifecycle import EndpointLifecycle, config_prefix
+from metrics import MetricsLogger
 
-sm = boto3.client("sagemaker")
+sm = LazyClient("sagemaker")
+prewarm("sagemaker")
 
 def _split_csv_env(name: str) -> List[str]:
     val = os.environ.get(name, "")
@@ -14,18 +16,80 @@ def _split_csv_env(name: str) -> List[str]:
         raise ValueError(f"Missing/empty env var: {name}")
     return parts
 
-def handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
+def _container_env() -> Dict[str, str]:
+    """
+    Serving env enabling online rating updates when RATINGS_UPDATE_SECRET_ARN is set
+    (see live_ratings.py). Only the secret's ARN is passed; model_fn reads the value
+    with the SageMaker execution role.
+    """
+    secret_arn = os.environ.get("RATINGS_UPDATE_SECRET_ARN")
+    if not secret_arn:
+        return {}
+    env = {
+        "WSL_RATINGS_UPDATE_SECRET_ARN": secret_arn,
+        # A single model server worker, so every request sees the same live snapshot.
+        "SAGEMAKER_MODEL_SERVER_WORKERS": "1",
+    }
+    if os.environ.get("RATINGS_SNAPSHOT_URI"):
+        env["WSL_RATINGS_SNAPSHOT_URI"] = os.environ["RATINGS_SNAPSHOT_URI"]
+    return env
+
+def _wait_budget(event: Dict[str, Any], context: Any) -> float:
+    if not event.get("wait", True):
+        return 0.0
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        # Leave headroom to return the hand-off payload before the Lambda times out.
+        return max(context.get_remaining_time_in_millis() / 1000.0 - 30.0, 0.0)
+    return 20 * 60.0
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Deploy/update SageMaker endpoint from a Model Package.
 
+    If the endpoint is already InService and serving the requested package's model
+    artifact it is reused as-is. Otherwise a new model/config is rolled out and the endpoint is
+    polled with exponential backoff for as long as the Lambda has time left; if it
+    is still not InService the current status is returned and predict_weekly
+    finishes the wait before scoring.
+
     Expected event:
       - model_package_arn (required)
+      - model_data_url (optional; the package's model artifact, which decides endpoint reuse)
       - endpoint_name (optional, default 'wsl-elo-endpoint')
       - instance_type (optional, default 'ml.t3.medium')
+      - wait (optional, default true; false hands off right after create/update)
+      - lifecycle (optional; overrides ENDPOINT_LIFECYCLE, 'ttl' tags the endpoint as warm)
+
+    Phase timings are emitted as CloudWatch Embedded Metric Format log lines.
     """
+    metrics = MetricsLogger("DeployEndpoint")
+    try:
+        return _deploy(event, context, metrics)
+    finally:
+        metrics.flush()
+
+def _deploy(event: Dict[str, Any], context: Any, metrics: MetricsLogger) -> Dict[str, Any]:
     model_package_arn = event["model_package_arn"]
     endpoint_name = event.get("endpoint_name", "wsl-elo-endpoint")
     instance_type = event.get("instance_type", "ml.m5.large")
+    lifecycle_policy = (event.get("lifecycle") or os.environ.get("ENDPOINT_LIFECYCLE") or "ephemeral").lower()
+    ttl_hours = float(os.environ.get("ENDPOINT_TTL_HOURS", "192"))
+    lifecycle = EndpointLifecycle(sm)
+
+    with metrics.timer("ReuseCheck"):
+        current = lifecycle.find_serving(endpoint_name, model_package_arn, event.get("model_data_url"))
+    if current is not None:
+        if lifecycle_policy == "ttl":
+            lifecycle.touch(current["EndpointArn"], ttl_hours)
+        metrics.put("EndpointReused", 1, "Count")
+        return {
+            "endpoint_name": endpoint_name,
+            "endpoint_config_name": current["EndpointConfigName"],
+            "model_package_arn": model_package_arn,
+            "status": "InService",
+            "reused": True,
+        }
+    metrics.put("EndpointReused", 0, "Count")
 
     role_arn = os.environ["SAGEMAKER_ROLE_ARN"]
     subnet_ids = _split_csv_env("VPC_SUBNET_IDS")
@@ -33,43 +97,56 @@ def handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
 
     ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
     model_name = f"{endpoint_name}-model-{ts}"
-    cfg_name = f"{endpoint_name}-cfg-{ts}"
-
-    sm.create_model(
-        ModelName=model_name,
-        ExecutionRoleArn=role_arn,
-        Containers=[{"ModelPackageName": model_package_arn}],
-        VpcConfig={"Subnets": subnet_ids, "SecurityGroupIds": sg_ids},
-    )
-
-    sm.create_endpoint_config(
-        EndpointConfigName=cfg_name,
-        ProductionVariants=[
-            {
-                "VariantName": "AllTraffic",
-                "ModelName": model_name,
-                "InitialInstanceCount": 1,
-                "InstanceType": instance_type,
-                "InitialVariantWeight": 1.0,
-            }
-        ],
-    )
+    cfg_name = f"{config_prefix(endpoint_name)}{ts}"
 
-    try:
-        sm.describe_endpoint(EndpointName=endpoint_name)
-        sm.update_endpoint(EndpointName=endpoint_name, EndpointConfigName=cfg_name)
-    except sm.exceptions.ClientError as e:
-        if "Could not find endpoint" in str(e) or "ValidationException" in str(e):
-            sm.create_endpoint(EndpointName=endpoint_name, EndpointConfigName=cfg_name)
+    container: Dict[str, Any] = {"ModelPackageName": model_package_arn}
+    env = _container_env()
+    if env:
+        container["Environment"] = env
+    with metrics.timer("CreateModel"):
+        sm.create_model(
+            ModelName=model_name,
+            ExecutionRoleArn=role_arn,
+            Containers=[container],
+            VpcConfig={"Subnets": subnet_ids, "SecurityGroupIds": sg_ids},
+        )
+
+    with metrics.timer("CreateEndpointConfig"):
+        sm.create_endpoint_config(
+            EndpointConfigName=cfg_name,
+            ProductionVariants=[
+                {
+                    "VariantName": "AllTraffic",
+                    "ModelName": model_name,
+                    # Must stay 1 while rating updates are enabled: LiveModel state is per instance.
+                    "InitialInstanceCount": 1,
+                    "InstanceType": instance_type,
+                    "InitialVariantWeight": 1.0,
+                }
+            ],
+        )
+
+    with metrics.timer("EndpointUpdate"):
+        if lifecycle.describe(endpoint_name) is not None:
+            resp = sm.update_endpoint(EndpointName=endpoint_name, EndpointConfigName=cfg_name)
         else:
-            raise
+            resp = sm.create_endpoint(EndpointName=endpoint_name, EndpointConfigName=cfg_name)
+    if lifecycle_policy == "ttl":
+        lifecycle.touch(resp["EndpointArn"], ttl_hours)
 
-    waiter = sm.get_waiter("endpoint_in_service")
-    waiter.wait(EndpointName=endpoint_name, WaiterConfig={"Delay": 30, "MaxAttempts": 40})
+    with metrics.timer("EndpointWait"):
+        status = lifecycle.wait_in_service(endpoint_name, timeout_s=_wait_budget(event, context))
+    if status == "InService":
+        # The previous config/model pair (and any left by a handed-off rollout) is no longer served.
+        with metrics.timer("Prune"):
+            metrics.put("SupersededConfigsDeleted", len(lifecycle.prune_superseded(endpoint_name)), "Count")
+    metrics.set_property("endpoint_name", endpoint_name)
 
     return {
         "endpoint_name": endpoint_name,
         "model_name": model_name,
         "endpoint_config_name": cfg_name,
         "model_package_arn": model_package_arn,
+        "status": status,
+        "reused": False,
     }
@@ -0,0 +1,209 @@
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+
+TAG_MANAGED = "wsl:managed"
+TAG_LAST_USED = "wsl:last-used"
+TAG_TTL_HOURS = "wsl:ttl-hours"
+
+TERMINAL_FAILURES = ("Failed", "OutOfService", "RollingBack")
+
+class EndpointFailed(RuntimeError):
+    pass
+
+def _not_found(e: ClientError) -> bool:
+    err = e.response.get("Error", {})
+    return err.get("Code") == "ValidationException" and "Could not find" in err.get("Message", "")
+
+def config_prefix(endpoint_name: str) -> str:
+    """Name prefix of the endpoint configs deploy_endpoint creates for `endpoint_name`."""
+    return f"{endpoint_name}-cfg-"
+
+class EndpointLifecycle:
+    """
+    Create, reuse, wait on and tear down the SageMaker endpoint serving a model package.
+
+    All AWS access goes through the injected `sm` client, and time through the
+    injected `sleep`/`clock`, so the logic can be exercised with botocore's Stubber.
+    """
+
+    def __init__(
+        self,
+        sm: Any,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.sm = sm
+        self.sleep = sleep
+        self.clock = clock
+
+    def describe(self, endpoint_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.sm.describe_endpoint(EndpointName=endpoint_name)
+        except ClientError as e:
+            if _not_found(e):
+                return None
+            raise
+
+    def serving_container(self, endpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """First container of the model behind an endpoint's current config."""
+        cfg = self.sm.describe_endpoint_config(EndpointConfigName=endpoint["EndpointConfigName"])
+        model_name = cfg["ProductionVariants"][0]["ModelName"]
+        model = self.sm.describe_model(ModelName=model_name)
+        containers = model.get("Containers") or [model.get("PrimaryContainer", {})]
+        return containers[0]
+
+    def model_artifact(self, container: Dict[str, Any]) -> Optional[str]:
+        """ModelDataUrl of a container, looked up in the registry for package-based containers."""
+        if container.get("ModelDataUrl"):
+            return container["ModelDataUrl"]
+        if not container.get("ModelPackageName"):
+            return None
+        pkg = self.sm.describe_model_package(ModelPackageName=container["ModelPackageName"])
+        return pkg["InferenceSpecification"]["Containers"][0]["ModelDataUrl"]
+
+    def find_serving(self, endpoint_name: str, model_package_arn: str, model_data_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        The endpoint description if it is InService and already serving the package's
+        model artifact. Every pipeline run registers a new package version for the same
+        (cached) Train artifact, so the artifact, not the package ARN, decides reuse.
+        """
+        ep = self.describe(endpoint_name)
+        if ep is None or ep["EndpointStatus"] != "InService":
+            return None
+        container = self.serving_container(ep)
+        if container.get("ModelPackageName") == model_package_arn:
+            return ep
+        wanted = model_data_url or self.model_artifact({"ModelPackageName": model_package_arn})
+        if self.model_artifact(container) != wanted:
+            return None
+        return ep
+
+    def wait_in_service(
+        self,
+        endpoint_name: str,
+        timeout_s: float,
+        initial_delay: float = 5.0,
+        max_delay: float = 60.0,
+    ) -> str:
+        """
+        Poll with exponential backoff until InService or `timeout_s` elapses.
+
+        Returns the last observed status, so callers can hand off a still-Creating
+        endpoint instead of blocking; raises EndpointFailed on a terminal failure.
+        """
+        deadline = self.clock() + timeout_s
+        delay = initial_delay
+        while True:
+            ep = self.describe(endpoint_name)
+            status = ep["EndpointStatus"] if ep else "NotFound"
+            if status == "InService":
+                return status
+            if status in TERMINAL_FAILURES or status == "NotFound":
+                reason = (ep or {}).get("FailureReason", "")
+                raise EndpointFailed(f"Endpoint {endpoint_name} is {status}: {reason}".rstrip(": "))
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return status
+            self.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+    def touch(self, endpoint_arn: str, ttl_hours: float) -> None:
+        """Record use of the endpoint so the TTL sweeper keeps it warm."""
+        self.sm.add_tags(
+            ResourceArn=endpoint_arn,
+            Tags=[
+                {"Key": TAG_MANAGED, "Value": "true"},
+                {"Key": TAG_LAST_USED, "Value": str(int(self.clock()))},
+                {"Key": TAG_TTL_HOURS, "Value": str(ttl_hours)},
+            ],
+        )
+
+    def teardown(self, endpoint_name: str) -> None:
+        """Delete an endpoint together with its endpoint config and model, and any earlier configs left behind."""
+        ep = self.describe(endpoint_name)
+        if ep is None:
+            return
+        cfg = self.sm.describe_endpoint_config(EndpointConfigName=ep["EndpointConfigName"])
+        self.sm.delete_endpoint(EndpointName=endpoint_name)
+        self.sm.delete_endpoint_config(EndpointConfigName=ep["EndpointConfigName"])
+        for variant in cfg["ProductionVariants"]:
+            self._delete_model(variant["ModelName"])
+        self._delete_configs_before(endpoint_name, cfg["CreationTime"], keep_models=set())
+
+    def prune_superseded(self, endpoint_name: str) -> List[str]:
+        """
+        Delete the endpoint's earlier configs and their models once it is InService on
+        its current config: update_endpoint leaves the previous pair behind. Only configs
+        created before the current one are touched, so a concurrent rollout's new
+        config survives.
+        """
+        ep = self.describe(endpoint_name)
+        if ep is None or ep["EndpointStatus"] != "InService":
+            return []
+        current = self.sm.describe_endpoint_config(EndpointConfigName=ep["EndpointConfigName"])
+        keep = {v["ModelName"] for v in current["ProductionVariants"]}
+        return self._delete_configs_before(endpoint_name, current["CreationTime"], keep_models=keep)
+
+    def _delete_configs_before(self, endpoint_name: str, created_before: Any, keep_models: Set[str]) -> List[str]:
+        deleted: List[str] = []
+        prefix = config_prefix(endpoint_name)
+        kwargs: Dict[str, Any] = {"NameContains": prefix, "CreationTimeBefore": created_before}
+        while True:
+            page = self.sm.list_endpoint_configs(**kwargs)
+            for c in page["EndpointConfigs"]:
+                name = c["EndpointConfigName"]
+                # NameContains is a substring match; only this endpoint's configs qualify.
+                if not name.startswith(prefix):
+                    continue
+                cfg = self.sm.describe_endpoint_config(EndpointConfigName=name)
+                self.sm.delete_endpoint_config(EndpointConfigName=name)
+                for variant in cfg["ProductionVariants"]:
+                    if variant["ModelName"] not in keep_models:
+                        self._delete_model(variant["ModelName"])
+                deleted.append(name)
+            if not page.get("NextToken"):
+                return deleted
+            kwargs["NextToken"] = page["NextToken"]
+
+    def _delete_model(self, model_name: str) -> None:
+        try:
+            self.sm.delete_model(ModelName=model_name)
+        except ClientError as e:
+            if not _not_found(e):
+                raise
+
+    def expired(self, endpoint_arn: str, default_ttl_hours: float) -> bool:
+        tags = {t["Key"]: t["Value"] for t in self.sm.list_tags(ResourceArn=endpoint_arn).get("Tags", [])}
+        if tags.get(TAG_MANAGED) != "true":
+            return False
+        ttl_hours = float(tags.get(TAG_TTL_HOURS, default_ttl_hours))
+        last_used = float(tags.get(TAG_LAST_USED, 0))
+        return self.clock() - last_used > ttl_hours * 3600
+
+    def sweep(self, default_ttl_hours: float, name_contains: str = "wsl-") -> List[str]:
+        """Tear down managed endpoints idle for longer than their TTL."""
+        deleted: List[str] = []
+        kwargs: Dict[str, Any] = {"NameContains": name_contains}
+        while True:
+            page = self.sm.list_endpoints(**kwargs)
+            for ep in page["Endpoints"]:
+                if ep["EndpointStatus"] in ("Creating", "Updating", "Deleting"):
+                    continue
+                if self.expired(ep["EndpointArn"], default_ttl_hours):
+                    self.teardown(ep["EndpointName"])
+                    deleted.append(ep["EndpointName"])
+            if not page.get("NextToken"):
+                return deleted
+            kwargs["NextToken"] = page["NextToken"]
+
+def sweep_handler(_event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
+    """Scheduled teardown of warm endpoints whose TTL has elapsed (ENDPOINT_TTL_HOURS)."""
+    lifecycle = EndpointLifecycle(aws_clients.client("sagemaker"))
+    deleted = lifecycle.sweep(float(os.environ.get("ENDPOINT_TTL_HOURS", "192")))
+    return {"deleted": deleted, "swept_at": datetime.now(timezone.utc).isoformat()}
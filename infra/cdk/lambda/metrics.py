@@ -0,0 +1,104 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+NAMESPACE = "WSLAnalytics"
+
+# CloudWatch accepts at most 100 values per metric in one EMF record.
+MAX_VALUES_PER_RECORD = 100
+
+def stdout_sink(line: str) -> None:
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+# Where loggers created without an explicit sink write; tests swap in a MemorySink.
+DEFAULT_SINK: Callable[[str], None] = stdout_sink
+
+class MemorySink:
+    """Collects EMF records in memory, for tests and local runs."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def __call__(self, line: str) -> None:
+        self.lines.append(line)
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return [json.loads(line) for line in self.lines]
+
+    def values(self, name: str) -> List[float]:
+        out: List[float] = []
+        for rec in self.records:
+            if name in rec:
+                v = rec[name]
+                out.extend(v if isinstance(v, list) else [v])
+        return out
+
+class MetricsLogger:
+    """
+    Buffer metrics for one invocation and emit them as CloudWatch Embedded Metric
+    Format log lines, so publishing costs a log write instead of a PutMetricData call.
+
+    Phase timers accumulate, so a phase entered once per row (e.g. invoke inside a
+    streaming loop) reports its total time for the invocation.
+    """
+
+    def __init__(self, function: str, namespace: str = NAMESPACE, sink: Optional[Callable[[str], None]] = None) -> None:
+        self.namespace = namespace
+        self.dimensions = {"Function": function}
+        self.sink = sink or DEFAULT_SINK
+        self._values: Dict[str, List[float]] = {}
+        self._units: Dict[str, str] = {}
+        self._properties: Dict[str, Any] = {}
+
+    def put(self, name: str, value: float, unit: str = "None") -> None:
+        self._values.setdefault(name, []).append(float(value))
+        self._units[name] = unit
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        name = f"{phase}Time"
+        vals = self._values.setdefault(name, [0.0])
+        vals[0] += seconds * 1000.0
+        self._units[name] = "Milliseconds"
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def set_property(self, key: str, value: Any) -> None:
+        self._properties[key] = value
+
+    def flush(self) -> None:
+        if not self._values:
+            return
+        chunk = 0
+        while True:
+            record: Dict[str, Any] = {}
+            metrics: List[Dict[str, str]] = []
+            for name, vals in self._values.items():
+                part = vals[chunk * MAX_VALUES_PER_RECORD : (chunk + 1) * MAX_VALUES_PER_RECORD]
+                if not part:
+                    continue
+                record[name] = part if len(part) > 1 else part[0]
+                metrics.append({"Name": name, "Unit": self._units[name]})
+            if not metrics:
+                break
+            record.update(self.dimensions)
+            record.update(self._properties)
+            record["_aws"] = {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {"Namespace": self.namespace, "Dimensions": [list(self.dimensions)], "Metrics": metrics}
+                ],
+            }
+            self.sink(json.dumps(record))
+            chunk += 1
+        self._values.clear()
+        self._units.clear()
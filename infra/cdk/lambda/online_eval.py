@@ -0,0 +1,285 @@
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote_plus, urlparse
+
+from botocore.exceptions import ClientError
+
+import archive
+from aws_clients import LazyClient, prewarm
+from metrics import MetricsLogger
+from s3_stream import iter_csv_rows
+
+s3 = LazyClient("s3")
+prewarm("s3")
+
+STATE_KEY = os.environ.get("ONLINE_EVAL_STATE_KEY", "evaluation/online/state.json")
+PROBS = ["p_home_win", "p_draw", "p_away_win"]
+EPS = 1e-15
+
+@dataclass
+class MetricAccumulator:
+    """
+    Sufficient statistics for Brier, log-loss, accuracy and calibration.
+
+    Accumulators for disjoint sets of matches merge by addition, so running metrics
+    are updated from new results alone, and a rescored gameweek's old total is taken
+    back out by subtraction.
+    """
+
+    bins: int = 10
+    n: int = 0
+    brier_sum: float = 0.0
+    log_loss_sum: float = 0.0
+    correct: int = 0
+    # Per probability bin, over all three outcome probabilities of every match.
+    bin_count: List[int] = field(default_factory=list)
+    bin_pred_sum: List[float] = field(default_factory=list)
+    bin_hit_sum: List[float] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        for name in ("bin_count", "bin_pred_sum", "bin_hit_sum"):
+            if not getattr(self, name):
+                setattr(self, name, [0] * self.bins if name == "bin_count" else [0.0] * self.bins)
+
+    def add(self, probs: List[float], outcome: int) -> None:
+        actual = [1.0 if i == outcome else 0.0 for i in range(3)]
+        self.n += 1
+        self.brier_sum += sum((p - a) ** 2 for p, a in zip(probs, actual))
+        self.log_loss_sum -= math.log(min(max(probs[outcome], EPS), 1 - EPS))
+        self.correct += int(max(range(3), key=lambda i: probs[i]) == outcome)
+        for p, a in zip(probs, actual):
+            b = min(int(p * self.bins), self.bins - 1)
+            self.bin_count[b] += 1
+            self.bin_pred_sum[b] += p
+            self.bin_hit_sum[b] += a
+
+    def merge(self, other: "MetricAccumulator") -> "MetricAccumulator":
+        return self._combine(other, 1)
+
+    def subtract(self, other: "MetricAccumulator") -> "MetricAccumulator":
+        """Remove `other`, which must have been merged into this accumulator before."""
+        return self._combine(other, -1)
+
+    def _combine(self, other: "MetricAccumulator", sign: int) -> "MetricAccumulator":
+        if other.bins != self.bins:
+            raise ValueError("Cannot merge accumulators with different calibration bins")
+        return MetricAccumulator(
+            bins=self.bins,
+            n=self.n + sign * other.n,
+            brier_sum=self.brier_sum + sign * other.brier_sum,
+            log_loss_sum=self.log_loss_sum + sign * other.log_loss_sum,
+            correct=self.correct + sign * other.correct,
+            bin_count=[a + sign * b for a, b in zip(self.bin_count, other.bin_count)],
+            bin_pred_sum=[a + sign * b for a, b in zip(self.bin_pred_sum, other.bin_pred_sum)],
+            bin_hit_sum=[a + sign * b for a, b in zip(self.bin_hit_sum, other.bin_hit_sum)],
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.n:
+            return {"n": 0}
+        calibration = [
+            {"bin": i, "count": c, "mean_pred": p / c, "hit_rate": h / c}
+            for i, (c, p, h) in enumerate(zip(self.bin_count, self.bin_pred_sum, self.bin_hit_sum))
+            if c
+        ]
+        # Expected calibration error over the populated bins.
+        total = sum(self.bin_count)
+        ece = sum(c["count"] / total * abs(c["mean_pred"] - c["hit_rate"]) for c in calibration)
+        return {
+            "n": self.n,
+            "brier": self.brier_sum / self.n,
+            "log_loss": self.log_loss_sum / self.n,
+            "accuracy": self.correct / self.n,
+            "ece": ece,
+            "calibration": calibration,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "MetricAccumulator":
+        return cls(**d)
+
+def outcome(home_score: int, away_score: int) -> int:
+    """0 home win, 1 draw, 2 away win (the order of PROBS)."""
+    return 0 if home_score > away_score else (1 if home_score == away_score else 2)
+
+def _parse_s3_uri(uri: str) -> Tuple[str, str]:
+    p = urlparse(uri)
+    if p.scheme != "s3" or not p.netloc or not p.path:
+        raise ValueError(f"Invalid S3 URI: {uri}")
+    return p.netloc, p.path.lstrip("/")
+
+def _load_state(bucket: str) -> Dict[str, Any]:
+    try:
+        return json.loads(s3.get_object(Bucket=bucket, Key=STATE_KEY)["Body"].read())
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return {"files": {}, "total": MetricAccumulator().to_dict(), "gameweeks": {}}
+        raise
+
+def _totals(state: Dict[str, Any]) -> Tuple[MetricAccumulator, Dict[str, MetricAccumulator]]:
+    """
+    The running and per-gameweek accumulators, rebuilt once for states written without
+    them from the per-file accumulators those states kept (which are then dropped).
+    """
+    gameweeks: Dict[str, MetricAccumulator] = {}
+    if "total" in state:
+        total = MetricAccumulator.from_dict(state["total"])
+        gameweeks = {gw: MetricAccumulator.from_dict(a) for gw, a in state["gameweeks"].items()}
+    else:
+        total = MetricAccumulator()
+        for f in state["files"].values():
+            part = MetricAccumulator.from_dict(f["accumulator"])
+            total = total.merge(part)
+            gameweeks[f["gameweek"]] = gameweeks.get(f["gameweek"], MetricAccumulator()).merge(part)
+    for f in state["files"].values():
+        f.pop("accumulator", None)
+    return total, gameweeks
+
+def _find_predictions(bucket: str, gameweek: str) -> Optional[Tuple[str, bool]]:
+    for key, compressed in [(f"predictions/{gameweek}/wsl_predictions.csv", False), (f"predictions/{gameweek}/wsl_predictions.csv.gz", True)]:
+        try:
+            s3.head_object(Bucket=bucket, Key=key)
+            return key, compressed
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                raise
+    return None
+
+# (date, home, away, league), as predict_weekly keys fixtures: a pairing can appear
+# twice in one gameweek, or in two leagues. The date is compared as its ISO day.
+MatchKey = Tuple[str, str, str, str]
+
+def _match_key(row: Dict[str, Any], with_league: bool = True) -> MatchKey:
+    return (str(row.get("date") or "")[:10], row["home"], row["away"], (row.get("league") or "") if with_league else "")
+
+def _load_predictions(bucket: str, gameweek: str) -> Dict[MatchKey, List[float]]:
+    """Match key -> probabilities from the gameweek's CSV output, or its Parquet archive partition."""
+    found = _find_predictions(bucket, gameweek)
+    if found is not None:
+        key, compressed = found
+        rows = iter_csv_rows(s3.get_object(Bucket=bucket, Key=key)["Body"], compressed=compressed)
+        return {_match_key(r): [float(r[p]) for p in PROBS] for r in rows}
+    root = f"s3://{bucket}/{archive.ARCHIVE_PREFIX}"
+    if archive.find_gameweek(archive.load_manifest(s3, root), gameweek) is None:
+        raise FileNotFoundError(f"No predictions published for {gameweek} in s3://{bucket}/predictions/{gameweek}/ or {root}/")
+    # The archive has no league column: its partitions are keyed with league "".
+    table = archive.read_predictions(root, gameweeks=[gameweek], columns=["date", "home", "away"] + PROBS, s3=s3)
+    return {_match_key(r): [float(r[p]) for p in PROBS] for r in table.to_pylist()}
+
+def _score_results(bucket: str, key: str, preds: Dict[MatchKey, List[float]]) -> Tuple[MetricAccumulator, int]:
+    """Accumulator over a results file's finished matches, and how many had no prediction."""
+    # Predictions written without a league (single-league runs, the Parquet archive) match on date and teams.
+    with_league = any(k[3] for k in preds)
+    acc = MetricAccumulator()
+    unmatched = 0
+    for r in iter_csv_rows(s3.get_object(Bucket=bucket, Key=key)["Body"]):
+        if not r.get("home_score") or not r.get("away_score"):
+            continue
+        probs = preds.get(_match_key(r, with_league))
+        if probs is None:
+            unmatched += 1
+            continue
+        acc.add(probs, outcome(int(r["home_score"]), int(r["away_score"])))
+    return acc, unmatched
+
+def _results_location(event: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """(bucket, key, etag) from an EventBridge S3 'Object Created' event or a direct invocation."""
+    if "detail" in event:
+        detail = event["detail"]
+        return detail["bucket"]["name"], unquote_plus(detail["object"]["key"]), detail["object"].get("etag")
+    bucket, key = _parse_s3_uri(event["results_s3_uri"])
+    return bucket, key, None
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Fold newly arrived results into the online evaluation of published predictions.
+
+    Expected event: an EventBridge S3 "Object Created" event for
+    `results/<gameweek>/*.csv`, or a direct invocation with:
+      - results_s3_uri (CSV with date, home, away, home_score, away_score and, for
+        multi-league predictions, league; matched to predictions on all four keys)
+      - gameweek (optional; defaults to the key's parent directory)
+
+    Only the new results file and that gameweek's predictions are read: the CSV output,
+    or with Parquet output the gameweek's archive partition (needs pyarrow). The running and
+    per-gameweek totals are persisted at ONLINE_EVAL_STATE_KEY in the predictions bucket
+    and updated by adding the new file's accumulator, so the cost doesn't grow with the
+    history. Per file only the gameweek and ETag are kept: a re-uploaded (corrected) file
+    rescores its gameweek's results files and replaces that gameweek's total instead of
+    double-counting.
+    """
+    metrics = MetricsLogger("OnlineEvaluation")
+    try:
+        return _evaluate(event, metrics)
+    finally:
+        metrics.flush()
+
+def _evaluate(event: Dict[str, Any], metrics: MetricsLogger) -> Dict[str, Any]:
+    pred_bucket = os.environ["PRED_BUCKET"]
+    bucket, key, etag = _results_location(event)
+    gameweek = event.get("gameweek") or key.rstrip("/").split("/")[-2]
+    etag = (etag or s3.head_object(Bucket=bucket, Key=key)["ETag"]).strip('"')
+
+    with metrics.timer("StateRead"):
+        state = _load_state(pred_bucket)
+    source = f"s3://{bucket}/{key}"
+    previous = state["files"].get(source)
+    if previous and previous.get("results_etag") == etag:
+        return {"gameweek": gameweek, "skipped": True, "reason": "results already processed"}
+
+    with metrics.timer("S3Read"):
+        preds = _load_predictions(pred_bucket, gameweek)
+
+    with metrics.timer("Score"):
+        acc, unmatched = _score_results(bucket, key, preds)
+        running, gameweeks = _totals(state)
+        if previous:
+            # The earlier upload's own contribution isn't kept: rebuild its gameweek from the
+            # gameweek's other results files (as they are now) and swap the totals.
+            old_gw = previous["gameweek"]
+            old_preds = preds if old_gw == gameweek else _load_predictions(pred_bucket, old_gw)
+            rebuilt = MetricAccumulator()
+            for other, f in list(state["files"].items()):
+                if other == source or f["gameweek"] != old_gw:
+                    continue
+                other_bucket, other_key = _parse_s3_uri(other)
+                try:
+                    f["results_etag"] = s3.head_object(Bucket=other_bucket, Key=other_key)["ETag"].strip('"')
+                    rebuilt = rebuilt.merge(_score_results(other_bucket, other_key, old_preds)[0])
+                except ClientError as e:
+                    if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                        raise
+                    del state["files"][other]
+            running = running.subtract(gameweeks[old_gw]).merge(rebuilt)
+            gameweeks[old_gw] = rebuilt
+        running = running.merge(acc)
+        week_acc = gameweeks[gameweek] = gameweeks.get(gameweek, MetricAccumulator()).merge(acc)
+    state["files"][source] = {"gameweek": gameweek, "results_etag": etag}
+    state["total"] = running.to_dict()
+    state["gameweeks"] = {gw: a.to_dict() for gw, a in gameweeks.items()}
+    state["running"] = running.summary()
+
+    with metrics.timer("StateWrite"):
+        s3.put_object(Bucket=pred_bucket, Key=STATE_KEY, Body=json.dumps(state).encode("utf-8"), ContentType="application/json")
+
+    week, total = week_acc.summary(), state["running"]
+    metrics.set_property("Gameweek", gameweek)
+    metrics.put("ResultsMatched", acc.n, "Count")
+    metrics.put("ResultsUnmatched", unmatched, "Count")
+    if week_acc.n:
+        metrics.put("GameweekBrier", week["brier"])
+        metrics.put("GameweekLogLoss", week["log_loss"])
+        metrics.put("GameweekAccuracy", week["accuracy"])
+    if running.n:
+        metrics.put("OnlineBrier", total["brier"])
+        metrics.put("OnlineLogLoss", total["log_loss"])
+        metrics.put("OnlineAccuracy", total["accuracy"])
+        metrics.put("OnlineCalibrationError", total["ece"])
+        metrics.put("OnlineMatches", running.n, "Count")
+    return {"gameweek": gameweek, "matched": acc.n, "unmatched": unmatched, "replaced": previous is not None, "running": {k: v for k, v in total.items() if k != "calibration"}}
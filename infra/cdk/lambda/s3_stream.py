@@ -0,0 +1,148 @@
+import csv
+import gzip
+import io
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+# S3 requires every part except the last to be at least 5 MiB.
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+def iter_csv_rows(body: Any, encoding: str = "utf-8", compressed: bool = False) -> Iterator[Dict[str, str]]:
+    """Parse a (optionally gzipped) CSV S3 body stream line-by-line without reading it into memory."""
+    if compressed:
+        yield from csv.DictReader(io.TextIOWrapper(gzip.GzipFile(fileobj=body), encoding=encoding, newline=""))
+        return
+    lines = (line.decode(encoding) for line in body.iter_lines())
+    yield from csv.DictReader(lines)
+
+class MultipartCsvWriter:
+    """
+    Write CSV rows to S3 incrementally through a multipart upload.
+
+    Rows are encoded (and optionally gzip-compressed) into a part buffer that is
+    flushed to S3 whenever it reaches `part_size`, so memory stays bounded by one
+    part regardless of the number of rows. Outputs smaller than a single part are
+    written with one `put_object` call and never open a multipart upload.
+    """
+
+    def __init__(
+        self,
+        s3: Any,
+        bucket: str,
+        key: str,
+        fieldnames: List[str],
+        compress: bool = False,
+        part_size: int = 8 * 1024 * 1024,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be >= {MIN_PART_SIZE} bytes")
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.compress = compress
+        self.part_size = part_size
+        self.metadata = metadata or {}
+        self.rows = 0
+        self.bytes_written = 0
+        self.upload_seconds = 0.0
+
+        self._line = io.StringIO()
+        self._csv = csv.DictWriter(self._line, fieldnames=fieldnames)
+        self._buf = bytearray()
+        self._gz = zlib.compressobj(wbits=31) if compress else None
+        self._upload_id: Optional[str] = None
+        self._parts: List[Dict[str, Any]] = []
+        self._closed = False
+
+        self._csv.writeheader()
+        self._drain_line()
+
+    def __enter__(self) -> "MultipartCsvWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _object_args(self) -> Dict[str, Any]:
+        args: Dict[str, Any] = {"Bucket": self.bucket, "Key": self.key, "ContentType": "text/csv"}
+        if self.compress:
+            args["ContentEncoding"] = "gzip"
+        if self.metadata:
+            args["Metadata"] = self.metadata
+        return args
+
+    def _drain_line(self) -> None:
+        data = self._line.getvalue().encode("utf-8")
+        self._line.seek(0)
+        self._line.truncate()
+        if self._gz is not None:
+            data = self._gz.compress(data)
+        self._buf += data
+        if len(self._buf) >= self.part_size:
+            self._flush_part()
+
+    def _flush_part(self) -> None:
+        start = time.perf_counter()
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(**self._object_args())["UploadId"]
+        part_number = len(self._parts) + 1
+        resp = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buf),
+        )
+        self._parts.append({"ETag": resp["ETag"], "PartNumber": part_number})
+        self.bytes_written += len(self._buf)
+        self._buf.clear()
+        self.upload_seconds += time.perf_counter() - start
+
+    def writerow(self, row: Dict[str, Any]) -> None:
+        self._csv.writerow(row)
+        self.rows += 1
+        self._drain_line()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        try:
+            self._finish()
+        except Exception:
+            # A failed final part or completion must not leave the upload's parts behind.
+            self.abort()
+            raise
+        self._closed = True
+
+    def _finish(self) -> None:
+        if self._gz is not None:
+            self._buf += self._gz.flush()
+        if self._upload_id is None:
+            start = time.perf_counter()
+            self.s3.put_object(Body=bytes(self._buf), **self._object_args())
+            self.bytes_written += len(self._buf)
+            self._buf.clear()
+            self.upload_seconds += time.perf_counter() - start
+            return
+        if self._buf:
+            self._flush_part()
+        start = time.perf_counter()
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+        self.upload_seconds += time.perf_counter() - start
+
+    def abort(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
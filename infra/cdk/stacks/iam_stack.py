@@ -1,4 +1,6 @@
-from aws_cdk import Stack, aws_iam as iam, aws_s3 as s3, aws_kms as kms, aws_ssm as ssm
+from typing import Optional
+
+from aws_cdk import Stack, aws_iam as iam, aws_s3 as s3, aws_kms as kms, aws_secretsmanager as secretsmanager, aws_ssm as ssm
 from constructs import Construct
 
 class IamStack(Stack):
@@ -9,6 +11,8 @@ class IamStack(Stack):
         raw_bucket: s3.Bucket,
         pred_bucket: s3.Bucket,
         kms_key: kms.Key,
+        # Create the HMAC key that signs online rating updates (see live_ratings.py).
+        ratings_updates: bool = False,
         **kwargs,
     ):
         super().__init__(scope, construct_id, **kwargs)
@@ -25,6 +29,18 @@ class IamStack(Stack):
         pred_bucket.grant_read_write(self.sagemaker_role)
         kms_key.grant_encrypt_decrypt(self.sagemaker_role)
 
+        # Endpoints read it in model_fn; update clients read it to sign results.
+        self.ratings_update_secret: Optional[secretsmanager.Secret] = None
+        if ratings_updates:
+            self.ratings_update_secret = secretsmanager.Secret(
+                self,
+                "RatingsUpdateSecret",
+                description="HMAC key for signed online rating updates to WSL endpoints",
+                encryption_key=kms_key,
+                generate_secret_string=secretsmanager.SecretStringGenerator(password_length=64, exclude_punctuation=True),
+            )
+            self.ratings_update_secret.grant_read(self.sagemaker_role)
+
         # Lambda execution role
         self.lambda_role = iam.Role(
             self,
@@ -53,6 +69,11 @@ class IamStack(Stack):
                     "sagemaker:DescribeEndpointConfig",
                     "sagemaker:InvokeEndpoint",
                     "sagemaker:DescribeModelPackage",
+                    "sagemaker:DescribeModel",
+                    "sagemaker:ListEndpoints",
+                    "sagemaker:ListEndpointConfigs",
+                    "sagemaker:AddTags",
+                    "sagemaker:ListTags",
                 ],
                 resources=["*"],
             )
@@ -0,0 +1,23 @@
+from pathlib import Path
+from typing import Dict, List
+
+LAMBDA_DIR = Path(__file__).resolve().parents[1] / "lambda"
+STEPS_DIR = Path(__file__).resolve().parents[3] / "pipeline" / "steps"
+
+def _lambda_files(*modules: str) -> List[Path]:
+    return [LAMBDA_DIR / f"{m}.py" for m in modules]
+
+# Source files shipped with each function, keyed by handler: only the modules the
+# handler imports, so cold starts don't pay for unpacking and scanning the rest.
+# Free of CDK imports so benchmarks/cold_start.py can import every handler from
+# exactly its bundle (a module missing here fails there, not in production).
+BUNDLES: Dict[str, List[Path]] = {
+    "deploy_endpoint.handler": _lambda_files("deploy_endpoint", "endpoint_lifecycle", "metrics", "aws_clients"),
+    # Ships the model's serving code alongside the handler for mode="local"; elo and
+    # leagues are never imported by name but are needed to unpickle the artifact.
+    "predict_weekly.handler": _lambda_files("predict_weekly", "archive", "endpoint_lifecycle", "metrics", "s3_stream", "aws_clients")
+    + [STEPS_DIR / "elo.py", STEPS_DIR / "leagues.py", STEPS_DIR / "inference.py", STEPS_DIR / "live_ratings.py"],
+    "endpoint_lifecycle.sweep_handler": _lambda_files("endpoint_lifecycle", "aws_clients"),
+    # archive reads Parquet predictions and takes the season boundary from elo.
+    "online_eval.handler": _lambda_files("online_eval", "archive", "metrics", "s3_stream", "aws_clients") + [STEPS_DIR / "elo.py"],
+}
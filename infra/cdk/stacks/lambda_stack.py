@@ -1,6 +1,35 @@
-from aws_cdk import Stack, Duration, aws_lambda as _lambda, aws_ec2 as ec2, aws_s3 as s3, aws_ssm as ssm
+import shutil
+from pathlib import Path
+from typing import Any, Optional
+
+import jsii
+from aws_cdk import AssetHashType, BundlingOptions, ILocalBundling, Stack, Duration, aws_events as events, aws_events_targets as targets, aws_lambda as _lambda, aws_ec2 as ec2, aws_s3 as s3, aws_ssm as ssm
 from constructs import Construct
 
+from stacks.lambda_bundles import BUNDLES, LAMBDA_DIR
+
+@jsii.implements(ILocalBundling)
+class _CopyFiles:
+    """Local bundler that assembles a Lambda asset from individual source files."""
+
+    def __init__(self, files: list[Path]):
+        self.files = files
+
+    def try_bundle(self, output_dir: str, options: Any) -> bool:
+        for f in self.files:
+            shutil.copy2(f, Path(output_dir) / f.name)
+        return True
+
+def _bundled_code(files: list[Path], runtime: _lambda.Runtime) -> _lambda.Code:
+    return _lambda.Code.from_asset(
+        str(LAMBDA_DIR),
+        asset_hash_type=AssetHashType.OUTPUT,
+        bundling=BundlingOptions(
+            image=runtime.bundling_image,
+            local=_CopyFiles(files),
+        ),
+    )
+
 class LambdaStack(Stack):
     def __init__(
         self,
@@ -13,9 +42,26 @@ class LambdaStack(Stack):
         pred_bucket: s3.Bucket,
         sagemaker_role_arn: str,
         lambda_role,
+        endpoint_ttl_hours: int = 192,
+        predictions_format: str = "csv",
+        # Layer providing pyarrow for Parquet predictions (e.g. the AWS SDK for pandas layer).
+        pyarrow_layer_arn: Optional[str] = None,
+        # Secrets Manager secret enabling signed online rating updates on endpoints.
+        ratings_update_secret_arn: Optional[str] = None,
+        # Cold-start options for the pipeline-invoked functions (deploy/predict), which are
+        # then invoked through a "live" alias: SnapStart (needs Python 3.12) or N
+        # provisioned environments. Mutually exclusive.
+        snap_start: bool = False,
+        provisioned_concurrency: int = 0,
         **kwargs,
     ):
         super().__init__(scope, construct_id, **kwargs)
+        if snap_start and provisioned_concurrency:
+            raise ValueError("snap_start and provisioned_concurrency cannot be combined")
+        runtime = _lambda.Runtime.PYTHON_3_12 if snap_start else _lambda.Runtime.PYTHON_3_11
+
+        def code(handler: str) -> _lambda.Code:
+            return _bundled_code(BUNDLES[handler], runtime)
 
         subnet_selection = ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_ISOLATED)
         sg = ec2.SecurityGroup(self, "LambdaSg", vpc=vpc, allow_all_outbound=True)
@@ -28,14 +74,26 @@ class LambdaStack(Stack):
             "VPC_SUBNET_IDS": ",".join(vpc_subnet_ids),
             "ENDPOINT_SECURITY_GROUP_ID": endpoint_security_group_id,
             "ENDPOINT_LIFECYCLE": "ephemeral",
+            "PREDICTIONS_COMPRESSION": "none",
+            "PREDICTIONS_FORMAT": predictions_format,
+            "INVOKE_BATCH_SIZE": "50",
+            "ENDPOINT_TTL_HOURS": str(endpoint_ttl_hours),
+            # Where endpoints with online rating updates persist their snapshots.
+            "RATINGS_SNAPSHOT_URI": f"s3://{pred_bucket.bucket_name}/ratings-snapshots",
         }
+        if ratings_update_secret_arn:
+            # Only the secret's ARN: endpoints resolve the value with the SageMaker role. The
+            # predict Lambda uses it to know endpoint ratings can change without a new artifact.
+            common_env["RATINGS_UPDATE_SECRET_ARN"] = ratings_update_secret_arn
+        # Parquet predictions are written by the predict Lambda and read back by online evaluation.
+        pyarrow_layers = [_lambda.LayerVersion.from_layer_version_arn(self, "PyarrowLayer", pyarrow_layer_arn)] if pyarrow_layer_arn else None
 
         self.deploy_lambda = _lambda.Function(
             self,
             "DeployEndpointLambda",
-            runtime=_lambda.Runtime.PYTHON_3_11,
+            runtime=runtime,
             handler="deploy_endpoint.handler",
-            code=_lambda.Code.from_asset("lambda"),
+            code=code("deploy_endpoint.handler"),
             timeout=Duration.minutes(15),
             memory_size=512,
             role=lambda_role,
@@ -48,9 +106,9 @@ class LambdaStack(Stack):
         self.predict_lambda = _lambda.Function(
             self,
             "PredictWeeklyLambda",
-            runtime=_lambda.Runtime.PYTHON_3_11,
+            runtime=runtime,
             handler="predict_weekly.handler",
-            code=_lambda.Code.from_asset("lambda"),
+            code=code("predict_weekly.handler"),
             timeout=Duration.minutes(15),
             memory_size=512,
             role=lambda_role,
@@ -58,17 +116,90 @@ class LambdaStack(Stack):
             vpc_subnets=subnet_selection,
             security_groups=[sg],
             environment=common_env,
+            layers=pyarrow_layers,
         )
 
+        # Tears down warm endpoints (lifecycle="ttl") once idle for ENDPOINT_TTL_HOURS.
+        self.sweeper_lambda = _lambda.Function(
+            self,
+            "EndpointSweeperLambda",
+            runtime=runtime,
+            handler="endpoint_lifecycle.sweep_handler",
+            code=code("endpoint_lifecycle.sweep_handler"),
+            timeout=Duration.minutes(5),
+            memory_size=256,
+            role=lambda_role,
+            vpc=vpc,
+            vpc_subnets=subnet_selection,
+            security_groups=[sg],
+            environment=common_env,
+        )
+        events.Rule(
+            self,
+            "EndpointSweeperSchedule",
+            schedule=events.Schedule.rate(Duration.hours(1)),
+            targets=[targets.LambdaFunction(self.sweeper_lambda)],
+        )
+
+        # Scores published predictions as results land under results/<gameweek>/ in the raw bucket.
+        # One concurrent execution so updates to the evaluation state file never interleave.
+        self.online_eval_lambda = _lambda.Function(
+            self,
+            "OnlineEvaluationLambda",
+            runtime=runtime,
+            handler="online_eval.handler",
+            code=code("online_eval.handler"),
+            timeout=Duration.minutes(5),
+            memory_size=256,
+            reserved_concurrent_executions=1,
+            role=lambda_role,
+            vpc=vpc,
+            vpc_subnets=subnet_selection,
+            security_groups=[sg],
+            environment=common_env,
+            layers=pyarrow_layers,
+        )
+        events.Rule(
+            self,
+            "ResultsArrivedRule",
+            event_pattern=events.EventPattern(
+                source=["aws.s3"],
+                detail_type=["Object Created"],
+                detail={"bucket": {"name": [raw_bucket.bucket_name]}, "object": {"key": [{"prefix": "results/"}]}},
+            ),
+            targets=[targets.LambdaFunction(self.online_eval_lambda)],
+        )
+
+        deploy_target = self._live_alias(self.deploy_lambda, snap_start, provisioned_concurrency)
+        predict_target = self._live_alias(self.predict_lambda, snap_start, provisioned_concurrency)
+
         ssm.StringParameter(
             self,
             "DeployLambdaArnParam",
             parameter_name="/wsl-mlops/deploy_lambda_arn",
-            string_value=self.deploy_lambda.function_arn,
+            string_value=deploy_target.function_arn,
         )
         ssm.StringParameter(
             self,
             "PredictLambdaArnParam",
             parameter_name="/wsl-mlops/predict_lambda_arn",
-            string_value=self.predict_lambda.function_arn,
+            string_value=predict_target.function_arn,
+        )
+
+    def _live_alias(self, fn: _lambda.Function, snap_start: bool, provisioned_concurrency: int) -> _lambda.IFunction:
+        """
+        The function itself, or a "live" alias on its current version when a cold-start
+        option is on (both only apply to published versions, so callers must use the alias).
+        """
+        if not (snap_start or provisioned_concurrency):
+            return fn
+        if snap_start:
+            # Set on the L1 resource: the L2 snap_start validation predates Python support.
+            fn.node.default_child.add_property_override("SnapStart", {"ApplyOn": "PublishedVersions"})
+        return _lambda.Alias(
+            self,
+            f"{fn.node.id}LiveAlias",
+            alias_name="live",
+            version=fn.current_version,
+            provisioned_concurrent_executions=provisioned_concurrency or None,
         )
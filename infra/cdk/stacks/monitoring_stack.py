@@ -1,6 +1,30 @@
 from aws_cdk import Stack, Duration, aws_cloudwatch as cw, aws_lambda as _lambda
 from constructs import Construct
 
+NAMESPACE = "WSLAnalytics"
+
+# Phase timers emitted as EMF by the Lambdas (see lambda/metrics.py), per function.
+PHASES = {
+    "PredictWeekly": ["S3Read", "ModelLoad", "Invoke", "Serialize", "S3Write"],
+    "DeployEndpoint": ["CreateModel", "CreateEndpointConfig", "EndpointUpdate", "EndpointWait"],
+}
+
+def _metric(function: str, name: str, statistic: str = "p90") -> cw.Metric:
+    return cw.Metric(
+        namespace=NAMESPACE,
+        metric_name=name,
+        dimensions_map={"Function": function},
+        statistic=statistic,
+        period=Duration.minutes(5),
+    )
+
+def _duration_widget(fn: _lambda.Function, name: str) -> cw.GraphWidget:
+    return cw.GraphWidget(
+        title=f"{name} Lambda duration (ms)",
+        left=[fn.metric_duration(statistic="p50"), fn.metric_duration(statistic="p99")],
+        width=12,
+    )
+
 class MonitoringStack(Stack):
     def __init__(
         self,
@@ -8,6 +32,11 @@ class MonitoringStack(Stack):
         construct_id: str,
         deploy_lambda: _lambda.Function,
         predict_lambda: _lambda.Function,
+        invoke_latency_p99_ms: float = 2000.0,
+        # Well under the deploy Lambda's 15-minute timeout: a wait that reaches the timeout
+        # kills the function before EndpointWaitTime is emitted, so that can't be the threshold.
+        endpoint_wait_max_ms: float = 10 * 60 * 1000.0,
+        deploy_duration_max_ms: float = 13 * 60 * 1000.0,
         **kwargs,
     ):
         super().__init__(scope, construct_id, **kwargs)
@@ -23,3 +52,72 @@ class MonitoringStack(Stack):
                 treat_missing_data=cw.TreatMissingData.NOT_BREACHING,
                 alarm_description=f"Lambda {name} has errors.",
             )
+
+        cw.Alarm(
+            self,
+            "PredictWeeklyInvokeLatencyAlarm",
+            metric=_metric("PredictWeekly", "InvokeLatency", "p99"),
+            threshold=invoke_latency_p99_ms,
+            evaluation_periods=1,
+            datapoints_to_alarm=1,
+            treat_missing_data=cw.TreatMissingData.NOT_BREACHING,
+            alarm_description="p99 endpoint invoke latency from PredictWeekly is above threshold.",
+        )
+        cw.Alarm(
+            self,
+            "DeployEndpointWaitAlarm",
+            metric=_metric("DeployEndpoint", "EndpointWaitTime", "Maximum"),
+            threshold=endpoint_wait_max_ms,
+            evaluation_periods=1,
+            datapoints_to_alarm=1,
+            treat_missing_data=cw.TreatMissingData.NOT_BREACHING,
+            alarm_description="DeployEndpoint spent too long waiting for the endpoint to be InService.",
+        )
+        cw.Alarm(
+            self,
+            "DeployEndpointDurationAlarm",
+            metric=deploy_lambda.metric_duration(statistic="Maximum", period=Duration.minutes(5)),
+            threshold=deploy_duration_max_ms,
+            evaluation_periods=1,
+            datapoints_to_alarm=1,
+            treat_missing_data=cw.TreatMissingData.NOT_BREACHING,
+            alarm_description="DeployEndpoint is running close to its Lambda timeout.",
+        )
+
+        dashboard = cw.Dashboard(self, "LatencyDashboard", dashboard_name="wsl-mlops-latency")
+        for fn, function in [(predict_lambda, "PredictWeekly"), (deploy_lambda, "DeployEndpoint")]:
+            dashboard.add_widgets(
+                cw.GraphWidget(
+                    title=f"{function} phase time (ms, p90)",
+                    left=[_metric(function, f"{p}Time") for p in PHASES[function]],
+                    stacked=True,
+                    width=12,
+                ),
+                _duration_widget(fn, function),
+            )
+        dashboard.add_widgets(
+            cw.GraphWidget(
+                title="PredictWeekly invoke latency (ms)",
+                left=[_metric("PredictWeekly", "InvokeLatency", s) for s in ("p50", "p90", "p99")],
+                width=12,
+            ),
+            cw.GraphWidget(
+                title="PredictWeekly batch size / retries",
+                left=[_metric("PredictWeekly", "InvokeBatchSize", "Average")],
+                right=[_metric("PredictWeekly", "InvokeRetries", "Sum")],
+                width=12,
+            ),
+        )
+        dashboard.add_widgets(
+            cw.GraphWidget(
+                title="Online evaluation of published predictions",
+                left=[_metric("OnlineEvaluation", m, "Average") for m in ("OnlineBrier", "OnlineLogLoss", "OnlineCalibrationError")],
+                right=[_metric("OnlineEvaluation", "OnlineAccuracy", "Average")],
+                width=12,
+            ),
+            cw.GraphWidget(
+                title="Online evaluation results matched / unmatched",
+                left=[_metric("OnlineEvaluation", "ResultsMatched", "Sum"), _metric("OnlineEvaluation", "ResultsUnmatched", "Sum")],
+                width=12,
+            ),
+        )
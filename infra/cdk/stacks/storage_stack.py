@@ -20,6 +20,8 @@ class StorageStack(Stack):
             encryption_key=self.kms_key,
             block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
             versioned=True,
+            # Results uploads trigger online evaluation via EventBridge.
+            event_bridge_enabled=True,
             auto_delete_objects=True,
             removal_policy=RemovalPolicy.DESTROY,
         )
@@ -58,6 +58,8 @@ class VpcStack(Stack):
             ec2.InterfaceVpcEndpointAwsService.SAGEMAKER_API,
             ec2.InterfaceVpcEndpointAwsService.SAGEMAKER_RUNTIME,
             ec2.InterfaceVpcEndpointAwsService.STS,
+            # Endpoints with online rating updates read their HMAC key at model load.
+            ec2.InterfaceVpcEndpointAwsService.SECRETS_MANAGER,
         ]
 
         for svc in interface_services:
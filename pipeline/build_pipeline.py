@@ -1,21 +1,51 @@
 import argparse
+import hashlib
+import sys
+from pathlib import Path
+from typing import Dict, List
+
 import boto3
 import sagemaker
-from sagemaker.processing import ProcessingInput, ProcessingOutput
-from sagemaker.sklearn.processing import SKLearnProcessor
+from sagemaker.processing import FrameworkProcessor, ProcessingInput, ProcessingOutput
 from sagemaker.sklearn.estimator import SKLearn
 from sagemaker.sklearn.model import SKLearnModel
 from sagemaker.workflow.pipeline import Pipeline
-from sagemaker.workflow.parameters import ParameterString
-from sagemaker.workflow.steps import ProcessingStep, TrainingStep
+from sagemaker.workflow.pipeline_context import PipelineSession
+from sagemaker.workflow.parameters import ParameterInteger, ParameterString
+from sagemaker.workflow.steps import CacheConfig, ProcessingStep, TrainingStep, TransformStep
+from sagemaker.workflow.functions import Join
+from sagemaker.transformer import Transformer
 from sagemaker.workflow.model_step import ModelStep
 from sagemaker.model_metrics import MetricsSource, ModelMetrics
 from sagemaker.workflow.lambda_step import LambdaStep, LambdaOutput, LambdaOutputTypeEnum, Lambda
+from sagemaker.workflow.condition_step import ConditionStep
+from sagemaker.workflow.fail_step import FailStep
+from sagemaker.workflow.conditions import ConditionEquals, ConditionGreaterThan, ConditionNotEquals
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pipeline.config import get_config  # noqa: E402
+
+STEPS_DIR = Path(__file__).resolve().parent / "steps"
 
-SSM = boto3.client("ssm")
+# Source files each cached step's behaviour depends on; a change to any of them
+# changes the step's arguments and therefore its cache key.
+STEP_CODE: Dict[str, List[str]] = {
+    "Preprocess": ["preprocess.py", "merge_sources.py", "leagues.py", "profiling.py"],
+    "Train": ["train.py", "elo.py", "goals.py", "leagues.py", "profiling.py"],
+    "Evaluate": ["evaluate.py", "train.py", "elo.py", "goals.py", "leagues.py", "profiling.py"],
+}
+
+CACHE = CacheConfig(enable_caching=True, expire_after="P30D")
+
+def code_hash(files: List[str]) -> str:
+    h = hashlib.sha256()
+    for name in sorted(files):
+        h.update(name.encode("utf-8"))
+        h.update((STEPS_DIR / name).read_bytes())
+    return h.hexdigest()[:16]
 
 def ssm_get(name: str) -> str:
-    return SSM.get_parameter(Name=name)["Parameter"]["Value"]
+    return get_config().get(name)
 
 def build() -> Pipeline:
     raw_bucket_uri = ssm_get("/wsl-mlops/raw_bucket_uri")
@@ -25,25 +55,81 @@ def build() -> Pipeline:
     predict_lambda_arn = ssm_get("/wsl-mlops/predict_lambda_arn")
 
     boto_sess = boto3.Session()
-    sm_sess = sagemaker.session.Session(boto_session=boto_sess)
+    # step_args (ModelStep, FrameworkProcessor.run) must be captured, not executed.
+    sm_sess = PipelineSession(boto_session=boto_sess)
     region = boto_sess.region_name
 
+    # A single CSV or a prefix of overlapping source CSVs, merged in Preprocess.
     raw_data_s3_uri = ParameterString("RawDataS3Uri", default_value=f"{raw_bucket_uri}/raw/wsldata.csv")
+    # Source file stems, highest priority first, for resolving disagreements between sources.
+    source_precedence = ParameterString("SourcePrecedence", default_value="")
     fixtures_s3_uri = ParameterString("FixturesS3Uri", default_value=f"{raw_bucket_uri}/fixtures/upcoming_fixtures.csv")
     gameweek = ParameterString("Gameweek", default_value="GW01")
+    # Version/ETag of the raw data object (set by scripts/start_pipeline.py). S3 URIs alone
+    # don't change when an object is overwritten, so this is what invalidates cached steps;
+    # there is no usable default, and executions that don't set it fail in CheckRawDataVersion.
+    raw_data_version = ParameterString("RawDataVersion", default_value="")
+    endpoint_lifecycle = ParameterString("EndpointLifecycle", default_value="ephemeral", enum_values=["ephemeral", "ttl", "persistent"])
+    # parquet writes to the season/gameweek-partitioned archive (needs pyarrow in the predict Lambda).
+    predictions_format = ParameterString("PredictionsFormat", default_value="csv", enum_values=["csv", "parquet"])
+    prediction_mode = ParameterString("PredictionMode", default_value="endpoint", enum_values=["endpoint", "local", "transform"])
+    # Full season fixture list (played rows carry home_score/away_score); SeasonSims=0 skips the simulation.
+    season_fixtures_s3_uri = ParameterString("SeasonFixturesS3Uri", default_value=f"{raw_bucket_uri}/fixtures/season_fixtures.csv")
+    season_sims = ParameterInteger("SeasonSims", default_value=0)
+    # Fixtures/results history and gameweek range for a one-job backfill; an empty BackfillFromGameweek skips it.
+    backfill_history_s3_uri = ParameterString("BackfillHistoryS3Uri", default_value=f"{raw_bucket_uri}/fixtures/history.csv")
+    backfill_from_gameweek = ParameterString("BackfillFromGameweek", default_value="")
+    backfill_to_gameweek = ParameterString("BackfillToGameweek", default_value="")
+    model_type = ParameterString("ModelType", default_value="elo", enum_values=["elo", "goals"])
+    # >0 adds the N hottest functions (cProfile) to each step's profile.json.
+    profile_top_n = ParameterString("ProfileTopN", default_value="0")
+    step_env = {"WSL_PROFILE_TOP_N": profile_top_n}
+
+    # Cache keys of the cached steps, from everything that determines their output. They
+    # are also part of each step's output prefix: a cache hit returns the earlier run's
+    # output URIs, so outputs must never be overwritten by a run with different inputs.
+    preprocess_key = Join(on="-", values=[code_hash(STEP_CODE["Preprocess"]), raw_data_version, source_precedence])
+    train_key = Join(on="-", values=[code_hash(STEP_CODE["Train"]), raw_data_version])
+    evaluate_key = Join(on="-", values=[code_hash(STEP_CODE["Evaluate"]), code_hash(STEP_CODE["Train"]), raw_data_version, model_type])
+
+    # 0) Refuse to run without a data version: a constant default would be folded into the
+    # cache keys and serve up to 30-day-old outputs after the raw data has changed.
+    require_version = ConditionStep(
+        name="CheckRawDataVersion",
+        conditions=[ConditionEquals(left=raw_data_version, right="")],
+        if_steps=[FailStep(
+            name="RawDataVersionMissing",
+            error_message="RawDataVersion is required (the raw data object's version/ETag, or a unique value to bypass the step cache); start executions with scripts/start_pipeline.py or set it explicitly",
+        )],
+        else_steps=[],
+    )
+
+    def keyed(key: Join, *parts: str) -> Join:
+        return Join(on="/", values=[raw_bucket_uri, *parts[:-1], key, parts[-1]])
 
     # 1) Preprocess (Processing)
-    proc = SKLearnProcessor(framework_version="1.2-1", role=role_arn, instance_type="ml.t3.medium", instance_count=1, sagemaker_session=sm_sess)
+    # FrameworkProcessor ships the whole steps dir, so shared modules (profiling.py,
+    # elo.py, train.py) are importable in the container; SKLearnProcessor uploads one file.
+    proc = FrameworkProcessor(estimator_cls=SKLearn, framework_version="1.2-1", role=role_arn, instance_type="ml.t3.medium", instance_count=1, env=step_env, sagemaker_session=sm_sess)
     preprocess = ProcessingStep(
         name="Preprocess",
-        processor=proc,
-        code="pipeline/steps/preprocess.py",
-        inputs=[ProcessingInput(source=raw_data_s3_uri, destination="/opt/ml/processing/input")],
-        outputs=[
-            ProcessingOutput(output_name="train", source="/opt/ml/processing/train", destination=f"{raw_bucket_uri}/processed/train"),
-            ProcessingOutput(output_name="val", source="/opt/ml/processing/val", destination=f"{raw_bucket_uri}/processed/val"),
-            ProcessingOutput(output_name="test", source="/opt/ml/processing/test", destination=f"{raw_bucket_uri}/processed/test"),
-        ],
+        step_args=proc.run(
+            code="preprocess.py",
+            source_dir="pipeline/steps",
+            # Every WSL source is women's football, so "Chelsea FC Women" and "Chelsea" are one team.
+            arguments=["--source-precedence", source_precedence, "--womens-only", "--cache-key", preprocess_key],
+            inputs=[ProcessingInput(source=raw_data_s3_uri, destination="/opt/ml/processing/input")],
+            outputs=[
+                ProcessingOutput(output_name="train", source="/opt/ml/processing/train", destination=keyed(preprocess_key, "processed", "train")),
+                ProcessingOutput(output_name="val", source="/opt/ml/processing/val", destination=keyed(preprocess_key, "processed", "val")),
+                ProcessingOutput(output_name="test", source="/opt/ml/processing/test", destination=keyed(preprocess_key, "processed", "test")),
+                ProcessingOutput(output_name="profile", source="/opt/ml/processing/profile", destination=keyed(preprocess_key, "profiles", "preprocess")),
+                # conflicts.csv and merge.json from merging the raw sources
+                ProcessingOutput(output_name="merge_report", source="/opt/ml/processing/report", destination=keyed(preprocess_key, "reports", "merge")),
+            ],
+        ),
+        cache_config=CACHE,
+        depends_on=[require_version],
     )
 
     # 2) Train (Training)
@@ -55,11 +141,15 @@ def build() -> Pipeline:
         instance_type="ml.t3.medium",
         instance_count=1,
         output_path=f"{raw_bucket_uri}/models",
+        # Artifacts land under the (unique) training job name; the key only decides cache hits.
+        hyperparameters={"cache-key": train_key, "model-type": model_type},
+        environment=step_env,
         sagemaker_session=sm_sess,
     )
     train = TrainingStep(
         name="Train",
         estimator=est,
+        cache_config=CACHE,
         inputs={
             "train": sagemaker.inputs.TrainingInput(s3_data=preprocess.properties.ProcessingOutputConfig.Outputs["train"].S3Output.S3Uri),
             "val": sagemaker.inputs.TrainingInput(s3_data=preprocess.properties.ProcessingOutputConfig.Outputs["val"].S3Output.S3Uri),
@@ -67,24 +157,79 @@ def build() -> Pipeline:
     )
 
     # 3) Evaluate (Processing)
-    eval_proc = SKLearnProcessor(framework_version="1.2-1", role=role_arn, instance_type="ml.t3.medium", instance_count=1, sagemaker_session=sm_sess)
+    eval_proc = FrameworkProcessor(estimator_cls=SKLearn, framework_version="1.2-1", role=role_arn, instance_type="ml.t3.medium", instance_count=1, env=step_env, sagemaker_session=sm_sess)
     evaluate = ProcessingStep(
         name="Evaluate",
-        processor=eval_proc,
-        code="pipeline/steps/evaluate.py",
-        inputs=[
-            ProcessingInput(source=train.properties.ModelArtifacts.S3ModelArtifacts, destination="/opt/ml/processing/model"),
-            ProcessingInput(source=preprocess.properties.ProcessingOutputConfig.Outputs["test"].S3Output.S3Uri, destination="/opt/ml/processing/test"),
-        ],
-        outputs=[
-            ProcessingOutput(output_name="evaluation", source="/opt/ml/processing/evaluation", destination=f"{raw_bucket_uri}/evaluation")
-        ],
+        step_args=eval_proc.run(
+            code="evaluate.py",
+            source_dir="pipeline/steps",
+            arguments=["--cache-key", evaluate_key],
+            inputs=[
+                ProcessingInput(source=train.properties.ModelArtifacts.S3ModelArtifacts, destination="/opt/ml/processing/model"),
+                ProcessingInput(source=preprocess.properties.ProcessingOutputConfig.Outputs["test"].S3Output.S3Uri, destination="/opt/ml/processing/test"),
+            ],
+            # evaluation.json and profile.json
+            outputs=[
+                ProcessingOutput(output_name="evaluation", source="/opt/ml/processing/evaluation", destination=keyed(evaluate_key, "evaluation"))
+            ],
+        ),
+        cache_config=CACHE,
+    )
+
+    # 3b) Simulate the rest of the season from the trained ratings (Processing)
+    sim_proc = FrameworkProcessor(estimator_cls=SKLearn, framework_version="1.2-1", role=role_arn, instance_type="ml.m5.xlarge", instance_count=1, env=step_env, sagemaker_session=sm_sess)
+    simulate = ProcessingStep(
+        name="SimulateSeason",
+        step_args=sim_proc.run(
+            code="simulate.py",
+            source_dir="pipeline/steps",
+            arguments=["--sims", season_sims.to_string(), "--update-ratings"],
+            inputs=[
+                ProcessingInput(source=train.properties.ModelArtifacts.S3ModelArtifacts, destination="/opt/ml/processing/model"),
+                ProcessingInput(source=season_fixtures_s3_uri, destination="/opt/ml/processing/fixtures"),
+            ],
+            outputs=[
+                ProcessingOutput(output_name="simulation", source="/opt/ml/processing/simulation", destination=Join(on="/", values=[pred_bucket_uri, "simulations", gameweek]))
+            ],
+        ),
+    )
+    check_simulate = ConditionStep(
+        name="CheckSeasonSims",
+        conditions=[ConditionGreaterThan(left=season_sims, right=0)],
+        if_steps=[simulate],
+        else_steps=[],
+    )
+
+    # 3c) Backfill historical gameweeks from one replay of the history (Processing).
+    # Writes predictions/<gameweek>/wsl_predictions.csv for the whole range, no endpoint.
+    backfill_proc = FrameworkProcessor(estimator_cls=SKLearn, framework_version="1.2-1", role=role_arn, instance_type="ml.m5.large", instance_count=1, env=step_env, sagemaker_session=sm_sess)
+    backfill = ProcessingStep(
+        name="BackfillPredictions",
+        step_args=backfill_proc.run(
+            code="backfill.py",
+            source_dir="pipeline/steps",
+            arguments=["--from-gameweek", backfill_from_gameweek, "--to-gameweek", backfill_to_gameweek],
+            inputs=[
+                ProcessingInput(source=train.properties.ModelArtifacts.S3ModelArtifacts, destination="/opt/ml/processing/model"),
+                ProcessingInput(source=backfill_history_s3_uri, destination="/opt/ml/processing/history"),
+            ],
+            outputs=[
+                ProcessingOutput(output_name="predictions", source="/opt/ml/processing/predictions", destination=f"{pred_bucket_uri}/predictions"),
+                ProcessingOutput(output_name="report", source="/opt/ml/processing/report", destination=f"{raw_bucket_uri}/profiles/backfill"),
+            ],
+        ),
+    )
+    check_backfill = ConditionStep(
+        name="CheckBackfill",
+        conditions=[ConditionNotEquals(left=backfill_from_gameweek, right="")],
+        if_steps=[backfill],
+        else_steps=[],
     )
 
     # 4) Register Model (Model Registry)
     metrics = ModelMetrics(
         model_statistics=MetricsSource(
-            s3_uri=f"{evaluate.properties.ProcessingOutputConfig.Outputs['evaluation'].S3Output.S3Uri}/evaluation.json",
+            s3_uri=Join(on="/", values=[evaluate.properties.ProcessingOutputConfig.Outputs["evaluation"].S3Output.S3Uri, "evaluation.json"]),
             content_type="application/json",
         )
     )
@@ -102,8 +247,8 @@ def build() -> Pipeline:
     register_step = ModelStep(
         name="RegisterModel",
         step_args=sklearn_model.register(
-            content_types=["application/json"],
-            response_types=["application/json"],
+            content_types=["application/json", "application/jsonlines", "text/csv"],
+            response_types=["application/json", "application/jsonlines", "text/csv"],
             inference_instances=["ml.t3.medium"],
             transform_instances=["ml.t3.medium"],
             model_package_group_name="wsl-elo-models",
@@ -119,8 +264,10 @@ def build() -> Pipeline:
         lambda_func=deploy_lambda,
         inputs={
             "model_package_arn": register_step.properties.ModelPackageArn,
+            "model_data_url": train.properties.ModelArtifacts.S3ModelArtifacts,
             "endpoint_name": "wsl-elo-endpoint",
             "instance_type": "ml.t3.medium",
+            "lifecycle": endpoint_lifecycle,
         },
         outputs=[
             LambdaOutput(
@@ -133,27 +280,102 @@ def build() -> Pipeline:
 
     # 6) Predict (LambdaStep)
     predict_lambda = Lambda(function_arn=predict_lambda_arn)
-    _ = LambdaStep(
+    predict = LambdaStep(
         name="PredictWeekly",
         lambda_func=predict_lambda,
         inputs={
             "endpoint_name": deploy.outputs["endpoint_name"],
+            "model_package_arn": register_step.properties.ModelPackageArn,
+            # Prediction caching keys on the artifact, which the Train cache keeps stable across runs.
+            "model_data_url": train.properties.ModelArtifacts.S3ModelArtifacts,
+            "fixtures_s3_uri": fixtures_s3_uri,
+            "gameweek": gameweek,
+            "lifecycle": endpoint_lifecycle,
+            "format": predictions_format,
+            "output_prefix": f"{pred_bucket_uri}/predictions",
+        },
+    )
+
+    # 6b) Predict in-process from the registered artifact, no endpoint (LambdaStep)
+    predict_local = LambdaStep(
+        name="PredictWeeklyLocal",
+        lambda_func=predict_lambda,
+        inputs={
+            "mode": "local",
+            "model_type": model_type,
+            "model_package_arn": register_step.properties.ModelPackageArn,
+            # Prediction caching keys on the artifact, which the Train cache keeps stable across runs.
+            "model_data_url": train.properties.ModelArtifacts.S3ModelArtifacts,
             "fixtures_s3_uri": fixtures_s3_uri,
             "gameweek": gameweek,
-            "lifecycle": "ephemeral",
+            "format": predictions_format,
             "output_prefix": f"{pred_bucket_uri}/predictions",
         },
     )
 
+    # 6c) Batch Transform over fixture file(s), no endpoint (ModelStep + TransformStep).
+    # FixturesS3Uri may be a single file or a prefix of files (e.g. a backfill).
+    create_model = ModelStep(
+        name="CreateTransformModel",
+        step_args=sklearn_model.create(instance_type="ml.t3.medium"),
+    )
+    transformer = Transformer(
+        model_name=create_model.properties.ModelName,
+        instance_type="ml.t3.medium",
+        instance_count=1,
+        strategy="MultiRecord",
+        assemble_with="Line",
+        accept="text/csv",
+        max_payload=6,
+        output_path=Join(on="/", values=[pred_bucket_uri, "predictions", gameweek, "transform"]),
+        sagemaker_session=sm_sess,
+    )
+    transform = TransformStep(
+        name="PredictTransform",
+        transformer=transformer,
+        inputs=sagemaker.inputs.TransformInput(
+            data=fixtures_s3_uri,
+            content_type="text/csv",
+            split_type="Line",
+            join_source="Input",
+        ),
+    )
+
+    choose_transform = ConditionStep(
+        name="CheckTransformMode",
+        conditions=[ConditionEquals(left=prediction_mode, right="transform")],
+        if_steps=[create_model, transform],
+        else_steps=[deploy, predict],
+    )
+    # The prediction Lambda bundles only the Elo serving code (no numpy), so a goals
+    # artifact can't be unpickled there; fail before scoring rather than inside it.
+    reject_local_goals = FailStep(
+        name="LocalModeUnsupported",
+        error_message="PredictionMode=local supports ModelType=elo only; score goals models with PredictionMode=endpoint or transform",
+    )
+    check_local_model = ConditionStep(
+        name="CheckLocalModelType",
+        conditions=[ConditionEquals(left=model_type, right="goals")],
+        if_steps=[reject_local_goals],
+        else_steps=[predict_local],
+    )
+    choose_mode = ConditionStep(
+        name="CheckPredictionMode",
+        conditions=[ConditionEquals(left=prediction_mode, right="local")],
+        if_steps=[check_local_model],
+        else_steps=[choose_transform],
+        depends_on=[register_step],
+    )
+
     pipeline = Pipeline(
         name="wsl-mlops-pipeline",
-        parameters=[raw_data_s3_uri, fixtures_s3_uri, gameweek],
-        steps=[preprocess, train, evaluate, register_step, deploy, _],
+        parameters=[raw_data_s3_uri, source_precedence, fixtures_s3_uri, gameweek, raw_data_version, prediction_mode, endpoint_lifecycle, season_fixtures_s3_uri, season_sims, model_type, profile_top_n, predictions_format, backfill_history_s3_uri, backfill_from_gameweek, backfill_to_gameweek],
+        steps=[require_version, preprocess, train, evaluate, check_simulate, check_backfill, register_step, choose_mode],
         sagemaker_session=sm_sess,
     )
 
     # Persist pipeline name
-    SSM.put_parameter(Name="/wsl-mlops/pipeline_name", Value=pipeline.name, Type="String", Overwrite=True)
+    get_config().put("pipeline_name", pipeline.name)
     return pipeline
 
 def main():
@@ -0,0 +1,123 @@
+"""
+Shared resolver for the `/wsl-mlops/*` configuration written by the CDK stacks.
+
+All parameters are fetched with a single paginated `get_parameters_by_path` call and
+cached in memory (and optionally in a local JSON file with a TTL), so CLI tools pay at
+most one SSM round-trip. Values can be overridden, or supplied entirely offline, from:
+
+  1. environment variables `WSL_MLOPS_<NAME>` (e.g. WSL_MLOPS_RAW_BUCKET_URI)
+  2. a local JSON file named by WSL_MLOPS_CONFIG_FILE: {"raw_bucket_uri": "s3://...", ...}
+
+Overrides are consulted first; SSM is only called when a requested name is not overridden.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import boto3
+
+PREFIX = "/wsl-mlops/"
+ENV_PREFIX = "WSL_MLOPS_"
+DEFAULT_CACHE_FILE = Path.home() / ".cache" / "wsl-mlops" / "config.json"
+
+class WslConfig:
+    def __init__(
+        self,
+        ssm: Any = None,
+        ttl_seconds: Optional[float] = None,
+        cache_file: Optional[Path] = None,
+        overrides_file: Optional[Path] = None,
+    ) -> None:
+        self._ssm = ssm
+        # File cache is opt-in: WSL_MLOPS_CACHE_TTL=<seconds>.
+        self.ttl_seconds = float(os.environ.get(f"{ENV_PREFIX}CACHE_TTL", "0")) if ttl_seconds is None else ttl_seconds
+        self.cache_file = cache_file or Path(os.environ.get(f"{ENV_PREFIX}CACHE_FILE", str(DEFAULT_CACHE_FILE)))
+        overrides = overrides_file or os.environ.get(f"{ENV_PREFIX}CONFIG_FILE")
+        self._file_overrides: Dict[str, str] = json.loads(Path(overrides).read_text(encoding="utf-8")) if overrides else {}
+        self._values: Optional[Dict[str, str]] = None
+
+    @property
+    def ssm(self) -> Any:
+        if self._ssm is None:
+            self._ssm = boto3.client("ssm")
+        return self._ssm
+
+    def _override(self, name: str) -> Optional[str]:
+        env = os.environ.get(ENV_PREFIX + name.upper())
+        if env is not None:
+            return env
+        return self._file_overrides.get(name)
+
+    def _read_cache_file(self) -> Optional[Dict[str, str]]:
+        if self.ttl_seconds <= 0 or not self.cache_file.exists():
+            return None
+        try:
+            cached = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - float(cached.get("fetched_at", 0)) > self.ttl_seconds:
+            return None
+        return cached.get("values")
+
+    def _write_cache_file(self, values: Dict[str, str]) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"fetched_at": time.time(), "values": values}), encoding="utf-8")
+        tmp.replace(self.cache_file)
+
+    def _fetch(self) -> Dict[str, str]:
+        values: Dict[str, str] = {}
+        kwargs: Dict[str, Any] = {"Path": PREFIX, "Recursive": True}
+        while True:
+            page = self.ssm.get_parameters_by_path(**kwargs)
+            for p in page["Parameters"]:
+                values[p["Name"][len(PREFIX) :]] = p["Value"]
+            if not page.get("NextToken"):
+                return values
+            kwargs["NextToken"] = page["NextToken"]
+
+    def all(self, refresh: bool = False) -> Dict[str, str]:
+        """Every `/wsl-mlops/*` parameter (without the prefix), overrides applied."""
+        if self._values is None or refresh:
+            values = None if refresh else self._read_cache_file()
+            if values is None:
+                values = self._fetch()
+                self._write_cache_file(values)
+            self._values = values
+        merged = {**self._values, **self._file_overrides}
+        for name in merged:
+            override = self._override(name)
+            if override is not None:
+                merged[name] = override
+        return merged
+
+    def get(self, name: str) -> str:
+        """Value of `/wsl-mlops/<name>`; raises KeyError if it is neither overridden nor in SSM."""
+        name = name[len(PREFIX) :] if name.startswith(PREFIX) else name
+        override = self._override(name)
+        if override is not None:
+            return override
+        values = self.all()
+        if name not in values:
+            raise KeyError(f"Parameter not found: {PREFIX}{name}")
+        return values[name]
+
+    def put(self, name: str, value: str) -> None:
+        """Write `/wsl-mlops/<name>` to SSM and keep the caches consistent."""
+        self.ssm.put_parameter(Name=f"{PREFIX}{name}", Value=value, Type="String", Overwrite=True)
+        if self._values is not None:
+            self._values[name] = value
+            self._write_cache_file(self._values)
+
+_CONFIG: Optional[WslConfig] = None
+
+def get_config() -> WslConfig:
+    """Process-wide config instance, so repeated lookups share one fetch."""
+    global _CONFIG
+    if _CONFIG is None:
+        _CONFIG = WslConfig()
+    return _CONFIG
@@ -0,0 +1,251 @@
+"""
+Run the Preprocess -> Train -> Evaluate -> Register -> Predict DAG locally.
+
+Each step runs as a subprocess against a per-step directory that mirrors the
+/opt/ml layout SageMaker provides (via the steps' ML_ROOT variable). Steps whose
+dependencies are satisfied run concurrently, and each step's wall time, CPU time
+and peak RSS are written to `<run-dir>/run_report.json`.
+
+Register stands in for the Model Registry by copying the model artifact and its
+evaluation into `<run-dir>/registry/`; Predict scores the fixtures file with the
+serving code in inference.py, as the pipeline's local prediction mode does.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+STEPS_DIR = Path(__file__).resolve().parent / "steps"
+
+@dataclass
+class LocalStep:
+    name: str
+    cmd: List[str]
+    depends_on: List[str] = field(default_factory=list)
+    ml_root: Optional[Path] = None
+    # Staging (inputs) before the command and packaging (outputs) after it, in the runner.
+    before: Optional[Callable[[], None]] = None
+    after: Optional[Callable[[], None]] = None
+
+def _link(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.is_symlink() or dst.exists():
+        if dst.is_dir() and not dst.is_symlink():
+            shutil.rmtree(dst)
+        else:
+            dst.unlink()
+    dst.symlink_to(src.resolve(), target_is_directory=src.is_dir())
+
+def run_step(step: LocalStep, log_dir: Path) -> Dict[str, Any]:
+    """Run one step in a subprocess and collect its resource usage with wait4()."""
+    env = dict(os.environ)
+    if step.ml_root is not None:
+        env["ML_ROOT"] = str(step.ml_root)
+    start = time.perf_counter()
+    if step.before is not None:
+        step.before()
+    log_path = log_dir / f"{step.name}.log"
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(step.cmd, env=env, stdout=log, stderr=subprocess.STDOUT, cwd=STEPS_DIR)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode == 0 and step.after is not None:
+        step.after()
+    wall = time.perf_counter() - start
+    return {
+        "step": step.name,
+        "returncode": proc.returncode,
+        "wall_s": round(wall, 4),
+        "cpu_user_s": round(usage.ru_utime, 4),
+        "cpu_sys_s": round(usage.ru_stime, 4),
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mb": round(usage.ru_maxrss / 1024.0, 2),
+        "log": str(log_path),
+    }
+
+def run_dag(steps: List[LocalStep], log_dir: Path, max_workers: int = 4) -> List[Dict[str, Any]]:
+    """Execute steps as soon as their dependencies succeed; stop scheduling after a failure."""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    by_name = {s.name: s for s in steps}
+    for s in steps:
+        missing = [d for d in s.depends_on if d not in by_name]
+        if missing:
+            raise ValueError(f"Step {s.name} depends on unknown steps: {missing}")
+
+    t0 = time.perf_counter()
+    done: Dict[str, Dict[str, Any]] = {}
+    pending = dict(by_name)
+    running: Dict[Future, str] = {}
+    failed = False
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            if not failed:
+                for name, s in list(pending.items()):
+                    if all(d in done for d in s.depends_on):
+                        running[pool.submit(run_step, s, log_dir)] = name
+                        del pending[name]
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                result = fut.result()
+                result["finished_at_s"] = round(time.perf_counter() - t0, 4)
+                done[name] = result
+                if result["returncode"] != 0:
+                    failed = True
+    for name in pending:
+        done[name] = {"step": name, "returncode": None, "skipped": True}
+    return [done[s.name] for s in steps]
+
+def _tar_model(model_dir: Path, out_tar: Path) -> None:
+    out_tar.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(out_tar, "w:gz") as tf:
+        for p in sorted(model_dir.iterdir()):
+            tf.add(p, arcname=p.name)
+
+def build_steps(run_dir: Path, data_csv: Path, fixtures_csv: Path, gameweek: str, model_type: str = "elo") -> List[LocalStep]:
+    py = sys.executable
+    pre, trn, ev = run_dir / "preprocess", run_dir / "train", run_dir / "evaluate"
+    model_tar = trn / "output" / "model.tar.gz"
+    registry = run_dir / "registry"
+
+    def stage_train() -> None:
+        for split in ("train", "val"):
+            _link(pre / "processing" / split, trn / "input" / "data" / split)
+
+    def stage_evaluate() -> None:
+        _link(model_tar, ev / "processing" / "model" / model_tar.name)
+        _link(pre / "processing" / "test", ev / "processing" / "test")
+
+    return [
+        LocalStep(
+            name="Preprocess",
+            cmd=[py, str(STEPS_DIR / "preprocess.py"), "--womens-only"],
+            ml_root=pre,
+            before=lambda: _link(data_csv, pre / "processing" / "input" / data_csv.name),
+        ),
+        LocalStep(
+            name="Train",
+            cmd=[py, str(STEPS_DIR / "train.py"), "--model-type", model_type],
+            depends_on=["Preprocess"],
+            ml_root=trn,
+            before=stage_train,
+            # SageMaker tars /opt/ml/model into model.tar.gz after training.
+            after=lambda: _tar_model(trn / "model", model_tar),
+        ),
+        LocalStep(
+            name="Evaluate",
+            cmd=[py, str(STEPS_DIR / "evaluate.py")],
+            depends_on=["Train"],
+            ml_root=ev,
+            before=stage_evaluate,
+        ),
+        LocalStep(
+            name="Register",
+            cmd=[py, __file__, "register", "--model-tar", str(model_tar), "--evaluation", str(ev / "processing" / "evaluation" / "evaluation.json"), "--registry", str(registry)],
+            depends_on=["Train", "Evaluate"],
+        ),
+        # Scoring only needs the trained artifact, so it runs alongside Evaluate/Register.
+        LocalStep(
+            name="Predict",
+            cmd=[py, __file__, "predict", "--model-tar", str(model_tar), "--fixtures", str(fixtures_csv), "--gameweek", gameweek, "--out-dir", str(run_dir / "predictions")],
+            depends_on=["Train"],
+        ),
+    ]
+
+def _register_main(args: argparse.Namespace) -> None:
+    versions = sorted(int(p.name) for p in args.registry.glob("[0-9]*")) if args.registry.exists() else []
+    dest = args.registry / str((versions[-1] + 1) if versions else 1)
+    dest.mkdir(parents=True)
+    shutil.copy2(args.model_tar, dest / "model.tar.gz")
+    shutil.copy2(args.evaluation, dest / "evaluation.json")
+    print(f"Registered model version {dest.name}: {dest}")
+
+def _predict_main(args: argparse.Namespace) -> None:
+    import csv
+
+    sys.path.insert(0, str(STEPS_DIR))
+    import inference
+
+    model_dir = args.out_dir / "_model"
+    model_dir.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(args.model_tar, "r:gz") as tf:
+        tf.extractall(model_dir, filter="data")
+    model = inference.model_fn(str(model_dir))
+
+    out_path = args.out_dir / args.gameweek / "wsl_predictions.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.fixtures, encoding="utf-8") as src, open(out_path, "w", newline="", encoding="utf-8") as dst:
+        wri = csv.DictWriter(dst, fieldnames=inference.FIXTURE_COLUMNS + inference.PREDICTION_COLUMNS)
+        wri.writeheader()
+        rows = 0
+        for fx in csv.DictReader(src):
+            pred = inference.predict_fn({"home_team": fx["home"], "away_team": fx["away"], "date": fx.get("date"), "league": fx.get("league")}, model)
+            wri.writerow({"gameweek": fx.get("gameweek") or args.gameweek, "date": fx["date"], "home": fx["home"], "away": fx["away"], **{c: pred[c] for c in inference.PREDICTION_COLUMNS}})
+            rows += 1
+    print(f"Wrote {rows} predictions to {out_path}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Run the WSL pipeline DAG locally.")
+    sub = ap.add_subparsers(dest="command")
+
+    run = sub.add_parser("run", help="Run the full DAG (default)")
+    run.add_argument("--data", type=Path, default=Path("data/seed/wsldata.csv"))
+    run.add_argument("--fixtures", type=Path, default=Path("data/seed/upcoming_fixtures_example.csv"))
+    run.add_argument("--gameweek", default="GW01")
+    run.add_argument("--model-type", choices=["elo", "goals"], default="elo")
+    run.add_argument("--run-dir", type=Path, default=Path(".local-run"))
+    run.add_argument("--max-workers", type=int, default=4)
+
+    reg = sub.add_parser("register")
+    reg.add_argument("--model-tar", type=Path, required=True)
+    reg.add_argument("--evaluation", type=Path, required=True)
+    reg.add_argument("--registry", type=Path, required=True)
+
+    pred = sub.add_parser("predict")
+    pred.add_argument("--model-tar", type=Path, required=True)
+    pred.add_argument("--fixtures", type=Path, required=True)
+    pred.add_argument("--gameweek", required=True)
+    pred.add_argument("--out-dir", type=Path, required=True)
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in ("run", "register", "predict", "-h", "--help"):
+        argv.insert(0, "run")
+    args = ap.parse_args(argv)
+    if args.command == "register":
+        _register_main(args)
+        return 0
+    if args.command == "predict":
+        _predict_main(args)
+        return 0
+
+    if not args.data.exists():
+        raise SystemExit(f"Missing data file: {args.data}")
+    run_dir = args.run_dir.resolve()
+    if run_dir.exists():
+        shutil.rmtree(run_dir)
+    steps = build_steps(run_dir, args.data.resolve(), args.fixtures.resolve(), args.gameweek, args.model_type)
+
+    t0 = time.perf_counter()
+    results = run_dag(steps, run_dir / "logs", max_workers=args.max_workers)
+    report = {"run_dir": str(run_dir), "total_wall_s": round(time.perf_counter() - t0, 4), "steps": results}
+    (run_dir / "run_report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"{'step':<12}{'rc':>4}{'wall_s':>10}{'cpu_s':>10}{'rss_mb':>10}")
+    for r in results:
+        cpu = r.get("cpu_user_s", 0.0) + r.get("cpu_sys_s", 0.0)
+        print(f"{r['step']:<12}{str(r['returncode']):>4}{r.get('wall_s', 0.0):>10.2f}{cpu:>10.2f}{r.get('peak_rss_mb', 0.0):>10.1f}")
+    print(f"Total wall time: {report['total_wall_s']:.2f}s  (report: {run_dir / 'run_report.json'})")
+    return 0 if all(r["returncode"] == 0 for r in results) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+"""
+Local stand-in for the pipeline's Batch Transform step.
+
+Runs the same inference.py handlers a SageMaker transform job would, over a
+directory of fixture files, mirroring the job settings used in build_pipeline.py:
+split_type="Line", strategy="MultiRecord", assemble_with="Line" and
+join_source="Input". Each file is written to `<output_dir>/<name>.out`.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "steps"))
+
+import inference  # noqa: E402
+
+_MODEL: Any = None
+
+def _init_worker(model_dir: str) -> None:
+    global _MODEL
+    _MODEL = inference.model_fn(model_dir)
+
+def _join(input_line: str, output_line: str, content_type: str) -> str:
+    if content_type == "text/csv":
+        return f"{input_line},{output_line}"
+    return f'{{"SageMakerInput": {input_line}, "SageMakerOutput": {output_line}}}'
+
+def transform_file(path: str, output_dir: str, content_type: str = "text/csv", batch_lines: int = 500) -> Dict[str, Any]:
+    """Score one file in MultiRecord mini-batches of `batch_lines` lines."""
+    start = time.perf_counter()
+    out_path = Path(output_dir) / f"{Path(path).name}.out"
+    records = 0
+    with open(path, encoding="utf-8") as src, open(out_path, "w", encoding="utf-8") as dst:
+        lines = [ln.rstrip("\r\n") for ln in src if ln.strip()]
+        for i in range(0, len(lines), batch_lines):
+            batch = lines[i : i + batch_lines]
+            data = inference.input_fn("\n".join(batch), content_type)
+            body, _ = inference.output_fn(inference.predict_fn(data, _MODEL), content_type)
+            for inp, out in zip(batch, body.splitlines()):
+                dst.write(_join(inp, out, content_type) + "\n")
+            records += len(batch)
+    return {"input": path, "output": str(out_path), "records": records, "seconds": time.perf_counter() - start}
+
+def run_transform(
+    input_dir: Path,
+    output_dir: Path,
+    model_dir: Path,
+    content_type: str = "text/csv",
+    workers: Optional[int] = None,
+    batch_lines: int = 500,
+) -> List[Dict[str, Any]]:
+    """Transform every file in `input_dir` with a pool of worker processes, one model load per worker."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    files = sorted(str(p) for p in input_dir.iterdir() if p.is_file())
+    if not files:
+        raise ValueError(f"No input files found in {input_dir}")
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(model_dir),)) as pool:
+        futures = [pool.submit(transform_file, f, str(output_dir), content_type, batch_lines) for f in files]
+        return [f.result() for f in futures]
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--input-dir", type=Path, required=True)
+    ap.add_argument("--output-dir", type=Path, required=True)
+    ap.add_argument("--model-dir", type=Path, required=True, help="Directory containing model.pkl")
+    ap.add_argument("--content-type", choices=["text/csv", "application/jsonlines"], default="text/csv")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--batch-lines", type=int, default=500)
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    results = run_transform(args.input_dir, args.output_dir, args.model_dir, args.content_type, args.workers, args.batch_lines)
+    total = sum(r["records"] for r in results)
+    elapsed = time.perf_counter() - start
+    print(f"Transformed {total} records from {len(results)} files in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.0f} records/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import dataclasses
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from elo import EloModel, davidson_wdl_probs, season_year
+from profiling import StepProfiler
+from simulate import _load_model
+
+# Same layout as predict_weekly.py, so backfilled files are drop-in predictions/<gameweek>/ outputs.
+OUTPUT_FIELDS = ["gameweek", "date", "home", "away", "p_home_win", "p_draw", "p_away_win", "r_home", "r_away", "league"]
+OUTPUT_NAME = "wsl_predictions.csv"
+
+def load_history(path: Path) -> pd.DataFrame:
+    """
+    Fixtures/results history: gameweek, date, home, away and, for played rows,
+    home_score/away_score (optionally league). Rows without a gameweek only warm up
+    the ratings. A directory is read as the concatenation of its CSVs.
+    """
+    csvs = sorted(path.glob("*.csv")) if path.is_dir() else [path]
+    if not csvs:
+        raise ValueError(f"No CSV files found in history dir: {path}")
+    df = pd.concat([pd.read_csv(c, dtype={"gameweek": str}) for c in csvs], ignore_index=True)
+    missing = [c for c in ("gameweek", "date", "home", "away") if c not in df.columns]
+    if missing:
+        raise ValueError(f"History is missing columns: {missing}")
+    for c in ("home_score", "away_score"):
+        if c not in df.columns:
+            df[c] = np.nan
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+def check_gameweek_seasons(history: pd.DataFrame) -> None:
+    """
+    Reject gameweek labels whose fixtures fall in more than one season: labels like
+    "GW01" repeat every season, and both seasons would be scored and written as one
+    predictions/<gameweek>/ output. Multi-season histories need season-qualified labels.
+    """
+    gw = history.dropna(subset=["gameweek"])
+    seasons = gw.groupby("gameweek")["date"].agg(lambda ds: sorted({season_year(d) for d in ds}))
+    ambiguous = {label: s for label, s in seasons.items() if len(s) > 1}
+    if ambiguous:
+        listed = ", ".join(f"{label} ({', '.join(map(str, s))})" for label, s in sorted(ambiguous.items()))
+        raise ValueError(f"Gameweek labels span several seasons: {listed}; qualify them with the season (e.g. 2023-24-GW01)")
+
+def gameweek_order(history: pd.DataFrame) -> List[str]:
+    """Gameweek labels ordered by their first fixture date."""
+    check_gameweek_seasons(history)
+    gw = history.dropna(subset=["gameweek"])
+    return gw.groupby("gameweek", sort=False)["date"].min().sort_values(kind="stable").index.tolist()
+
+def select_gameweeks(order: List[str], start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+    """The chronological range start..end (inclusive) of gameweek labels."""
+    for label in (start, end):
+        if label is not None and label not in order:
+            raise ValueError(f"Unknown gameweek: {label!r}")
+    lo = order.index(start) if start else 0
+    hi = order.index(end) if end else len(order) - 1
+    if lo > hi:
+        raise ValueError(f"Gameweek {start} comes after {end}")
+    return order[lo : hi + 1]
+
+def _fresh(model: EloModel) -> EloModel:
+    """The trained model's hyperparameters with no ratings history."""
+    return dataclasses.replace(model, ratings={}, last_played={}, as_of=None)
+
+def backfill_predictions(model: EloModel, history: pd.DataFrame, gameweeks: List[str]) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Replay the history once in date order, yielding (gameweek, predictions) as each
+    requested gameweek starts. A gameweek is scored with the ratings as they stood
+    before its first fixture: results from earlier dates are applied, none of its own.
+    Lazy regression/decay are still evaluated at each fixture's date, as at serving time.
+    """
+    if not hasattr(model, "get_rating"):
+        raise ValueError("Backfill replays Elo ratings; goals models would need a refit per gameweek")
+    check_gameweek_seasons(history)
+    elo = _fresh(model)
+    played = history.dropna(subset=["home_score", "away_score"])
+    results = list(zip(played["home"], played["away"], played["home_score"], played["away_score"], played["date"]))
+    starts = history.dropna(subset=["gameweek"]).groupby("gameweek")["date"].min()
+    by_gameweek = dict(tuple(history[history["gameweek"].isin(gameweeks)].groupby("gameweek", sort=False)))
+
+    i = 0
+    for gw in sorted(gameweeks, key=lambda g: starts[g]):
+        while i < len(results) and results[i][4] < starts[gw]:
+            elo.update_ratings(*results[i][:4], results[i][4])
+            i += 1
+        fx = by_gameweek[gw]
+        r_h = np.array([elo.get_rating(t, d) for t, d in zip(fx["home"], fx["date"])])
+        r_a = np.array([elo.get_rating(t, d) for t, d in zip(fx["away"], fx["date"])])
+        p = davidson_wdl_probs(r_h, r_a, elo.home_adv, elo.nu)
+        yield gw, pd.DataFrame({
+            "gameweek": gw,
+            "date": [d.isoformat() for d in fx["date"]],
+            "home": fx["home"].to_numpy(),
+            "away": fx["away"].to_numpy(),
+            **p,
+            "r_home": r_h,
+            "r_away": r_a,
+            # "" for single-league histories, as in predict_weekly's output.
+            "league": fx["league"].fillna("").astype(str).to_numpy() if "league" in fx.columns else "",
+        })[OUTPUT_FIELDS]
+
+def _write(df: pd.DataFrame, out_dir: Path, gameweek: str) -> int:
+    path = out_dir / gameweek / OUTPUT_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+    return len(df)
+
+def run_backfill(model: Any, history: pd.DataFrame, out_dir: Path, start: Optional[str] = None, end: Optional[str] = None, workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Write predictions/<gameweek>/wsl_predictions.csv for every gameweek in start..end.
+    Each league gets its own replay; writes go to a thread pool while the replay continues.
+    Returns rows written per gameweek.
+    """
+    gameweeks = select_gameweeks(gameweek_order(history), start, end)
+    if hasattr(model, "for_league") and "league" in history.columns:
+        parts = [(model.for_league(str(lg)), h.reset_index(drop=True)) for lg, h in history.groupby("league", sort=True)]
+    else:
+        parts = [(model.for_league(None) if hasattr(model, "for_league") else model, history)]
+
+    frames: Dict[str, List[pd.DataFrame]] = {gw: [] for gw in gameweeks}
+    futures: Dict[str, Future] = {}
+    with ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 1) + 4)) as pool:
+        for i, (m, h) in enumerate(parts):
+            wanted = [gw for gw in gameweeks if (h["gameweek"] == gw).any()]
+            for gw, df in backfill_predictions(m, h, wanted):
+                frames[gw].append(df)
+                # With several leagues a gameweek is complete only after the last league's replay.
+                if i == len(parts) - 1:
+                    futures[gw] = pool.submit(_write, pd.concat(frames.pop(gw), ignore_index=True), out_dir, gw)
+        for gw, fs in frames.items():
+            if fs:
+                futures[gw] = pool.submit(_write, pd.concat(fs, ignore_index=True), out_dir, gw)
+        return {gw: futures[gw].result() for gw in gameweeks if gw in futures}
+
+def main() -> None:
+    processing = Path(os.environ.get("ML_ROOT", "/opt/ml")) / "processing"
+    ap = argparse.ArgumentParser(description="Backfill historical gameweek predictions from one replay of the results history.")
+    ap.add_argument("--model", type=Path, default=processing / "model", help="model.pkl, model.tar.gz or a directory holding either; only its hyperparameters are used")
+    ap.add_argument("--history", type=Path, default=processing / "history", help="History CSV (or a directory of CSVs) with gameweek, date, home, away, home_score, away_score")
+    ap.add_argument("--out-dir", type=Path, default=processing / "predictions")
+    ap.add_argument("--report-dir", type=Path, default=processing / "report", help="backfill.json and profile.json")
+    ap.add_argument("--from-gameweek", default=None, help="First gameweek to backfill (default: earliest)")
+    ap.add_argument("--to-gameweek", default=None, help="Last gameweek to backfill (default: latest)")
+    ap.add_argument("--workers", type=int, default=None, help="Writer threads")
+    args = ap.parse_args()
+    prof = StepProfiler("backfill")
+
+    with prof.phase("load") as ph:
+        history = load_history(args.history)
+        model = _load_model(args.model, args.report_dir / "_model")
+        ph.add_rows(len(history))
+
+    with prof.phase("replay_and_write") as ph:
+        written = run_backfill(model, history, args.out_dir, args.from_gameweek or None, args.to_gameweek or None, args.workers)
+        ph.add_rows(sum(written.values()))
+
+    args.report_dir.mkdir(parents=True, exist_ok=True)
+    with open(args.report_dir / "backfill.json", "w", encoding="utf-8") as f:
+        json.dump({"gameweeks": written, "history_rows": len(history)}, f)
+    prof.write(args.report_dir)
+    print(f"Backfilled {len(written)} gameweeks ({sum(written.values())} predictions) to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
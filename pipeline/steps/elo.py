@@ -1,8 +1,19 @@
 from __future__ import annotations
 
-import math
 from dataclasses import dataclass, field
-from typing import Dict
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple, TypeVar
+
+# numpy is only a type here: the prediction Lambda unpickles EloModel without it.
+if TYPE_CHECKING:
+    import numpy as np
+
+# A single rating, or an array of them (e.g. one per simulated season).
+Rating = TypeVar("Rating", float, "np.ndarray")
+
+# Month in which a new season starts: WSL seasons kick off in September, but
+# August fixtures (early starts, pre-season) already belong to the new season.
+SEASON_START_MONTH = 8
 
 def expected_score(r_home: float, r_away: float, home_adv: float = 100.0) -> float:
     """Standard Elo expected score for the home team.
@@ -11,7 +22,7 @@ The +home_adv shifts the home team's effective rating.
 """
     return 1.0 / (1.0 + 10.0 ** ((r_away - (r_home + home_adv)) / 400.0))
 
-def davidson_wdl_probs(r_home: float, r_away: float, home_adv: float = 100.0, nu: float = 0.15) -> Dict[str, float]:
+def davidson_wdl_probs(r_home: Rating, r_away: Rating, home_adv: float = 100.0, nu: float = 0.15) -> Dict[str, Rating]:
     """Davidson model (Bradley–Terry with ties).
 
 Let a_i be team strength. For ratings, use a=10^(r/400).
@@ -20,16 +31,29 @@ P(away) = a_a / (a_h + a_a + 2*nu*sqrt(a_h*a_a))
 P(draw) = 2*nu*sqrt(a_h*a_a) / denom
 
 home_adv is applied as rating boost to home team.
+Ratings may also be numpy arrays (e.g. one entry per simulated season).
 """
     a_h = 10.0 ** ((r_home + home_adv) / 400.0)
     a_a = 10.0 ** (r_away / 400.0)
-    tie = 2.0 * max(nu, 0.0) * math.sqrt(a_h * a_a)
+    tie = 2.0 * max(nu, 0.0) * (a_h * a_a) ** 0.5
     denom = a_h + a_a + tie
     p_home = a_h / denom
     p_away = a_a / denom
     p_draw = tie / denom
     return {"p_home_win": p_home, "p_draw": p_draw, "p_away_win": p_away}
 
+def to_date(when: Any) -> Optional[date]:
+    """date/datetime/pandas Timestamp/ISO string -> date (None passes through)."""
+    if when is None or (isinstance(when, date) and not isinstance(when, datetime)):
+        return when
+    if isinstance(when, datetime):
+        return when.date()
+    return date.fromisoformat(str(when)[:10])
+
+def season_year(d: date, start_month: int = SEASON_START_MONTH) -> int:
+    """Calendar year in which the season containing `d` started."""
+    return d.year if d.month >= start_month else d.year - 1
+
 @dataclass
 class EloModel:
     initial_rating: float = 1500.0
@@ -37,13 +61,44 @@ class EloModel:
     home_adv: float = 100.0
     nu: float = 0.15
     ratings: Dict[str, float] = field(default_factory=dict)
+    # Fraction of each team's deviation from initial_rating removed per season boundary crossed.
+    season_regression: float = 0.0
+    # Half-life (days) of the deviation while a team doesn't play; None disables decay.
+    decay_half_life_days: Optional[float] = None
+    # Month in which a new season starts (see SEASON_START_MONTH).
+    season_start_month: int = SEASON_START_MONTH
+    # Date of each team's last rating update, and of the latest match seen.
+    last_played: Dict[str, date] = field(default_factory=dict)
+    as_of: Optional[date] = None
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # Models pickled before time-aware ratings existed lack the newer fields.
+        self.__dict__.update({"season_regression": 0.0, "decay_half_life_days": None, "season_start_month": SEASON_START_MONTH, "last_played": {}, "as_of": None, **state})
 
-    def get_rating(self, team: str) -> float:
-        return float(self.ratings.get(team, self.initial_rating))
+    def _season(self, d: date) -> int:
+        return season_year(d, self.season_start_month)
 
-    def update_ratings(self, home_team: str, away_team: str, home_score: int, away_score: int) -> None:
-        r_h = self.get_rating(home_team)
-        r_a = self.get_rating(away_team)
+    def get_rating(self, team: str, when: Any = None) -> float:
+        """
+        Rating of `team` as of `when`. Regression and decay are applied lazily from
+        the team's last update date, so no per-date sweep over all teams is needed.
+        """
+        r = float(self.ratings.get(team, self.initial_rating))
+        when = to_date(when)
+        last = self.last_played.get(team)
+        if when is None or last is None or when <= last:
+            return r
+        dev = r - self.initial_rating
+        if self.season_regression:
+            dev *= (1.0 - self.season_regression) ** (self._season(when) - self._season(last))
+        if self.decay_half_life_days:
+            dev *= 0.5 ** ((when - last).days / self.decay_half_life_days)
+        return self.initial_rating + dev
+
+    def update_ratings(self, home_team: str, away_team: str, home_score: int, away_score: int, when: Any = None) -> None:
+        when = to_date(when)
+        r_h = self.get_rating(home_team, when)
+        r_a = self.get_rating(away_team, when)
 
         exp_h = expected_score(r_h, r_a, self.home_adv)
         exp_a = 1.0 - exp_h
@@ -57,10 +112,22 @@ class EloModel:
 
         self.ratings[home_team] = r_h + self.K * (act_h - exp_h)
         self.ratings[away_team] = r_a + self.K * (act_a - exp_a)
+        if when is not None:
+            self.last_played[home_team] = when
+            self.last_played[away_team] = when
+            if self.as_of is None or when > self.as_of:
+                self.as_of = when
+
+    def replay(self, matches: Iterable[Tuple[str, str, int, int, Any]]) -> "EloModel":
+        """Apply (home, away, home_score, away_score, date) results in order; O(1) per match."""
+        for home, away, hs, as_, when in matches:
+            self.update_ratings(home, away, int(hs), int(as_), when)
+        return self
 
-    def predict(self, home_team: str, away_team: str) -> Dict[str, float]:
-        r_h = self.get_rating(home_team)
-        r_a = self.get_rating(away_team)
+    def predict(self, home_team: str, away_team: str, when: Any = None) -> Dict[str, float]:
+        when = to_date(when) or self.as_of
+        r_h = self.get_rating(home_team, when)
+        r_a = self.get_rating(away_team, when)
         probs = davidson_wdl_probs(r_h, r_a, self.home_adv, self.nu)
         probs["r_home"] = r_h
         probs["r_away"] = r_a
@@ -1,14 +1,16 @@
 import argparse
 import json
+import os
 import tarfile
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Optional
 
 import numpy as np
 import pandas as pd
 
-from train import brier_score
-from elo import EloModel
+from train import iter_matches, brier_score
+from leagues import LeagueModels, load_partitioned, map_leagues, weighted_mean
+from profiling import StepProfiler
 
 def log_loss(pred_df: pd.DataFrame, actual_df: pd.DataFrame) -> float:
     eps = 1e-15
@@ -33,18 +35,34 @@ def accuracy(pred_df: pd.DataFrame, actual_df: pd.DataFrame) -> float:
             actual_idx.append(2)
     return float((pred_idx == np.array(actual_idx)).mean())
 
-def evaluate_model(model: EloModel, test_df: pd.DataFrame) -> Dict[str, float]:
-    preds = []
-    for _, r in test_df.iterrows():
-        preds.append(model.predict(r["Home"], r["Away"]))
-        model.update_ratings(r["Home"], r["Away"], int(r["Home_Team_Score"]), int(r["Away_Team_Score"]))
-    pred_df = pd.DataFrame(preds)
+def evaluate_model(model: Any, test_df: pd.DataFrame) -> Dict[str, float]:
+    test_df = test_df.reset_index(drop=True)
+    if hasattr(model, "predict_batch"):
+        # Goals models are static between fits: score the whole test split in one call.
+        pred_df = pd.DataFrame(model.predict_batch(test_df["Home"], test_df["Away"]))
+    else:
+        preds = []
+        for home, away, hs, as_, when in iter_matches(test_df):
+            preds.append(model.predict(home, away, when))
+            model.update_ratings(home, away, int(hs), int(as_), when)
+        pred_df = pd.DataFrame(preds)
     return {
         "test_brier": float(brier_score(pred_df, test_df)),
         "test_log_loss": float(log_loss(pred_df, test_df)),
         "accuracy": float(accuracy(pred_df, test_df)),
     }
 
+def evaluate_leagues(model: LeagueModels, test_parts: Dict[str, pd.DataFrame], workers: Optional[int] = None) -> Dict[str, Any]:
+    """Evaluate every league's model on its own test rows in a worker pool; row-weighted overall metrics."""
+    missing = sorted(set(test_parts) - set(model.models))
+    if missing:
+        raise ValueError(f"No model for leagues in the test split: {missing}")
+    per_league = map_leagues(evaluate_model, {lg: (model.models[lg], df) for lg, df in test_parts.items()}, workers)
+    weights = {lg: len(test_parts[lg]) for lg in per_league}
+    overall: Dict[str, Any] = {k: weighted_mean(per_league, weights, k) for k in ("test_brier", "test_log_loss", "accuracy")}
+    overall["leagues"] = per_league
+    return overall
+
 def _extract_model(model_tar: Path, out_dir: Path) -> Path:
     out_dir.mkdir(parents=True, exist_ok=True)
     with tarfile.open(model_tar, "r:gz") as tf:
@@ -55,26 +73,42 @@ def _extract_model(model_tar: Path, out_dir: Path) -> Path:
     return pkl
 
 def main() -> None:
-    model_input = Path("/opt/ml/processing/model")
-    test_input = Path("/opt/ml/processing/test")
-    out_dir = Path("/opt/ml/processing/evaluation")
-    out_dir.mkdir(parents=True, exist_ok=True)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cache-key", default="", help="Code/input hash for pipeline step caching; not used by the step.")
+    ap.add_argument("--workers", type=int, default=None, help="Processes for multi-league evaluation (default: one per CPU)")
+    args = ap.parse_args()
+    prof = StepProfiler("evaluate")
 
-    model_tar = next(model_input.glob("*.tar.gz"))
-    extracted_dir = out_dir / "_model"
-    model_pkl = _extract_model(model_tar, extracted_dir)
+    processing = Path(os.environ.get("ML_ROOT", "/opt/ml")) / "processing"
+    model_input = processing / "model"
+    test_input = processing / "test"
+    out_dir = processing / "evaluation"
+    out_dir.mkdir(parents=True, exist_ok=True)
 
     import pickle
-    with open(model_pkl, "rb") as f:
-        model = pickle.load(f)
+    with prof.phase("load") as ph:
+        model_tar = next(model_input.glob("*.tar.gz"))
+        extracted_dir = out_dir / "_model"
+        model_pkl = _extract_model(model_tar, extracted_dir)
+        with open(model_pkl, "rb") as f:
+            model = pickle.load(f)
 
-    test_csv = next(test_input.glob("*.csv"))
-    test_df = pd.read_csv(test_csv)
+        test_parts = load_partitioned(test_input)
+        rows = sum(map(len, test_parts.values()))
+        ph.add_rows(rows)
 
-    metrics = evaluate_model(model, test_df)
+    # evaluate_model interleaves predict (score) and update (replay) per match.
+    with prof.phase("score") as ph:
+        if isinstance(model, LeagueModels):
+            metrics = evaluate_leagues(model, test_parts, args.workers)
+        else:
+            metrics = evaluate_model(model, pd.concat(test_parts.values(), ignore_index=True))
+        ph.add_rows(rows)
 
-    with open(out_dir / "evaluation.json", "w", encoding="utf-8") as f:
-        json.dump(metrics, f)
+    with prof.phase("write"):
+        with open(out_dir / "evaluation.json", "w", encoding="utf-8") as f:
+            json.dump(metrics, f)
+    prof.write(out_dir)
 
 if __name__ == "__main__":
     main()
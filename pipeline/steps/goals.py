@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.optimize import minimize
+except ImportError:  # pragma: no cover - the SageMaker sklearn image ships scipy
+    minimize = None
+
+def _log_factorials(n: int) -> np.ndarray:
+    return np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, n)))])
+
+def poisson_nll(
+    params: np.ndarray,
+    home_idx: np.ndarray,
+    away_idx: np.ndarray,
+    y_home: np.ndarray,
+    y_away: np.ndarray,
+    n_teams: int,
+    l2: float = 0.01,
+) -> Tuple[float, np.ndarray]:
+    """Mean Poisson negative log-likelihood (up to a constant) and its gradient.
+
+params = [attack (n_teams), defence (n_teams), mu, home_adv], all on the log-goals scale:
+log lambda_home = mu + home_adv + attack[h] - defence[a]
+log lambda_away = mu + attack[a] - defence[h]
+
+Targets may be non-integer (goals blended with xG). The L2 term on attack/defence
+pins down the otherwise unidentified level and shrinks teams with few matches.
+"""
+    att, dfn = params[:n_teams], params[n_teams : 2 * n_teams]
+    mu, home = params[2 * n_teams], params[2 * n_teams + 1]
+    n = len(y_home)
+
+    log_lh = mu + home + att[home_idx] - dfn[away_idx]
+    log_la = mu + att[away_idx] - dfn[home_idx]
+    lh, la = np.exp(log_lh), np.exp(log_la)
+    nll = (np.sum(lh - y_home * log_lh) + np.sum(la - y_away * log_la)) / n + l2 * (att @ att + dfn @ dfn)
+
+    # d nll / d log(lambda) is (lambda - y) for each side.
+    rh, ra = (lh - y_home) / n, (la - y_away) / n
+    g_att = np.bincount(home_idx, rh, n_teams) + np.bincount(away_idx, ra, n_teams) + 2.0 * l2 * att
+    g_def = -np.bincount(away_idx, rh, n_teams) - np.bincount(home_idx, ra, n_teams) + 2.0 * l2 * dfn
+    grad = np.concatenate([g_att, g_def, [rh.sum() + ra.sum(), rh.sum()]])
+    return float(nll), grad
+
+def _minimize(fun, x0: np.ndarray, max_iter: int = 5000, tol: float = 1e-8) -> np.ndarray:
+    if minimize is not None:
+        return minimize(fun, x0, jac=True, method="L-BFGS-B", options={"maxiter": max_iter}).x
+    # Adam fallback; the objective is convex, so this converges to the same optimum.
+    x, m, v = x0.copy(), np.zeros_like(x0), np.zeros_like(x0)
+    b1, b2, lr = 0.9, 0.999, 0.05
+    for t in range(1, max_iter + 1):
+        _, g = fun(x)
+        if np.max(np.abs(g)) < tol:
+            break
+        m = b1 * m + (1 - b1) * g
+        v = b2 * v + (1 - b2) * g * g
+        x -= lr * (m / (1 - b1**t)) / (np.sqrt(v / (1 - b2**t)) + 1e-12)
+    return x
+
+def dixon_coles_tau(x: np.ndarray, y: np.ndarray, lh: np.ndarray, la: np.ndarray, rho: np.ndarray) -> np.ndarray:
+    """Dixon–Coles low-score correction, broadcast over matches and candidate rho values."""
+    tau = np.ones(np.broadcast(x, lh, rho).shape)
+    tau = np.where((x == 0) & (y == 0), 1.0 - lh * la * rho, tau)
+    tau = np.where((x == 0) & (y == 1), 1.0 + lh * rho, tau)
+    tau = np.where((x == 1) & (y == 0), 1.0 + la * rho, tau)
+    tau = np.where((x == 1) & (y == 1), 1.0 - rho, tau)
+    return tau
+
+def fit_rho(x: np.ndarray, y: np.ndarray, lh: np.ndarray, la: np.ndarray, grid: Optional[np.ndarray] = None) -> float:
+    """Profile-likelihood estimate of rho over a grid, evaluated for all matches at once."""
+    grid = np.linspace(-0.3, 0.3, 121) if grid is None else grid
+    tau = dixon_coles_tau(x[None, :], y[None, :], lh[None, :], la[None, :], grid[:, None])
+    ll = np.where((tau > 0).all(axis=1), np.log(np.clip(tau, 1e-12, None)).sum(axis=1), -np.inf)
+    return float(grid[int(np.argmax(ll))])
+
+def scoreline_matrix(lh: np.ndarray, la: np.ndarray, rho: float = 0.0, max_goals: int = 10) -> np.ndarray:
+    """P(home=i, away=j) for every fixture, shape (fixtures, max_goals, max_goals), renormalised for truncation."""
+    lh, la = np.asarray(lh, dtype=float), np.asarray(la, dtype=float)
+    k = np.arange(max_goals)
+    lf = _log_factorials(max_goals)
+    ph = np.exp(k * np.log(lh)[:, None] - lh[:, None] - lf)
+    pa = np.exp(k * np.log(la)[:, None] - la[:, None] - lf)
+    m = ph[:, :, None] * pa[:, None, :]
+    if rho:
+        m[:, 0, 0] *= 1.0 - lh * la * rho
+        m[:, 0, 1] *= 1.0 + lh * rho
+        m[:, 1, 0] *= 1.0 + la * rho
+        m[:, 1, 1] *= 1.0 - rho
+    return m / m.sum(axis=(1, 2), keepdims=True)
+
+def outcome_probs(m: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Home win / draw / away win from scoreline matrices (rows are home goals)."""
+    return np.tril(m, -1).sum(axis=(1, 2)), np.einsum("nii->n", m), np.triu(m, 1).sum(axis=(1, 2))
+
+@dataclass
+class GoalsModel:
+    """Poisson goals model with optional Dixon–Coles correction, fitted on goals blended with xG."""
+
+    max_goals: int = 10
+    l2: float = 0.01
+    xg_weight: float = 0.0
+    dixon_coles: bool = True
+    teams: Dict[str, int] = field(default_factory=dict)
+    attack: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    defence: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    mu: float = 0.0
+    home_adv: float = 0.0
+    rho: float = 0.0
+
+    def _index(self, teams: Sequence[str]) -> np.ndarray:
+        # Unknown teams map to the trailing zero slot (league-average strength).
+        return np.array([self.teams.get(t, len(self.teams)) for t in teams], dtype=int)
+
+    def fit(self, df: pd.DataFrame) -> "GoalsModel":
+        names = pd.unique(pd.concat([df["Home"], df["Away"]], ignore_index=True))
+        self.teams = {t: i for i, t in enumerate(names)}
+        n = len(self.teams)
+        h, a = self._index(df["Home"]), self._index(df["Away"])
+        goals_h = df["Home_Team_Score"].to_numpy(dtype=float)
+        goals_a = df["Away_Team_Score"].to_numpy(dtype=float)
+
+        y_h, y_a = goals_h, goals_a
+        if self.xg_weight > 0 and {"Home_Team_xG", "Away_Team_xG"} <= set(df.columns):
+            xg_h = df["Home_Team_xG"].to_numpy(dtype=float)
+            xg_a = df["Away_Team_xG"].to_numpy(dtype=float)
+            w = self.xg_weight
+            y_h = (1 - w) * goals_h + w * np.where(np.isnan(xg_h), goals_h, xg_h)
+            y_a = (1 - w) * goals_a + w * np.where(np.isnan(xg_a), goals_a, xg_a)
+
+        x0 = np.zeros(2 * n + 2)
+        x0[2 * n] = np.log(max((y_h.mean() + y_a.mean()) / 2.0, 1e-3))
+        params = _minimize(lambda p: poisson_nll(p, h, a, y_h, y_a, n, self.l2), x0)
+
+        self.attack = np.append(params[:n], 0.0)
+        self.defence = np.append(params[n : 2 * n], 0.0)
+        self.mu, self.home_adv = float(params[2 * n]), float(params[2 * n + 1])
+        if self.dixon_coles:
+            lh, la = self.expected_goals(df["Home"], df["Away"])
+            self.rho = fit_rho(goals_h, goals_a, lh, la)
+        return self
+
+    def expected_goals(self, home_teams: Sequence[str], away_teams: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        h, a = self._index(home_teams), self._index(away_teams)
+        lh = np.exp(self.mu + self.home_adv + self.attack[h] - self.defence[a])
+        la = np.exp(self.mu + self.attack[a] - self.defence[h])
+        return lh, la
+
+    def scorelines(self, home_teams: Sequence[str], away_teams: Sequence[str]) -> np.ndarray:
+        lh, la = self.expected_goals(home_teams, away_teams)
+        return scoreline_matrix(lh, la, self.rho, self.max_goals)
+
+    def predict_batch(self, home_teams: Sequence[str], away_teams: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Same keys as EloModel.predict, as arrays. r_home/r_away are net strengths
+        (attack + defence, log-goals scale) rather than Elo ratings.
+        """
+        lh, la = self.expected_goals(home_teams, away_teams)
+        p_home, p_draw, p_away = outcome_probs(scoreline_matrix(lh, la, self.rho, self.max_goals))
+        h, a = self._index(home_teams), self._index(away_teams)
+        return {
+            "p_home_win": p_home,
+            "p_draw": p_draw,
+            "p_away_win": p_away,
+            "r_home": self.attack[h] + self.defence[h],
+            "r_away": self.attack[a] + self.defence[a],
+            "exp_home_goals": lh,
+            "exp_away_goals": la,
+        }
+
+    def predict(self, home_team: str, away_team: str) -> Dict[str, float]:
+        return {k: float(v[0]) for k, v in self.predict_batch([home_team], [away_team]).items()}
+
+    def predict_records(self, home_teams: Sequence[str], away_teams: Sequence[str]) -> List[Dict[str, float]]:
+        cols = self.predict_batch(home_teams, away_teams)
+        return [dict(zip(cols, map(float, vals))) for vals in zip(*cols.values())]
@@ -1,22 +1,111 @@
+import csv
+import hashlib
+import io
 import json
+import os
 import pickle
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from live_ratings import RESULTS_CONTENT_TYPE, LiveModel, ResultsUpdate, SnapshotStore, parse_results_update
+
+# Column order of headerless fixture rows in text/csv batches (Batch Transform splits by line).
+# Multi-league models also read an optional trailing "league" column.
+FIXTURE_COLUMNS = ["gameweek", "date", "home", "away"]
+PREDICTION_COLUMNS = ["p_home_win", "p_draw", "p_away_win", "r_home", "r_away"]
+
+# HMAC key for rating updates, resolved by model_fn from the Secrets Manager secret
+# named in WSL_RATINGS_UPDATE_SECRET_ARN (the value itself is never in the environment).
+_update_secret: Optional[str] = None
+
+def _secret_value(secret_arn: str) -> str:
+    import boto3
+
+    return boto3.client("secretsmanager").get_secret_value(SecretId=secret_arn)["SecretString"]
 
 def model_fn(model_dir: str) -> Any:
+    global _update_secret
     with open(f"{model_dir}/model.pkl", "rb") as f:
-        return pickle.load(f)
+        body = f.read()
+    model = pickle.loads(body)
+    # With an update secret the model is served through a LiveModel, which accepts
+    # signed results (RESULTS_CONTENT_TYPE) and hot-swaps rating snapshots.
+    secret_arn = os.environ.get("WSL_RATINGS_UPDATE_SECRET_ARN")
+    _update_secret = _secret_value(secret_arn) if secret_arn else None
+    if not _update_secret:
+        return model
+    uri = os.environ.get("WSL_RATINGS_SNAPSHOT_URI")
+    store = SnapshotStore(uri, hashlib.sha256(body).hexdigest()[:16]) if uri else None
+    return LiveModel(model, store, persist_every_s=float(os.environ.get("WSL_RATINGS_PERSIST_EVERY_S", "300")))
+
+def _parse_csv(request_body: str) -> List[Optional[Dict[str, Optional[str]]]]:
+    """
+    Fixture rows -> request dicts. A header row maps to None so the output keeps
+    one line per input line (needed for Batch Transform's join_source="Input").
+    """
+    records: List[Optional[Dict[str, Optional[str]]]] = []
+    for row in csv.reader(io.StringIO(request_body)):
+        if not row:
+            continue
+        if "home" in row and "away" in row:
+            records.append(None)
+            continue
+        fx = dict(zip(FIXTURE_COLUMNS + ["league"], row))
+        records.append({"home_team": fx["home"], "away_team": fx["away"], "date": fx.get("date"), "league": fx.get("league")})
+    return records
 
-def input_fn(request_body: str, content_type: str) -> Any:
-    if content_type != "application/json":
-        raise ValueError(f"Unsupported content type: {content_type}")
-    return json.loads(request_body)
+def input_fn(request_body: Any, content_type: str) -> Any:
+    if isinstance(request_body, (bytes, bytearray)):
+        request_body = request_body.decode("utf-8")
+    if content_type == "application/json":
+        return json.loads(request_body)
+    if content_type == "application/jsonlines":
+        return [json.loads(line) for line in request_body.splitlines() if line.strip()]
+    if content_type == "text/csv":
+        return _parse_csv(request_body)
+    if content_type == RESULTS_CONTENT_TYPE:
+        return parse_results_update(request_body, _update_secret)
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+def _predict_one(d: Dict[str, Any], model: Any) -> Dict[str, float]:
+    if hasattr(model, "for_league"):
+        return model.predict(d["home_team"], d["away_team"], d.get("date") or None, d.get("league"))
+    # Fixture dates let time-aware Elo models apply off-season regression/decay.
+    if d.get("date") and hasattr(model, "get_rating"):
+        return model.predict(d["home_team"], d["away_team"], d["date"])
+    return model.predict(d["home_team"], d["away_team"])
 
 def predict_fn(input_data: Any, model: Any) -> Any:
+    if isinstance(input_data, ResultsUpdate):
+        if not isinstance(model, LiveModel):
+            raise PermissionError("Rating updates are disabled for this model")
+        return model.apply(input_data)
+    if isinstance(model, LiveModel):
+        # One snapshot per request: a concurrent update can't change ratings mid-batch.
+        model = model.snapshot.model
+    if isinstance(input_data, list) and hasattr(model, "predict_records"):
+        # Vectorised models score the whole batch in one call; header rows stay None.
+        rows = [d for d in input_data if d is not None]
+        preds = iter(model.predict_records([d["home_team"] for d in rows], [d["away_team"] for d in rows]))
+        return [next(preds) if d is not None else None for d in input_data]
     if isinstance(input_data, list):
-        return [model.predict(d["home_team"], d["away_team"]) for d in input_data]
-    return model.predict(input_data["home_team"], input_data["away_team"])
+        return [_predict_one(d, model) if d is not None else None for d in input_data]
+    return _predict_one(input_data, model)
+
+def _csv(rows: List[List[Any]]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
 
 def output_fn(prediction: Any, accept: str) -> Tuple[str, str]:
-    if accept != "application/json":
-        raise ValueError(f"Unsupported accept: {accept}")
-    return json.dumps(prediction), accept
+    if accept == "application/json":
+        return json.dumps(prediction), accept
+    if accept == "application/jsonlines":
+        preds = prediction if isinstance(prediction, list) else [prediction]
+        return "".join(json.dumps(p) + "\n" for p in preds), accept
+    if accept == "text/csv":
+        if isinstance(prediction, dict) and "p_home_win" not in prediction:
+            # A rating-update summary from LiveModel.apply: header and one row.
+            return _csv([list(prediction), list(prediction.values())]), accept
+        preds = prediction if isinstance(prediction, list) else [prediction]
+        return _csv([PREDICTION_COLUMNS if p is None else [p[c] for c in PREDICTION_COLUMNS] for p in preds]), accept
+    raise ValueError(f"Unsupported accept: {accept}")
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+# pandas is imported lazily: the prediction Lambda unpickles LeagueModels without it.
+if TYPE_CHECKING:
+    import pandas as pd
+
+LEAGUE_COLUMN = "League"
+
+@dataclass
+class LeagueModels:
+    """One artifact holding an independently trained model per league."""
+
+    models: Dict[str, Any] = field(default_factory=dict)
+    # Used for requests without a league (e.g. single-league fixture files).
+    default_league: Optional[str] = None
+
+    def for_league(self, league: Optional[str]) -> Any:
+        league = league or self.default_league
+        if league is None and len(self.models) == 1:
+            league = next(iter(self.models))
+        if league not in self.models:
+            raise ValueError(f"Unknown league: {league!r} (have {sorted(self.models)})")
+        return self.models[league]
+
+    def predict(self, home_team: str, away_team: str, when: Any = None, league: Optional[str] = None) -> Dict[str, float]:
+        model = self.for_league(league)
+        if when is not None and hasattr(model, "get_rating"):
+            return model.predict(home_team, away_team, when)
+        return model.predict(home_team, away_team)
+
+def split_by_league(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """League -> rows, in the original order. Frames without a League column are a single "" league."""
+    if LEAGUE_COLUMN not in df.columns:
+        return {"": df}
+    # Reset the index: metrics align predictions and actuals by position.
+    return {str(k): g.reset_index(drop=True) for k, g in df.groupby(LEAGUE_COLUMN, sort=True)}
+
+def load_partitioned(channel_dir: Path) -> Dict[str, pd.DataFrame]:
+    """
+    Read a channel as per-league frames. Either per-league partitions
+    (`<channel>/<league>/*.csv`) or CSVs with a League column.
+    """
+    import pandas as pd
+
+    subdirs = sorted(p for p in channel_dir.iterdir() if p.is_dir() and list(p.glob("*.csv")))
+    if subdirs:
+        return {d.name: pd.concat([pd.read_csv(c) for c in sorted(d.glob("*.csv"))], ignore_index=True) for d in subdirs}
+    csvs = sorted(channel_dir.glob("*.csv"))
+    if not csvs:
+        raise ValueError(f"No CSV files found in channel dir: {channel_dir}")
+    return split_by_league(pd.concat([pd.read_csv(c) for c in csvs], ignore_index=True))
+
+def map_leagues(fn: Callable[..., Any], jobs: Dict[str, Tuple[Any, ...]], workers: Optional[int] = None) -> Dict[str, Any]:
+    """Run fn(*args) per league in a process pool (in-process for a single league)."""
+    if len(jobs) <= 1 or workers == 1:
+        return {league: fn(*args) for league, args in jobs.items()}
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {league: pool.submit(fn, *args) for league, args in jobs.items()}
+        return {league: f.result() for league, f in futures.items()}
+
+def weighted_mean(per_league: Dict[str, Dict[str, float]], weights: Dict[str, int], key: str) -> float:
+    total = sum(weights.values())
+    return float(sum(per_league[lg][key] * weights[lg] for lg in per_league) / total) if total else float("nan")
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import hmac
+import json
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import urlparse
+
+RESULTS_CONTENT_TYPE = "application/vnd.wsl.results+json"
+
+MatchKey = Tuple[str, str, str, str]
+
+def sign_results(results: List[Dict[str, Any]], secret: str) -> str:
+    """HMAC-SHA256 over the canonical JSON of the results list (what update clients send as `signature`)."""
+    body = json.dumps(results, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+@dataclass
+class ResultsUpdate:
+    """A verified batch of results for LiveModel.apply (input_fn output for RESULTS_CONTENT_TYPE)."""
+
+    results: List[Dict[str, Any]]
+    persist: bool = False
+
+def parse_results_update(body: str, secret: Optional[str]) -> ResultsUpdate:
+    """
+    Parse and authenticate `{"results": [...], "signature": "<hex>", "persist": false}`.
+    Each result has home_team, away_team, home_score, away_score, date and optionally league.
+    """
+    if not secret:
+        raise PermissionError("Rating updates are disabled (WSL_RATINGS_UPDATE_SECRET_ARN is not set)")
+    payload = json.loads(body)
+    results = payload.get("results")
+    if not isinstance(results, list):
+        raise ValueError("Results update needs a 'results' list")
+    if not hmac.compare_digest(sign_results(results, secret), str(payload.get("signature", ""))):
+        raise PermissionError("Invalid results update signature")
+    for r in results:
+        missing = [k for k in ("home_team", "away_team", "home_score", "away_score", "date") if r.get(k) in (None, "")]
+        if missing:
+            raise ValueError(f"Result is missing fields {missing}: {r}")
+    return ResultsUpdate(results=results, persist=bool(payload.get("persist")))
+
+@dataclass(frozen=True)
+class RatingsSnapshot:
+    """
+    A published model state. Never mutated after publication: updates build a new
+    snapshot from a copy, so a request that read `LiveModel.snapshot` once scores
+    every fixture against the same ratings.
+    """
+
+    version: int
+    model: Any
+    # (date, home, away, league) of every result applied since the trained artifact.
+    applied: FrozenSet[MatchKey] = field(default_factory=frozenset)
+
+class SnapshotStore:
+    """
+    Versioned snapshots under `<uri>/<fingerprint>/v<version>.pkl` plus a `latest.json`
+    pointer, in S3 (s3://bucket/prefix) or a local directory. The fingerprint is the
+    trained artifact's hash, so a redeployed model never resumes another model's updates.
+    """
+
+    def __init__(self, uri: str, fingerprint: str, s3: Any = None) -> None:
+        p = urlparse(uri)
+        self.bucket = p.netloc if p.scheme == "s3" else None
+        self.prefix = f"{p.path.strip('/') if self.bucket else uri.rstrip('/')}/{fingerprint}"
+        if self.bucket and s3 is None:
+            import boto3
+
+            s3 = boto3.client("s3")
+        self.s3 = s3
+
+    def _put(self, name: str, body: bytes) -> None:
+        if self.bucket:
+            self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}/{name}", Body=body)
+            return
+        path = Path(self.prefix) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(body)
+        tmp.replace(path)
+
+    def _get(self, name: str) -> Optional[bytes]:
+        if self.bucket:
+            from botocore.exceptions import ClientError
+
+            try:
+                return self.s3.get_object(Bucket=self.bucket, Key=f"{self.prefix}/{name}")["Body"].read()
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                    return None
+                raise
+        path = Path(self.prefix) / name
+        return path.read_bytes() if path.exists() else None
+
+    def save(self, snap: RatingsSnapshot) -> str:
+        name = f"v{snap.version:08d}.pkl"
+        self._put(name, pickle.dumps(snap))
+        # The pointer is written last, so readers never see a version whose body is missing.
+        self._put("latest.json", json.dumps({"version": snap.version, "snapshot": name}).encode("utf-8"))
+        return name
+
+    def load_latest(self) -> Optional[RatingsSnapshot]:
+        pointer = self._get("latest.json")
+        if pointer is None:
+            return None
+        body = self._get(json.loads(pointer)["snapshot"])
+        return pickle.loads(body) if body is not None else None
+
+class LiveModel:
+    """
+    Serving wrapper that lets results be folded into a loaded Elo model between retrains.
+
+    Readers take `snapshot` once per request without locking; `apply` copies the
+    current model, replays the new results with `update_ratings`, and publishes the
+    copy by rebinding `snapshot` (a single reference assignment, so the swap is
+    atomic). Writers are serialised by a lock. Snapshots are persisted to the store
+    every `persist_every_s` seconds of updates, or when an update asks for it.
+
+    The live state belongs to one process: endpoints serving a LiveModel must run a
+    single instance with a single model server worker (deploy_endpoint does both),
+    otherwise updates reach only the instance that received them.
+    """
+
+    def __init__(self, model: Any, store: Optional[SnapshotStore] = None, persist_every_s: float = 300.0) -> None:
+        self.store = store
+        self.persist_every_s = persist_every_s
+        self._lock = threading.Lock()
+        self._persisted_version = 0
+        self._persisted_at = time.monotonic()
+        resumed = store.load_latest() if store is not None else None
+        self.snapshot: RatingsSnapshot = resumed or RatingsSnapshot(version=0, model=model)
+        if resumed is not None:
+            self._persisted_version = resumed.version
+
+    @property
+    def model(self) -> Any:
+        return self.snapshot.model
+
+    def apply(self, update: ResultsUpdate) -> Dict[str, Any]:
+        with self._lock:
+            current = self.snapshot
+            model = copy.deepcopy(current.model)
+            applied = set(current.applied)
+            new = 0
+            # Chronological order, as EloModel.replay expects.
+            for r in sorted(update.results, key=lambda r: str(r["date"])[:10]):
+                key = (str(r["date"])[:10], r["home_team"], r["away_team"], r.get("league") or "")
+                if key in applied:
+                    continue
+                target = model.for_league(r.get("league")) if hasattr(model, "for_league") else model
+                if not hasattr(target, "update_ratings"):
+                    raise ValueError("Online rating updates need an Elo model")
+                target.update_ratings(r["home_team"], r["away_team"], int(r["home_score"]), int(r["away_score"]), r["date"])
+                applied.add(key)
+                new += 1
+            if new:
+                self.snapshot = RatingsSnapshot(version=current.version + 1, model=model, applied=frozenset(applied))
+            persisted = self._maybe_persist(force=update.persist)
+            return {"version": self.snapshot.version, "applied": new, "skipped": len(update.results) - new, "persisted": persisted}
+
+    def _maybe_persist(self, force: bool = False) -> bool:
+        snap = self.snapshot
+        if self.store is None or snap.version == self._persisted_version:
+            return False
+        if not force and time.monotonic() - self._persisted_at < self.persist_every_s:
+            return False
+        self.store.save(snap)
+        self._persisted_version = snap.version
+        self._persisted_at = time.monotonic()
+        return True
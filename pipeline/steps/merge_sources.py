@@ -0,0 +1,202 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from leagues import LEAGUE_COLUMN
+
+KEY_COLUMNS = ["Date", "Home", "Away"]
+CONFLICT_COLUMNS = ["Home_Team_Score", "Away_Team_Score"]
+SOURCE_COLUMN = "_source"
+
+# Club suffixes scrapes disagree on ("Chelsea FC" vs "Chelsea").
+_CLUB_SUFFIX = re.compile(r"(\s+fc)+$")
+# Plus gender suffixes ("Chelsea FC Women", "Brighton WFC"); only dropped when every
+# source is women's football, otherwise the men's and women's fixtures would merge.
+_WOMENS_SUFFIX = re.compile(r"(\s+(women|ladies|wfc|lfc|fc|w))+$")
+
+def normalize_team(name: str, aliases: Optional[Dict[str, str]] = None, womens_only: bool = False) -> str:
+    """Case/accent/punctuation-insensitive team name, with common suffixes removed and aliases applied."""
+    s = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+    s = re.sub(r"[^a-z0-9]+", " ", s.replace(".", "")).strip()
+    s = (_WOMENS_SUFFIX if womens_only else _CLUB_SUFFIX).sub("", s).strip()
+    if aliases:
+        s = aliases.get(s, s)
+    return s
+
+def key_columns(df: pd.DataFrame) -> List[str]:
+    """Columns identifying a match: the league too when the sources have one."""
+    return KEY_COLUMNS + [LEAGUE_COLUMN] if LEAGUE_COLUMN in df.columns else KEY_COLUMNS
+
+def _map_values(values: pd.Series, mapping: Dict[str, str]) -> np.ndarray:
+    """Map a (repetitive) string column through its distinct values rather than row by row."""
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([mapping.get(u, u) for u in uniques] + [None], dtype=object)
+    return mapped[codes]
+
+def parse_dates(values: pd.Series, dayfirst: bool = False) -> pd.Series:
+    """
+    Match days from dates in mixed formats. ISO dates (with or without a kick-off time)
+    are parsed as such; anything else is read day-first or month-first as told, never
+    guessed per value. Unparseable values become NaT.
+    """
+    iso = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    rest = iso.isna() & values.notna()
+    if rest.any():
+        iso[rest] = pd.to_datetime(values[rest], errors="coerce", format="mixed", dayfirst=dayfirst)
+    return iso.dt.normalize()
+
+def _norm_aliases(aliases: Optional[Dict[str, str]], womens_only: bool = False) -> Dict[str, str]:
+    return {normalize_team(k, womens_only=womens_only): normalize_team(v, womens_only=womens_only) for k, v in (aliases or {}).items()}
+
+def match_keys(df: pd.DataFrame, aliases: Optional[Dict[str, str]] = None, womens_only: bool = False, dayfirst: bool = False) -> np.ndarray:
+    """
+    Group id per row for the normalized (date, home, away[, league]) key; -1 where a
+    date or team is missing. A missing league is its own value ("").
+
+    Names are normalized once per distinct value, and the key is an exact int64 built
+    from factorized dates and team names (pd.factorize is a hash table), so the cost
+    is linear in rows with no sorts or joins.
+    """
+    alias_map = _norm_aliases(aliases, womens_only)
+    # Sources disagree on date formats (and kick-off times), so key on the parsed day.
+    dates = parse_dates(df["Date"], dayfirst)
+    d_codes, _ = pd.factorize(dates)
+    # One hash pass over the raw names; normalization then runs per distinct name.
+    raw_codes, raw_names = pd.factorize(pd.concat([df["Home"], df["Away"]], ignore_index=True))
+    norm_codes, teams = pd.factorize(np.array([normalize_team(n, alias_map, womens_only) for n in raw_names], dtype=object))
+    t_codes = np.where(raw_codes >= 0, norm_codes[raw_codes], -1)
+    h_codes, a_codes = t_codes[: len(df)], t_codes[len(df) :]
+    n_teams = max(len(teams), 1)
+    key = d_codes.astype(np.int64)
+    if LEAGUE_COLUMN in df.columns:
+        # Leagues can share club names and match days.
+        l_codes, leagues = pd.factorize(df[LEAGUE_COLUMN].fillna("").astype(str))
+        key = key * max(len(leagues), 1) + l_codes
+    key = (key * n_teams + h_codes) * n_teams + a_codes
+    valid = (d_codes >= 0) & (h_codes >= 0) & (a_codes >= 0)
+    codes = np.full(len(df), -1, dtype=np.int64)
+    codes[valid] = pd.factorize(key[valid])[0]
+    return codes
+
+def _source_ranks(sources: List[str], precedence: Optional[List[str]]) -> Dict[str, int]:
+    """Listed sources first, in the given order, then the rest in input order."""
+    order = [s for s in (precedence or []) if s in sources] + [s for s in sources if s not in (precedence or [])]
+    return {s: i for i, s in enumerate(order)}
+
+def canonical_names(frames: Dict[str, pd.DataFrame], precedence: Optional[List[str]] = None, aliases: Optional[Dict[str, str]] = None, womens_only: bool = False) -> Dict[str, str]:
+    """Raw team name -> one display name per normalized team, taken from the highest-precedence source using it."""
+    alias_map = _norm_aliases(aliases, womens_only)
+    ranks = _source_ranks(list(frames), precedence)
+    display: Dict[str, str] = {}
+    out: Dict[str, str] = {}
+    for source in sorted(frames, key=ranks.__getitem__):
+        f = frames[source]
+        for name in pd.unique(pd.concat([f["Home"], f["Away"]], ignore_index=True).dropna()):
+            out[name] = display.setdefault(normalize_team(name, alias_map, womens_only), name)
+    return out
+
+def _pick_rows(codes: np.ndarray, rank: np.ndarray, n_groups: int) -> np.ndarray:
+    """Row index per group with the lowest rank (first such row on ties)."""
+    best = np.full(n_groups, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(best, codes, rank)
+    cand = np.flatnonzero(rank == best[codes])
+    first = cand[~pd.Series(codes[cand]).duplicated().to_numpy()]
+    pick = np.empty(n_groups, dtype=np.int64)
+    pick[codes[first]] = first
+    return pick
+
+def merge_sources(
+    frames: Dict[str, pd.DataFrame],
+    precedence: Optional[List[str]] = None,
+    column_precedence: Optional[Dict[str, List[str]]] = None,
+    aliases: Optional[Dict[str, str]] = None,
+    conflict_columns: List[str] = CONFLICT_COLUMNS,
+    womens_only: bool = False,
+    dayfirst: bool = False,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Merge overlapping match sources into one row per normalized (date, home, away),
+    and league when the sources have a League column (all of them must).
+
+    Every column takes the first non-null value in source precedence order (per-column
+    orders in `column_precedence` override `precedence`), so a lower-priority source
+    can still fill gaps such as missing xG. Duplicates inside one source are collapsed
+    the same way, earliest row first. Home/Away are rewritten to one spelling per team
+    (see canonical_names) so Elo doesn't split a team across sources' naming. Rows
+    whose key can't be built pass through for validate_data to reject. Set
+    `womens_only` when every source is women's football, so "Chelsea FC Women" and
+    "Chelsea" match; otherwise gender suffixes keep teams apart. Non-ISO dates are read
+    day-first when `dayfirst` is set, and the merged Date is the parsed day (datetime64),
+    so later steps never re-parse the sources' mixed formats.
+
+    Returns (merged, conflicts): conflicts lists every source row of a match whose
+    `conflict_columns` disagree, with `chosen` marking the rows whose values won.
+    """
+    sources = list(frames)
+    with_league = [s for s, f in frames.items() if LEAGUE_COLUMN in f.columns]
+    if with_league and len(with_league) != len(sources):
+        raise ValueError(f"{LEAGUE_COLUMN} column is in sources {with_league} but not in {[s for s in sources if s not in with_league]}")
+    df = pd.concat([f.assign(**{SOURCE_COLUMN: s}) for s, f in frames.items()], ignore_index=True)
+    source_idx = np.repeat(np.arange(len(sources)), [len(f) for f in frames.values()])
+    codes = match_keys(df, aliases, womens_only, dayfirst)
+    keys = key_columns(df)
+    df["Date"] = parse_dates(df["Date"], dayfirst)
+    unkeyed = df[codes < 0]
+    keyed = df[codes >= 0].reset_index(drop=True)
+    source_idx = source_idx[codes >= 0]
+    codes = codes[codes >= 0]
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+
+    null_rank = np.iinfo(np.int64).max // 2
+    picks: Dict[str, np.ndarray] = {}
+    merged = {}
+    for col in [c for c in keyed.columns if c != SOURCE_COLUMN]:
+        ranks = _source_ranks(sources, (column_precedence or {}).get(col, precedence))
+        rank = np.array([ranks[s] for s in sources], dtype=np.int64)[source_idx]
+        # Key columns are never null on keyed rows (a missing league is a value of its own).
+        if col not in keys:
+            rank = np.where(keyed[col].isna().to_numpy(), null_rank, rank)
+        picks[col] = _pick_rows(codes, rank, n_groups)
+        merged[col] = keyed[col].to_numpy()[picks[col]]
+    out = pd.DataFrame(merged, columns=[c for c in keyed.columns if c != SOURCE_COLUMN])
+    out = pd.concat([out, unkeyed.drop(columns=[SOURCE_COLUMN])], ignore_index=True) if len(unkeyed) else out
+    names = canonical_names(frames, precedence, aliases, womens_only)
+    for col in ("Home", "Away"):
+        out[col] = _map_values(out[col], names)
+
+    cols = [c for c in conflict_columns if c in keyed.columns]
+    if cols and n_groups:
+        distinct = keyed[cols].groupby(codes).nunique()
+        bad = np.flatnonzero((distinct > 1).any(axis=1).to_numpy())
+    else:
+        bad = np.array([], dtype=np.int64)
+    rows = np.flatnonzero(np.isin(codes, bad))
+    conflicts = keyed.iloc[rows][keys + cols + [SOURCE_COLUMN]].rename(columns={SOURCE_COLUMN: "source"})
+    conflicts.insert(0, "match_id", codes[rows])
+    chosen = np.zeros(len(keyed), dtype=bool)
+    for c in cols:
+        chosen[picks[c]] = True
+    conflicts["chosen"] = chosen[rows]
+    return out, conflicts.sort_values(["match_id", "source"], kind="stable").reset_index(drop=True)
+
+def merge_summary(frames: Dict[str, pd.DataFrame], merged: pd.DataFrame, conflicts: pd.DataFrame) -> Dict[str, object]:
+    return {
+        "sources": {s: int(len(f)) for s, f in frames.items()},
+        "input_rows": int(sum(len(f) for f in frames.values())),
+        "merged_rows": int(len(merged)),
+        "duplicates_dropped": int(sum(len(f) for f in frames.values()) - len(merged)),
+        "conflicting_matches": int(conflicts["match_id"].nunique()) if len(conflicts) else 0,
+    }
+
+def parse_column_precedence(specs: List[str]) -> Dict[str, List[str]]:
+    """["Home_Team_xG=fbref,opta", ...] -> {"Home_Team_xG": ["fbref", "opta"]}."""
+    out = {}
+    for spec in specs:
+        col, _, order = spec.partition("=")
+        if not col or not order:
+            raise ValueError(f"Invalid column precedence {spec!r}; expected COLUMN=source1,source2")
+        out[col.strip()] = [s.strip() for s in order.split(",") if s.strip()]
+    return out
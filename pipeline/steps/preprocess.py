@@ -1,10 +1,16 @@
 import argparse
+import json
+import os
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, List, Tuple
 import warnings
 
 import pandas as pd
 
+from leagues import split_by_league
+from merge_sources import merge_sources, merge_summary, parse_column_precedence
+from profiling import StepProfiler
+
 REQUIRED_COLS = ["Date", "Home", "Away", "Home_Team_Score", "Away_Team_Score"]
 
 def normalize_column_names(df: pd.DataFrame) -> pd.DataFrame:
@@ -41,34 +47,68 @@ def preprocess_pipeline(df: pd.DataFrame, train_pct: float = 0.7, val_pct: float
     df = normalize_column_names(df)
     df["Date"] = pd.to_datetime(df["Date"])
     validate_data(df)
-    return chronological_split(df, train_pct=train_pct, val_pct=val_pct)
+    # Multi-league data is split per league, so every league has train/val/test rows.
+    splits = [chronological_split(part, train_pct=train_pct, val_pct=val_pct) for part in split_by_league(df).values()]
+    if len(splits) == 1:
+        return splits[0]
+    return tuple(pd.concat([s[i] for s in splits], ignore_index=True) for i in range(3))  # type: ignore[return-value]
+
+def _find_csvs(input_dir: Path) -> List[Path]:
+    csvs = sorted(input_dir.glob("*.csv"))
+    if not csvs:
+        raise ValueError(f"No CSV files found in {input_dir}")
+    return csvs
 
-def _find_single_csv(input_dir: Path) -> Path:
-    csvs = list(input_dir.glob("*.csv"))
-    if len(csvs) != 1:
-        raise ValueError(f"Expected exactly 1 CSV in {input_dir}, found: {[c.name for c in csvs]}")
-    return csvs[0]
+def load_sources(input_dir: Path) -> Dict[str, pd.DataFrame]:
+    """One frame per raw source CSV, keyed by file stem (the name used in precedence rules)."""
+    return {c.stem: normalize_column_names(pd.read_csv(c)) for c in _find_csvs(input_dir)}
 
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--train-pct", type=float, default=0.7)
     ap.add_argument("--val-pct", type=float, default=0.15)
+    ap.add_argument("--source-precedence", default="", help="Comma-separated source file stems, highest priority first")
+    ap.add_argument("--column-precedence", action="append", default=[], help="COLUMN=source1,source2 override for one column (repeatable)")
+    ap.add_argument("--womens-only", action="store_true", help="Every source is women's football: also ignore Women/Ladies/WFC suffixes when matching teams")
+    ap.add_argument("--dayfirst", action="store_true", help="Read non-ISO source dates as dd/mm (default mm/dd)")
+    ap.add_argument("--cache-key", default="", help="Code/input hash for pipeline step caching; not used by the step.")
     args = ap.parse_args()
+    prof = StepProfiler("preprocess")
 
-    input_dir = Path("/opt/ml/processing/input")
-    train_dir = Path("/opt/ml/processing/train")
-    val_dir = Path("/opt/ml/processing/val")
-    test_dir = Path("/opt/ml/processing/test")
+    # ML_ROOT lets the local runner (pipeline/local_runner.py) mirror /opt/ml in a scratch dir.
+    processing = Path(os.environ.get("ML_ROOT", "/opt/ml")) / "processing"
+    input_dir = processing / "input"
+    train_dir = processing / "train"
+    val_dir = processing / "val"
+    test_dir = processing / "test"
+    profile_dir = processing / "profile"
+    report_dir = processing / "report"
     for d in [train_dir, val_dir, test_dir]:
         d.mkdir(parents=True, exist_ok=True)
 
-    csv_path = _find_single_csv(input_dir)
-    df = pd.read_csv(csv_path)
-    train, val, test = preprocess_pipeline(df, train_pct=args.train_pct, val_pct=args.val_pct)
+    with prof.phase("load") as ph:
+        sources = load_sources(input_dir)
+        ph.add_rows(sum(len(f) for f in sources.values()))
+    # Overlapping scrapes are merged to one row per match before validation, so
+    # duplicates can't be double-counted in the Elo replay.
+    with prof.phase("merge") as ph:
+        precedence = [s.strip() for s in args.source_precedence.split(",") if s.strip()]
+        df, conflicts = merge_sources(sources, precedence, parse_column_precedence(args.column_precedence), womens_only=args.womens_only, dayfirst=args.dayfirst)
+        report_dir.mkdir(parents=True, exist_ok=True)
+        conflicts.to_csv(report_dir / "conflicts.csv", index=False)
+        with open(report_dir / "merge.json", "w", encoding="utf-8") as f:
+            json.dump({**merge_summary(sources, df, conflicts), "precedence": precedence, "womens_only": args.womens_only, "dayfirst": args.dayfirst}, f, indent=2)
+        ph.add_rows(sum(len(f) for f in sources.values()))
+    with prof.phase("validate") as ph:
+        train, val, test = preprocess_pipeline(df, train_pct=args.train_pct, val_pct=args.val_pct)
+        ph.add_rows(len(df))
 
-    train.to_csv(train_dir / "train.csv", index=False)
-    val.to_csv(val_dir / "val.csv", index=False)
-    test.to_csv(test_dir / "test.csv", index=False)
+    with prof.phase("write") as ph:
+        train.to_csv(train_dir / "train.csv", index=False)
+        val.to_csv(val_dir / "val.csv", index=False)
+        test.to_csv(test_dir / "test.csv", index=False)
+        ph.add_rows(len(train) + len(val) + len(test))
+    prof.write(profile_dir)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+class PhaseStats:
+    def __init__(self) -> None:
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.calls = 0
+        self.rows: Optional[int] = None
+
+    def add_rows(self, n: int) -> None:
+        self.rows = (self.rows or 0) + n
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"wall_s": round(self.wall_s, 6), "cpu_s": round(self.cpu_s, 6), "calls": self.calls}
+        if self.rows is not None:
+            out["rows"] = self.rows
+            out["rows_per_s"] = round(self.rows / self.wall_s, 2) if self.wall_s > 0 else None
+        return out
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB on Linux.
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+class StepProfiler:
+    """
+    Per-phase wall/CPU time, throughput and peak RSS for a pipeline step.
+
+    Phases accumulate when entered repeatedly. Set WSL_PROFILE_TOP_N (or pass
+    top_n) to also run cProfile and report the N hottest functions by cumulative time.
+    """
+
+    def __init__(self, step: str, top_n: Optional[int] = None) -> None:
+        self.step = step
+        self.top_n = int(os.environ.get("WSL_PROFILE_TOP_N", "0")) if top_n is None else top_n
+        self.phases: Dict[str, PhaseStats] = {}
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._profiler: Optional[cProfile.Profile] = None
+        if self.top_n > 0:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseStats]:
+        stats = self.phases.setdefault(name, PhaseStats())
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_s += time.perf_counter() - wall
+            stats.cpu_s += time.process_time() - cpu
+            stats.calls += 1
+
+    def _hot_functions(self) -> List[Dict[str, Any]]:
+        if self._profiler is None:
+            return []
+        self._profiler.disable()
+        st = pstats.Stats(self._profiler)
+        rows = []
+        for (filename, line, func), (_cc, ncalls, tottime, cumtime, _callers) in st.stats.items():  # type: ignore[attr-defined]
+            rows.append({"function": f"{Path(filename).name}:{line}({func})", "calls": ncalls, "tottime_s": round(tottime, 6), "cumtime_s": round(cumtime, 6)})
+        rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+        return rows[: self.top_n]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "step": self.step,
+            "total_wall_s": round(time.perf_counter() - self._start_wall, 6),
+            "total_cpu_s": round(time.process_time() - self._start_cpu, 6),
+            "peak_rss_mb": round(peak_rss_mb(), 2),
+            "phases": {name: s.to_dict() for name, s in self.phases.items()},
+            "hot_functions": self._hot_functions(),
+        }
+
+    def write(self, out_dir: Path) -> Path:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / "profile.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
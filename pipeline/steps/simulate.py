@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from elo import davidson_wdl_probs, expected_score
+from evaluate import _extract_model
+from profiling import StepProfiler
+
+HOME_POINTS = np.array([3, 1, 0])
+AWAY_POINTS = np.array([0, 1, 3])
+# Home team's actual score for outcome 0 (home win), 1 (draw), 2 (away win).
+HOME_RESULT = np.array([1.0, 0.5, 0.0])
+
+@dataclass
+class SeasonSpec:
+    """Everything a worker needs to simulate a block of seasons (picklable, no model object)."""
+
+    teams: List[str]
+    home_idx: np.ndarray
+    away_idx: np.ndarray
+    base_points: np.ndarray
+    base_gd: np.ndarray
+    # Static per-fixture probabilities (F, 3); used when ratings are not updated in-sim.
+    probs: np.ndarray
+    # Elo state for in-sim updates; ratings is None when the model has no ratings.
+    ratings: Optional[np.ndarray] = None
+    K: float = 0.0
+    home_adv: float = 0.0
+    nu: float = 0.0
+
+def split_fixtures(fixtures: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Played rows (home_score/away_score filled) and remaining rows of a season fixture list."""
+    if "home_score" not in fixtures.columns or "away_score" not in fixtures.columns:
+        return fixtures.iloc[0:0], fixtures
+    played = fixtures["home_score"].notna() & fixtures["away_score"].notna()
+    return fixtures[played], fixtures[~played]
+
+def build_spec(model: Any, fixtures: pd.DataFrame, update_ratings: bool = False) -> SeasonSpec:
+    played, remaining = split_fixtures(fixtures)
+    if "date" in remaining.columns:
+        # In-simulation rating updates apply fixtures in row order, so that must be date order.
+        remaining = remaining.sort_values("date", key=lambda d: pd.to_datetime(d, errors="coerce"), kind="stable")
+    teams = sorted(set(fixtures["home"]) | set(fixtures["away"]))
+    index = {t: i for i, t in enumerate(teams)}
+    T = len(teams)
+
+    base_points, base_gd = np.zeros(T), np.zeros(T)
+    if len(played):
+        ph, pa = played["home"].map(index).to_numpy(), played["away"].map(index).to_numpy()
+        hs, as_ = played["home_score"].to_numpy(dtype=float), played["away_score"].to_numpy(dtype=float)
+        outcome = (hs <= as_).astype(int) + (hs < as_)
+        base_points = (np.bincount(ph, HOME_POINTS[outcome], T) + np.bincount(pa, AWAY_POINTS[outcome], T)).astype(float)
+        base_gd = (np.bincount(ph, hs - as_, T) + np.bincount(pa, as_ - hs, T)).astype(float)
+
+    homes, aways = remaining["home"].tolist(), remaining["away"].tolist()
+    # Ratings as of the first remaining fixture, so off-season regression/decay apply.
+    when = remaining["date"].min() if "date" in remaining.columns and len(remaining) else None
+    if hasattr(model, "predict_batch"):
+        p = model.predict_batch(homes, aways)
+    else:
+        rating = {t: model.get_rating(t, when) for t in teams}
+        r_h = np.array([rating[t] for t in homes])
+        r_a = np.array([rating[t] for t in aways])
+        p = davidson_wdl_probs(r_h, r_a, model.home_adv, model.nu)
+    probs = np.column_stack([p["p_home_win"], p["p_draw"], p["p_away_win"]]) if homes else np.zeros((0, 3))
+
+    spec = SeasonSpec(
+        teams=teams,
+        home_idx=np.array([index[t] for t in homes], dtype=int),
+        away_idx=np.array([index[t] for t in aways], dtype=int),
+        base_points=base_points,
+        base_gd=base_gd,
+        probs=probs,
+    )
+    if update_ratings:
+        if not hasattr(model, "get_rating"):
+            raise ValueError("In-simulation rating updates need an Elo model")
+        spec.ratings = np.array([model.get_rating(t, when) for t in teams])
+        spec.K, spec.home_adv, spec.nu = model.K, model.home_adv, model.nu
+    return spec
+
+def _draw_outcomes(spec: SeasonSpec, n: int, rng: np.random.Generator) -> np.ndarray:
+    """(n, F) outcomes: 0 home win, 1 draw, 2 away win."""
+    if spec.ratings is None:
+        u = rng.random((n, len(spec.home_idx)))
+        cum = np.cumsum(spec.probs, axis=1)
+        return (u >= cum[:, 0]).astype(np.int8) + (u >= cum[:, 1])
+
+    # Ratings evolve within each season, so fixtures are drawn in order; every
+    # step is still vectorised across all n seasons.
+    R = np.tile(spec.ratings, (n, 1))
+    out = np.empty((n, len(spec.home_idx)), dtype=np.int8)
+    rows = np.arange(n)
+    for f, (h, a) in enumerate(zip(spec.home_idx, spec.away_idx)):
+        r_h, r_a = R[rows, h], R[rows, a]
+        p = davidson_wdl_probs(r_h, r_a, spec.home_adv, spec.nu)
+        u = rng.random(n)
+        o = (u >= p["p_home_win"]).astype(np.int8) + (u >= p["p_home_win"] + p["p_draw"])
+        delta = spec.K * (HOME_RESULT[o] - expected_score(r_h, r_a, spec.home_adv))
+        R[rows, h] += delta
+        R[rows, a] -= delta
+        out[:, f] = o
+    return out
+
+def simulate_block(spec: SeasonSpec, n: int, seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Simulate n seasons; returns finishing-position counts (team x position) and summed points per team."""
+    rng = np.random.default_rng(seed)
+    T = len(spec.teams)
+    outcome = _draw_outcomes(spec, n, rng)
+
+    # League tables for all n seasons with two bincounts over (season, team) cells.
+    season = np.arange(n)[:, None] * T
+    points = (
+        np.bincount((season + spec.home_idx).ravel(), HOME_POINTS[outcome].ravel(), n * T)
+        + np.bincount((season + spec.away_idx).ravel(), AWAY_POINTS[outcome].ravel(), n * T)
+    ).reshape(n, T) + spec.base_points
+
+    # Points, then current goal difference, then a random draw (goals aren't simulated).
+    order = np.lexsort((rng.random((n, T)), np.broadcast_to(-spec.base_gd, (n, T)), -points), axis=1)
+    positions = np.bincount((order * T + np.arange(T)).ravel(), minlength=T * T).reshape(T, T)
+    return positions, points.sum(axis=0)
+
+def run_simulation(
+    spec: SeasonSpec,
+    n_sims: int = 100_000,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    chunk_size: int = 10_000,
+) -> Dict[str, np.ndarray]:
+    """
+    Simulate n_sims seasons in chunks, each with its own spawned RNG stream, so
+    results depend only on (seed, n_sims, chunk_size) and not on the worker count.
+    """
+    sizes = [min(chunk_size, n_sims - i) for i in range(0, n_sims, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers or min(len(sizes), os.cpu_count() or 1)
+    if workers <= 1:
+        results = [simulate_block(spec, n, s) for n, s in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_block, [spec] * len(sizes), sizes, seeds))
+    return {"positions": np.sum([r[0] for r in results], axis=0), "points": np.sum([r[1] for r in results], axis=0), "n_sims": np.array(n_sims)}
+
+def summarise(spec: SeasonSpec, result: Dict[str, np.ndarray], top: int = 3, relegated: int = 1) -> pd.DataFrame:
+    n = float(result["n_sims"])
+    pos = result["positions"] / n
+    T = len(spec.teams)
+    df = pd.DataFrame({
+        "team": spec.teams,
+        "current_points": spec.base_points,
+        "exp_points": result["points"] / n,
+        "p_title": pos[:, 0],
+        f"p_top{top}": pos[:, :top].sum(axis=1),
+        "p_relegation": pos[:, T - relegated :].sum(axis=1) if relegated else 0.0,
+    })
+    for k in range(T):
+        df[f"pos_{k + 1}"] = pos[:, k]
+    return df.sort_values(["exp_points", "p_title"], ascending=False).reset_index(drop=True)
+
+def _load_model(model_path: Path, scratch: Path) -> Any:
+    if model_path.is_dir():
+        tars = list(model_path.glob("*.tar.gz"))
+        model_path = _extract_model(tars[0], scratch) if tars else model_path / "model.pkl"
+    elif model_path.name.endswith(".tar.gz"):
+        model_path = _extract_model(model_path, scratch)
+    with open(model_path, "rb") as f:
+        return pickle.load(f)
+
+def main() -> None:
+    processing = Path(os.environ.get("ML_ROOT", "/opt/ml")) / "processing"
+    ap = argparse.ArgumentParser(description="Monte Carlo simulation of the rest of a season.")
+    ap.add_argument("--model", type=Path, default=processing / "model", help="model.pkl, model.tar.gz or a directory holding either")
+    ap.add_argument("--fixtures", type=Path, default=processing / "fixtures", help="Season fixtures CSV (or a directory with one); rows with home_score/away_score are treated as played")
+    ap.add_argument("--out-dir", type=Path, default=processing / "simulation")
+    ap.add_argument("--sims", type=int, default=100_000)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--update-ratings", action="store_true", help="Apply Elo updates within each simulated season")
+    ap.add_argument("--league", default=None, help="League to simulate when the artifact holds several")
+    ap.add_argument("--top", type=int, default=3)
+    ap.add_argument("--relegated", type=int, default=1)
+    args, _ = ap.parse_known_args()
+    prof = StepProfiler("simulate")
+
+    with prof.phase("load") as ph:
+        fixtures_csv = next(args.fixtures.glob("*.csv")) if args.fixtures.is_dir() else args.fixtures
+        fixtures = pd.read_csv(fixtures_csv)
+        model = _load_model(args.model, args.out_dir / "_model")
+        if hasattr(model, "for_league"):
+            model = model.for_league(args.league)
+        # Goals models have no ratings to update; they simulate from static probabilities.
+        update = args.update_ratings and hasattr(model, "get_rating")
+        spec = build_spec(model, fixtures, update_ratings=update)
+        ph.add_rows(len(fixtures))
+
+    with prof.phase("simulate") as ph:
+        result = run_simulation(spec, n_sims=args.sims, workers=args.workers, seed=args.seed)
+        ph.add_rows(args.sims)
+
+    with prof.phase("write"):
+        args.out_dir.mkdir(parents=True, exist_ok=True)
+        table = summarise(spec, result, top=args.top, relegated=args.relegated)
+        table.to_csv(args.out_dir / "season_probabilities.csv", index=False)
+        meta = {"sims": args.sims, "seed": args.seed, "update_ratings": update, "remaining_fixtures": int(len(spec.home_idx))}
+        with open(args.out_dir / "simulation.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    prof.write(args.out_dir)
+    print(table[["team", "exp_points", "p_title", f"p_top{args.top}", "p_relegation"]].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
+import argparse
 import json
+import os
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Any, Dict, Iterator, Optional, Tuple
 from itertools import product
 
 import numpy as np
 import pandas as pd
 
 from elo import EloModel
+from goals import GoalsModel
+from leagues import LeagueModels, load_partitioned, map_leagues, weighted_mean
+from profiling import StepProfiler
 
 def brier_score(pred_df: pd.DataFrame, actual_df: pd.DataFrame) -> float:
     home_win = (actual_df["Home_Team_Score"] > actual_df["Away_Team_Score"]).astype(float)
@@ -14,52 +19,139 @@ def brier_score(pred_df: pd.DataFrame, actual_df: pd.DataFrame) -> float:
     away_win = (actual_df["Home_Team_Score"] < actual_df["Away_Team_Score"]).astype(float)
     return ((pred_df["p_home_win"] - home_win) ** 2 + (pred_df["p_draw"] - draw) ** 2 + (pred_df["p_away_win"] - away_win) ** 2).mean()
 
-def train_elo_model(train_df: pd.DataFrame, val_df: pd.DataFrame) -> Tuple[EloModel, Dict[str, float]]:
+def iter_matches(df: pd.DataFrame) -> Iterator[Tuple[str, str, int, int, Any]]:
+    dates = df["Date"] if "Date" in df.columns else [None] * len(df)
+    return zip(df["Home"], df["Away"], df["Home_Team_Score"], df["Away_Team_Score"], dates)
+
+def train_elo_model(
+    train_df: pd.DataFrame,
+    val_df: pd.DataFrame,
+    profiler: Optional[StepProfiler] = None,
+    decay_half_life_days: Optional[float] = None,
+) -> Tuple[EloModel, Dict[str, float]]:
+    prof = profiler or StepProfiler("train", top_n=0)
     K_values = [10, 20, 30, 40]
     home_adv_values = [50, 100, 150]
     nu_values = [0.10, 0.15, 0.20, 0.25]
+    regression_values = [0.0, 0.2, 0.4]
 
-    best = {"brier": float("inf"), "K": 20.0, "home_adv": 100.0, "nu": 0.15}
+    best = {"brier": float("inf"), "K": 20.0, "home_adv": 100.0, "nu": 0.15, "season_regression": 0.0}
+    val_dates = val_df["Date"] if "Date" in val_df.columns else [None] * len(val_df)
 
-    for K, home_adv, nu in product(K_values, home_adv_values, nu_values):
-        m = EloModel(K=float(K), home_adv=float(home_adv), nu=float(nu))
-        for _, r in train_df.iterrows():
-            m.update_ratings(r["Home"], r["Away"], int(r["Home_Team_Score"]), int(r["Away_Team_Score"]))
-        preds = [m.predict(r["Home"], r["Away"]) for _, r in val_df.iterrows()]
-        b = brier_score(pd.DataFrame(preds), val_df)
-        if b < best["brier"]:
-            best = {"brier": float(b), "K": float(K), "home_adv": float(home_adv), "nu": float(nu)}
+    for K, home_adv, reg in product(K_values, home_adv_values, regression_values):
+        m = EloModel(K=float(K), home_adv=float(home_adv), season_regression=reg, decay_half_life_days=decay_half_life_days)
+        with prof.phase("replay") as ph:
+            m.replay(iter_matches(train_df))
+            ph.add_rows(len(train_df))
+        # nu only shapes the draw probability, so one replay serves every nu.
+        for nu in nu_values:
+            m.nu = float(nu)
+            with prof.phase("score") as ph:
+                preds = [m.predict(h, a, when) for h, a, when in zip(val_df["Home"], val_df["Away"], val_dates)]
+                b = brier_score(pd.DataFrame(preds), val_df)
+                ph.add_rows(len(val_df))
+            if b < best["brier"]:
+                best = {"brier": float(b), "K": float(K), "home_adv": float(home_adv), "nu": float(nu), "season_regression": reg}
 
-    final = EloModel(K=best["K"], home_adv=best["home_adv"], nu=best["nu"])
-    for _, r in train_df.iterrows():
-        final.update_ratings(r["Home"], r["Away"], int(r["Home_Team_Score"]), int(r["Away_Team_Score"]))
+    final = EloModel(K=best["K"], home_adv=best["home_adv"], nu=best["nu"], season_regression=best["season_regression"], decay_half_life_days=decay_half_life_days)
+    with prof.phase("replay") as ph:
+        final.replay(iter_matches(train_df))
+        ph.add_rows(len(train_df))
 
-    metrics = {"best_K": best["K"], "best_home_adv": best["home_adv"], "best_nu": best["nu"], "val_brier": best["brier"]}
+    metrics = {"best_K": best["K"], "best_home_adv": best["home_adv"], "best_nu": best["nu"], "best_season_regression": best["season_regression"], "val_brier": best["brier"]}
     return final, metrics
 
-def _load_channel_csv(channel_dir: Path) -> pd.DataFrame:
-    csvs = list(channel_dir.glob("*.csv"))
-    if not csvs:
-        raise ValueError(f"No CSV files found in channel dir: {channel_dir}")
-    return pd.read_csv(csvs[0])
+def train_goals_model(train_df: pd.DataFrame, val_df: pd.DataFrame, profiler: Optional[StepProfiler] = None) -> Tuple[GoalsModel, Dict[str, float]]:
+    prof = profiler or StepProfiler("train", top_n=0)
+    xg_weights = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+    best = {"brier": float("inf"), "xg_weight": 0.0}
+    models: Dict[float, GoalsModel] = {}
+    for w in xg_weights:
+        with prof.phase("fit") as ph:
+            m = GoalsModel(xg_weight=w).fit(train_df)
+            ph.add_rows(len(train_df))
+        with prof.phase("score") as ph:
+            b = brier_score(pd.DataFrame(m.predict_batch(val_df["Home"], val_df["Away"])), val_df)
+            ph.add_rows(len(val_df))
+        models[w] = m
+        if b < best["brier"]:
+            best = {"brier": float(b), "xg_weight": w}
+
+    final = models[best["xg_weight"]]
+    metrics = {"best_xg_weight": best["xg_weight"], "home_adv": final.home_adv, "rho": final.rho, "val_brier": best["brier"]}
+    return final, metrics
+
+MODEL_TYPES = ["elo", "goals"]
+
+def train_model(
+    model_type: str,
+    train_df: pd.DataFrame,
+    val_df: pd.DataFrame,
+    profiler: Optional[StepProfiler] = None,
+    decay_half_life_days: Optional[float] = None,
+) -> Tuple[Any, Dict[str, float]]:
+    if model_type == "goals":
+        return train_goals_model(train_df, val_df, profiler)
+    return train_elo_model(train_df, val_df, profiler, decay_half_life_days)
+
+def train_leagues(
+    model_type: str,
+    train_parts: Dict[str, pd.DataFrame],
+    val_parts: Dict[str, pd.DataFrame],
+    workers: Optional[int] = None,
+    decay_half_life_days: Optional[float] = None,
+) -> Tuple[LeagueModels, Dict[str, Any]]:
+    """Train each league independently in a worker pool; one artifact, per-league metrics."""
+    missing = sorted(set(train_parts) - set(val_parts))
+    if missing:
+        raise ValueError(f"No validation rows for leagues: {missing}")
+    jobs = {lg: (model_type, train_parts[lg], val_parts[lg], None, decay_half_life_days) for lg in train_parts}
+    results = map_leagues(train_model, jobs, workers)
+    per_league = {lg: m for lg, (_, m) in results.items()}
+    metrics: Dict[str, Any] = {
+        "val_brier": weighted_mean(per_league, {lg: len(val_parts[lg]) for lg in per_league}, "val_brier"),
+        "leagues": per_league,
+    }
+    return LeagueModels(models={lg: model for lg, (model, _) in results.items()}), metrics
 
 def main() -> None:
-    train_dir = Path("/opt/ml/input/data/train")
-    val_dir = Path("/opt/ml/input/data/val")
-    model_dir = Path("/opt/ml/model")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model-type", choices=MODEL_TYPES, default="elo")
+    ap.add_argument("--decay-half-life-days", type=float, default=None, help="Elo only: inactivity decay toward the mean")
+    ap.add_argument("--workers", type=int, default=None, help="Processes for multi-league training (default: one per CPU)")
+    # SageMaker passes every hyperparameter (e.g. --cache-key) as a CLI argument.
+    args, _ = ap.parse_known_args()
+    prof = StepProfiler("train")
+    ml_root = Path(os.environ.get("ML_ROOT", "/opt/ml"))
+    train_dir = ml_root / "input" / "data" / "train"
+    val_dir = ml_root / "input" / "data" / "val"
+    model_dir = ml_root / "model"
     model_dir.mkdir(parents=True, exist_ok=True)
 
-    train_df = _load_channel_csv(train_dir)
-    val_df = _load_channel_csv(val_dir)
+    with prof.phase("load") as ph:
+        train_parts = load_partitioned(train_dir)
+        val_parts = load_partitioned(val_dir)
+        ph.add_rows(sum(map(len, train_parts.values())) + sum(map(len, val_parts.values())))
 
-    model, metrics = train_elo_model(train_df, val_df)
+    model: Any
+    metrics: Dict[str, Any]
+    if list(train_parts) == [""]:
+        model, metrics = train_model(args.model_type, train_parts[""], val_parts[""], prof, args.decay_half_life_days)
+    else:
+        with prof.phase("train_leagues") as ph:
+            model, metrics = train_leagues(args.model_type, train_parts, val_parts, args.workers, args.decay_half_life_days)
+            ph.add_rows(sum(map(len, train_parts.values())))
 
     import pickle
-    with open(model_dir / "model.pkl", "wb") as f:
-        pickle.dump(model, f)
+    with prof.phase("write"):
+        with open(model_dir / "model.pkl", "wb") as f:
+            pickle.dump(model, f)
 
-    with open(model_dir / "metrics.json", "w", encoding="utf-8") as f:
-        json.dump(metrics, f)
+        with open(model_dir / "metrics.json", "w", encoding="utf-8") as f:
+            json.dump(metrics, f)
+    # Lands in model.tar.gz next to the model it describes.
+    prof.write(model_dir)
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,9 @@
 import argparse
 import sys
-import boto3
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pipeline.config import get_config  # noqa: E402
 
 PARAMS = {
     "RAW_BUCKET_URI": "/wsl-mlops/raw_bucket_uri",
@@ -13,13 +16,20 @@ PARAMS = {
 
 def main() -> None:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--key", required=True, choices=PARAMS.keys())
+    ap.add_argument("--key", choices=PARAMS.keys())
+    ap.add_argument("--all", action="store_true", help="Print every /wsl-mlops/* parameter")
     args = ap.parse_args()
+    if not args.key and not args.all:
+        ap.error("one of --key or --all is required")
 
-    ssm = boto3.client("ssm")
+    cfg = get_config()
+    if args.all:
+        for name, value in sorted(cfg.all().items()):
+            print(f"{name}={value}")
+        return
     try:
-        print(ssm.get_parameter(Name=PARAMS[args.key])["Parameter"]["Value"])
-    except ssm.exceptions.ParameterNotFound:
+        print(cfg.get(PARAMS[args.key]))
+    except KeyError:
         print(f"Parameter not found: {PARAMS[args.key]}", file=sys.stderr)
         raise SystemExit(1)
 
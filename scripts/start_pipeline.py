@@ -1,28 +1,81 @@
 import argparse
+import hashlib
+import sys
 from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
 import boto3
 
-def ssm_get(name: str) -> str:
-    return boto3.client("ssm").get_parameter(Name=name)["Parameter"]["Value"]
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pipeline.config import get_config  # noqa: E402
+
+def object_version(s3_uri: str) -> str:
+    """
+    VersionId (or ETag) of the raw data object; drives pipeline step cache invalidation.
+    For a prefix of source files (trailing '/') it is a hash over every object's key and ETag.
+    """
+    p = urlparse(s3_uri)
+    s3 = boto3.client("s3")
+    if s3_uri.endswith("/"):
+        h = hashlib.sha256()
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=p.netloc, Prefix=p.path.lstrip("/")):
+            for obj in page.get("Contents", []):
+                h.update(f"{obj['Key']}={obj['ETag']}\n".encode("utf-8"))
+        return h.hexdigest()[:16]
+    head = s3.head_object(Bucket=p.netloc, Key=p.path.lstrip("/"))
+    return head.get("VersionId") or head["ETag"].strip('"')
 
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--raw-s3-uri", required=True)
+    ap.add_argument("--source-precedence", default="", help="Raw source file stems, highest priority first (when --raw-s3-uri is a prefix of sources)")
     ap.add_argument("--fixtures-s3-uri", required=True)
     ap.add_argument("--gameweek", required=True)
+    ap.add_argument("--prediction-mode", choices=["endpoint", "local", "transform"], default="endpoint")
+    ap.add_argument("--predictions-format", choices=["csv", "parquet"], default="csv", help="parquet: season/gameweek-partitioned archive with a manifest")
+    ap.add_argument("--endpoint-lifecycle", choices=["ephemeral", "ttl", "persistent"], default="ephemeral")
+    ap.add_argument("--season-fixtures-s3-uri", default=None, help="Season fixture list for the season simulation")
+    ap.add_argument("--season-sims", type=int, default=0, help="Simulated seasons (0 skips the simulation step)")
+    ap.add_argument("--backfill-history-s3-uri", default=None, help="Fixtures/results history for a backfill")
+    ap.add_argument("--backfill-from", default=None, help="First gameweek to backfill (enables the backfill step)")
+    ap.add_argument("--backfill-to", default=None, help="Last gameweek to backfill (default: latest in the history)")
+    ap.add_argument("--model-type", choices=["elo", "goals"], default="elo", help="elo: W/D/L ratings; goals: Poisson/Dixon-Coles on goals and xG")
+    ap.add_argument("--profile-top-n", type=int, default=0, help="Add the N hottest functions (cProfile) to each step's profile.json")
+    ap.add_argument("--no-cache", action="store_true", help="Force Preprocess/Train/Evaluate to rerun")
     args = ap.parse_args()
+    if args.prediction_mode == "local" and args.model_type == "goals":
+        ap.error("--prediction-mode local supports --model-type elo only; use endpoint or transform for goals")
 
-    pipeline_name = ssm_get("/wsl-mlops/pipeline_name")
+    pipeline_name = get_config().get("pipeline_name")
     sm = boto3.client("sagemaker")
+    ts = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    raw_version = f"nocache-{ts}" if args.no_cache else object_version(args.raw_s3_uri)
+
+    params = [
+        {"Name": "RawDataS3Uri", "Value": args.raw_s3_uri},
+        {"Name": "FixturesS3Uri", "Value": args.fixtures_s3_uri},
+        {"Name": "Gameweek", "Value": args.gameweek},
+        {"Name": "RawDataVersion", "Value": raw_version},
+        {"Name": "SourcePrecedence", "Value": args.source_precedence},
+        {"Name": "PredictionMode", "Value": args.prediction_mode},
+        {"Name": "EndpointLifecycle", "Value": args.endpoint_lifecycle},
+        {"Name": "PredictionsFormat", "Value": args.predictions_format},
+        {"Name": "ModelType", "Value": args.model_type},
+        {"Name": "ProfileTopN", "Value": str(args.profile_top_n)},
+        {"Name": "SeasonSims", "Value": str(args.season_sims)},
+    ]
+    if args.backfill_from:
+        params.append({"Name": "BackfillFromGameweek", "Value": args.backfill_from})
+        params.append({"Name": "BackfillToGameweek", "Value": args.backfill_to or ""})
+        if args.backfill_history_s3_uri:
+            params.append({"Name": "BackfillHistoryS3Uri", "Value": args.backfill_history_s3_uri})
+    if args.season_fixtures_s3_uri:
+        params.append({"Name": "SeasonFixturesS3Uri", "Value": args.season_fixtures_s3_uri})
 
     resp = sm.start_pipeline_execution(
         PipelineName=pipeline_name,
-        PipelineParameters=[
-            {"Name": "RawDataS3Uri", "Value": args.raw_s3_uri},
-            {"Name": "FixturesS3Uri", "Value": args.fixtures_s3_uri},
-            {"Name": "Gameweek", "Value": args.gameweek},
-        ],
-        PipelineExecutionDisplayName=f"{args.gameweek}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}",
+        PipelineParameters=params,
+        PipelineExecutionDisplayName=f"{args.gameweek}-{ts}",
     )
     print(resp["PipelineExecutionArn"])
 
@@ -1,11 +1,12 @@
+import sys
 from pathlib import Path
 import boto3
 
-def ssm_get(name: str) -> str:
-    return boto3.client("ssm").get_parameter(Name=name)["Parameter"]["Value"]
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pipeline.config import get_config  # noqa: E402
 
 def main() -> None:
-    raw_uri = ssm_get("/wsl-mlops/raw_bucket_uri").rstrip("/")
+    raw_uri = get_config().get("raw_bucket_uri").rstrip("/")
     bucket = raw_uri.replace("s3://", "")
 
     repo_root = Path(__file__).resolve().parents[1]
@@ -1,7 +1,22 @@
+import os
+import sys
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
 import pytest
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "infra" / "cdk" / "lambda"))
+sys.path.insert(0, str(REPO_ROOT / "pipeline" / "steps"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-2")
+
+from benchmarks.fakes import FakeS3  # noqa: E402
+
+@pytest.fixture
+def fake_s3():
+    return FakeS3()
+
 @pytest.fixture
 def sample_match_data():
     return pd.DataFrame({
@@ -0,0 +1,54 @@
+import pytest
+
+import archive
+from archive import partition_entry, prune, season_label, update_manifest
+
+ROWS = [
+    {"gameweek": "GW01", "date": "2024-09-21", "home": "Chelsea", "away": "Arsenal", "p_home_win": 0.5, "p_draw": 0.25, "p_away_win": 0.25, "r_home": 1510.0, "r_away": 1490.0},
+    {"gameweek": "GW01", "date": "2024-09-22", "home": "Spurs", "away": "Villa", "p_home_win": 0.4, "p_draw": 0.3, "p_away_win": 0.3, "r_home": 1500.0, "r_away": 1500.0},
+]
+
+def _manifest():
+    m = {"version": 1, "partitions": []}
+    update_manifest(m, partition_entry(ROWS, "GW01", "arn:pkg/1"))
+    update_manifest(m, partition_entry([dict(r, date="2025-01-12", gameweek="GW12") for r in ROWS[1:]], "GW12", "arn:pkg/1"))
+    update_manifest(m, partition_entry([dict(r, date="2025-09-06", gameweek="GW01b") for r in ROWS], "GW01b", "arn:pkg/2"))
+    return m
+
+def test_season_label_follows_season_start():
+    assert season_label("2024-09-21") == "2024-25"
+    assert season_label("2025-05-18") == "2024-25"
+    assert season_label("2025-08-30") == "2025-26"
+
+def test_manifest_entry_and_pruning():
+    m = _manifest()
+    gw1 = archive.find_gameweek(m, "GW01")
+    assert gw1["path"] == "season=2024-25/gameweek=GW01/part-0.parquet"
+    assert (gw1["rows"], gw1["min_date"], gw1["max_date"]) == (2, "2024-09-21", "2024-09-22")
+    assert gw1["teams"] == ["Arsenal", "Chelsea", "Spurs", "Villa"]
+
+    assert [e["gameweek"] for e in prune(m, season="2024-25", team="Chelsea")] == ["GW01"]
+    assert [e["gameweek"] for e in prune(m, team="Spurs", date_from="2024-10-01")] == ["GW12", "GW01b"]
+    assert [e["gameweek"] for e in prune(m, date_to="2024-09-21")] == ["GW01"]
+
+def test_rewritten_gameweek_in_other_season_supersedes_old_partition():
+    m = _manifest()
+    stale = update_manifest(m, partition_entry([dict(r, date="2025-08-30") for r in ROWS], "GW01"))
+    assert stale == ["season=2024-25/gameweek=GW01/part-0.parquet"]
+    assert archive.find_gameweek(m, "GW01")["season"] == "2025-26"
+    assert len(m["partitions"]) == 3
+
+def test_parquet_writer_and_pruning_reader(fake_s3):
+    pytest.importorskip("pyarrow")
+    with archive.ParquetArchiveWriter(fake_s3, "preds", "GW01", model_package_arn="arn:pkg/1") as w:
+        for r in ROWS:
+            w.writerow(r)
+    with archive.ParquetArchiveWriter(fake_s3, "preds", "GW12") as w:
+        w.writerow(dict(ROWS[1], date="2025-01-12", gameweek="GW12"))
+    assert w.key == "predictions/archive/season=2024-25/gameweek=GW12/part-0.parquet"
+
+    fake_s3.calls.clear()
+    table = archive.read_predictions("s3://preds/predictions/archive", team="Chelsea", s3=fake_s3)
+    assert table.column("home").to_pylist() == ["Chelsea"]
+    # Manifest plus the one partition that can hold Chelsea.
+    assert fake_s3.calls.count("get_object") == 2
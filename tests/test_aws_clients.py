@@ -0,0 +1,20 @@
+import aws_clients
+from aws_clients import LazyClient, prewarm
+
+def test_clients_are_built_on_first_use_and_shared():
+    aws_clients.reset()
+    s3 = LazyClient("s3")
+    assert aws_clients._clients == {}
+    assert s3.meta.service_model.service_name == "s3"
+    assert aws_clients.client("s3") is aws_clients.client("s3")
+    config = aws_clients.client("sagemaker-runtime").meta.config
+    assert (config.connect_timeout, config.read_timeout, config.tcp_keepalive) == (3.0, 70.0, True)
+    aws_clients.reset()
+
+def test_prewarm_only_when_init_runs_ahead_of_requests():
+    aws_clients.reset()
+    assert not prewarm("s3", init_type="on-demand")
+    assert aws_clients._clients == {}
+    assert prewarm("s3", init_type="snap-start")
+    assert set(aws_clients._clients) == {"s3"}
+    aws_clients.reset()
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from backfill import OUTPUT_NAME, backfill_predictions, load_history, run_backfill, select_gameweeks
+from elo import EloModel
+
+@pytest.fixture
+def history(tmp_path):
+    rows = [
+        ("", "2023-05-01", "Chelsea", "Arsenal", 3, 0),
+        ("GW01", "2023-09-10", "Chelsea", "Spurs", 2, 0),
+        ("GW01", "2023-09-11", "Arsenal", "Villa", 1, 1),
+        ("GW02", "2023-09-17", "Spurs", "Arsenal", 0, 2),
+        ("GW02", "2023-09-17", "Villa", "Chelsea", 0, 1),
+        ("GW03", "2023-09-24", "Chelsea", "Villa", None, None),
+    ]
+    path = tmp_path / "history.csv"
+    pd.DataFrame(rows, columns=["gameweek", "date", "home", "away", "home_score", "away_score"]).to_csv(path, index=False)
+    return load_history(path)
+
+def test_each_gameweek_uses_ratings_from_before_it(history):
+    model = EloModel(K=20.0, home_adv=100.0, ratings={"Chelsea": 1900.0}, last_played={})
+    out = dict(backfill_predictions(model, history, ["GW01", "GW02", "GW03"]))
+
+    # The trained ratings are discarded; only the pre-season result has been applied for GW01.
+    warm = EloModel(K=20.0, home_adv=100.0).replay([("Chelsea", "Arsenal", 3, 0, "2023-05-01")])
+    assert out["GW01"].iloc[0]["r_home"] == pytest.approx(warm.get_rating("Chelsea", "2023-09-10"))
+    assert out["GW01"].iloc[1]["r_home"] == pytest.approx(warm.get_rating("Arsenal", "2023-09-11"))
+
+    # GW02 sees both GW01 results; its own same-day results don't leak into each other.
+    warm.replay([("Chelsea", "Spurs", 2, 0, "2023-09-10"), ("Arsenal", "Villa", 1, 1, "2023-09-11")])
+    gw2 = out["GW02"].set_index("home")
+    assert gw2.loc["Villa", "r_away"] == pytest.approx(warm.get_rating("Chelsea"))
+    assert gw2.loc["Spurs", "r_away"] == pytest.approx(warm.get_rating("Arsenal"))
+    assert len(out["GW03"]) == 1
+
+def test_run_backfill_writes_gameweek_range(history, tmp_path):
+    written = run_backfill(EloModel(), history, tmp_path / "predictions", start="GW02", end="GW03", workers=2)
+
+    assert written == {"GW02": 2, "GW03": 1}
+    assert not (tmp_path / "predictions" / "GW01").exists()
+    df = pd.read_csv(tmp_path / "predictions" / "GW02" / OUTPUT_NAME)
+    assert list(df.columns) == ["gameweek", "date", "home", "away", "p_home_win", "p_draw", "p_away_win", "r_home", "r_away", "league"]
+    assert (df[["p_home_win", "p_draw", "p_away_win"]].sum(axis=1) - 1).abs().max() < 1e-9
+
+def test_select_gameweeks_rejects_bad_range():
+    with pytest.raises(ValueError):
+        select_gameweeks(["GW01", "GW02"], "GW02", "GW01")
+    with pytest.raises(ValueError):
+        select_gameweeks(["GW01", "GW02"], "GW09")
+
+def test_gameweek_labels_repeated_across_seasons_are_rejected(history, tmp_path):
+    next_season = pd.DataFrame([("GW01", "2024-09-08", "Spurs", "Villa", 1, 0)], columns=history.columns)
+    next_season["date"] = pd.to_datetime(next_season["date"]).dt.date
+    both = pd.concat([history, next_season], ignore_index=True)
+    with pytest.raises(ValueError, match="GW01 \\(2023, 2024\\)"):
+        run_backfill(EloModel(), both, tmp_path / "predictions")
+
+def test_multi_league_backfill_labels_each_row(history, tmp_path):
+    from leagues import LeagueModels
+
+    second = history.assign(league="WSL2", home=history["home"] + " B", away=history["away"] + " B")
+    both = pd.concat([history.assign(league="WSL"), second], ignore_index=True).sort_values("date", kind="stable").reset_index(drop=True)
+    model = LeagueModels(models={"WSL": EloModel(), "WSL2": EloModel(K=40.0)})
+    written = run_backfill(model, both, tmp_path / "predictions", start="GW02", end="GW02")
+
+    assert written == {"GW02": 4}
+    df = pd.read_csv(tmp_path / "predictions" / "GW02" / OUTPUT_NAME)
+    assert sorted(df["league"]) == ["WSL", "WSL", "WSL2", "WSL2"]
+    assert (df[df["league"] == "WSL2"]["home"].str.endswith(" B")).all()
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from benchmarks.bench import compare, main
+from pipeline.steps.preprocess import preprocess_pipeline
+from pipeline.synthetic import generate_league
+from tests.conftest import REPO_ROOT
+
+def test_synthetic_league_is_seeded_and_preprocessable():
+    a = generate_league(1_000, 10, seed=3)
+    assert a.equals(generate_league(1_000, 10, seed=3))
+    assert list(a.columns) == ["Date", "Time", "Home", "Away", "Home_Team_Score", "Away_Team_Score", "Home_Team_xG", "Home_Team_xG.1"]
+    assert (a["Home"] != a["Away"]).all()
+    train, val, test = preprocess_pipeline(a)
+    assert len(train) + len(val) + len(test) == 1_000
+
+def test_compare_flags_only_slowdowns_beyond_threshold():
+    base = {"results": {"a": {"median_s": 1.0}, "b": {"median_s": 1.0}}}
+    cur = {"results": {"a": {"median_s": 1.1}, "b": {"median_s": 1.5}, "new": {"median_s": 9.0}}}
+    rows = {r["case"]: r for r in compare(cur, base, threshold=0.2)}
+    assert not rows["a"]["regression"]
+    assert rows["b"]["regression"]
+    assert "new" not in rows
+
+def test_suite_writes_results_for_handler_case(tmp_path):
+    out = tmp_path / "bench.json"
+    assert main(["--size", "tiny", "--repeat", "1", "--case", "predict_weekly.handler", "--output", str(out)]) == 0
+    result = json.loads(out.read_text())["results"]["predict_weekly.handler"]
+    assert result["rows"] == 50
+
+def test_cold_start_harness_runs_every_handler_from_its_bundle(tmp_path):
+    from benchmarks import cold_start
+
+    out = tmp_path / "cold_start.json"
+    assert cold_start.main(["--runs", "1", "--output", str(out)]) == 0
+    results = json.loads(out.read_text())["results"]
+    for handler in ("deploy_endpoint.handler", "predict_weekly.handler", "endpoint_lifecycle.sweep_handler", "online_eval.handler"):
+        assert all(results[f"{handler}/{phase}"]["runs"] == 1 for phase in cold_start.PHASES)
+
+def test_cold_start_harness_fails_on_incomplete_bundle():
+    from benchmarks import cold_start
+
+    files = [REPO_ROOT / "infra" / "cdk" / "lambda" / f for f in ("online_eval.py", "archive.py", "metrics.py", "aws_clients.py")] + [REPO_ROOT / "pipeline" / "steps" / "elo.py"]
+    with pytest.raises(RuntimeError, match="s3_stream"):
+        cold_start.measure("online_eval.handler", files, runs=1)
+
+def test_skipped_handler_case_leaves_lambda_globals_alone(tmp_path):
+    import predict_weekly
+
+    before = (predict_weekly.s3, predict_weekly.rt, predict_weekly.sm)
+    assert main(["--size", "tiny", "--repeat", "1", "--case", "inference.predict_fn", "--output", str(tmp_path / "bench.json")]) == 0
+    assert (predict_weekly.s3, predict_weekly.rt, predict_weekly.sm) == before
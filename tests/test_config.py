@@ -0,0 +1,49 @@
+import json
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from pipeline.config import WslConfig
+
+@pytest.fixture
+def ssm():
+    client = boto3.client("ssm", region_name="eu-west-2", aws_access_key_id="x", aws_secret_access_key="x")
+    with Stubber(client) as stubber:
+        client.stubber = stubber
+        yield client
+        stubber.assert_no_pending_responses()
+
+def _stub_fetch(ssm):
+    ssm.stubber.add_response(
+        "get_parameters_by_path",
+        {"Parameters": [{"Name": "/wsl-mlops/raw_bucket_uri", "Value": "s3://raw"}], "NextToken": "t1"},
+        {"Path": "/wsl-mlops/", "Recursive": True},
+    )
+    ssm.stubber.add_response(
+        "get_parameters_by_path",
+        {"Parameters": [{"Name": "/wsl-mlops/pipeline_name", "Value": "wsl-mlops-pipeline"}]},
+        {"Path": "/wsl-mlops/", "Recursive": True, "NextToken": "t1"},
+    )
+
+def test_single_fetch_serves_all_lookups(ssm, tmp_path):
+    _stub_fetch(ssm)
+    cfg = WslConfig(ssm=ssm, ttl_seconds=0, cache_file=tmp_path / "c.json")
+    assert cfg.get("/wsl-mlops/raw_bucket_uri") == "s3://raw"
+    assert cfg.get("pipeline_name") == "wsl-mlops-pipeline"
+    with pytest.raises(KeyError):
+        cfg.get("missing")
+
+def test_ttl_file_cache_skips_ssm_on_next_start(ssm, tmp_path):
+    _stub_fetch(ssm)
+    WslConfig(ssm=ssm, ttl_seconds=60, cache_file=tmp_path / "c.json").get("raw_bucket_uri")
+    # No responses left queued: a second process-level instance must not call SSM.
+    assert WslConfig(ssm=ssm, ttl_seconds=60, cache_file=tmp_path / "c.json").get("pipeline_name") == "wsl-mlops-pipeline"
+
+def test_env_and_file_overrides_work_offline(ssm, tmp_path, monkeypatch):
+    overrides = tmp_path / "local.json"
+    overrides.write_text(json.dumps({"raw_bucket_uri": "s3://from-file", "pipeline_name": "local"}))
+    monkeypatch.setenv("WSL_MLOPS_PIPELINE_NAME", "from-env")
+    cfg = WslConfig(ssm=ssm, ttl_seconds=0, overrides_file=overrides)
+    assert cfg.get("raw_bucket_uri") == "s3://from-file"
+    assert cfg.get("pipeline_name") == "from-env"
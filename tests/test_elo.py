@@ -21,3 +21,34 @@ def test_elo_update_home_win_moves_ratings():
     m.update_ratings("Arsenal", "Chelsea", 2, 0)
     assert m.get_rating("Arsenal") > 1500
     assert m.get_rating("Chelsea") < 1500
+
+def test_season_regression_is_applied_lazily_on_read():
+    m = EloModel(K=20, season_regression=0.5)
+    m.update_ratings("Arsenal", "Chelsea", 3, 0, "2024-05-01")
+    r = m.ratings["Arsenal"]
+    # Same season: unchanged. Next season: half the deviation removed, without touching stored state.
+    assert m.get_rating("Arsenal", "2024-06-01") == r
+    assert m.get_rating("Arsenal", "2024-09-15") == pytest.approx(1500 + (r - 1500) * 0.5)
+    assert m.ratings["Arsenal"] == r
+
+def test_inactivity_decay_halves_deviation_per_half_life():
+    m = EloModel(K=20, decay_half_life_days=30)
+    m.update_ratings("Arsenal", "Chelsea", 3, 0, "2024-01-01")
+    dev = m.ratings["Chelsea"] - 1500
+    assert m.get_rating("Chelsea", "2024-01-31") == pytest.approx(1500 + dev / 2)
+
+def test_replay_matches_update_loop_and_old_pickles_load():
+    import pickle
+
+    games = [("Arsenal", "Chelsea", 2, 1, "2023-10-01"), ("Chelsea", "Arsenal", 0, 0, "2024-10-01")]
+    a = EloModel(season_regression=0.3).replay(games)
+    b = EloModel(season_regression=0.3)
+    for g in games:
+        b.update_ratings(*g)
+    assert a.ratings == b.ratings
+    assert str(a.as_of) == "2024-10-01"
+
+    old = EloModel(ratings={"Arsenal": 1600.0})
+    state = {k: v for k, v in old.__dict__.items() if k in ("initial_rating", "K", "home_adv", "nu", "ratings")}
+    old.__dict__ = state
+    assert pickle.loads(pickle.dumps(old)).get_rating("Arsenal", "2030-01-01") == 1600.0
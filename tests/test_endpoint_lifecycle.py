@@ -0,0 +1,161 @@
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+
+import deploy_endpoint
+from endpoint_lifecycle import EndpointFailed, EndpointLifecycle
+
+PKG = "arn:aws:sagemaker:eu-west-2:123456789012:model-package/wsl-elo-models/3"
+EP_ARN = "arn:aws:sagemaker:eu-west-2:123456789012:endpoint/wsl-elo-endpoint"
+CFG_ARN = "arn:aws:sagemaker:eu-west-2:123456789012:endpoint-config/cfg-1"
+MODEL_ARN = "arn:aws:sagemaker:eu-west-2:123456789012:model/model-1"
+ROLE_ARN = "arn:aws:iam::123456789012:role/SageMakerExecRole"
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def sm():
+    client = boto3.client("sagemaker", region_name="eu-west-2", aws_access_key_id="x", aws_secret_access_key="x")
+    with Stubber(client) as stubber:
+        client.stubber = stubber
+        yield client
+        stubber.assert_no_pending_responses()
+
+def _endpoint(status="InService", cfg="cfg-1"):
+    return {
+        "EndpointName": "wsl-elo-endpoint",
+        "EndpointArn": EP_ARN,
+        "EndpointConfigName": cfg,
+        "EndpointStatus": status,
+        "CreationTime": "2026-01-01T00:00:00Z",
+        "LastModifiedTime": "2026-01-01T00:00:00Z",
+    }
+
+def _stub_serving(sm, package):
+    sm.stubber.add_response("describe_endpoint", _endpoint(), {"EndpointName": "wsl-elo-endpoint"})
+    sm.stubber.add_response(
+        "describe_endpoint_config",
+        {
+            "EndpointConfigName": "cfg-1",
+            "EndpointConfigArn": CFG_ARN,
+            "ProductionVariants": [{"VariantName": "AllTraffic", "ModelName": "model-1"}],
+            "CreationTime": "2026-01-01T00:00:00Z",
+        },
+        {"EndpointConfigName": "cfg-1"},
+    )
+    sm.stubber.add_response(
+        "describe_model",
+        {"ModelName": "model-1", "ModelArn": MODEL_ARN, "CreationTime": "2026-01-01T00:00:00Z", "Containers": [{"ModelPackageName": package}]},
+        {"ModelName": "model-1"},
+    )
+
+def _not_found(sm):
+    sm.stubber.add_client_error("describe_endpoint", "ValidationException", "Could not find endpoint wsl-elo-endpoint.")
+
+def test_deploy_reuses_endpoint_already_serving_package(monkeypatch, sm):
+    monkeypatch.setattr(deploy_endpoint, "sm", sm)
+    _stub_serving(sm, PKG)
+    out = deploy_endpoint.handler({"model_package_arn": PKG, "lifecycle": "persistent"}, None)
+    assert out["reused"] is True
+    assert out["status"] == "InService"
+
+def test_deploy_creates_and_hands_off_without_waiting(monkeypatch, sm):
+    monkeypatch.setattr(deploy_endpoint, "sm", sm)
+    monkeypatch.setenv("SAGEMAKER_ROLE_ARN", ROLE_ARN)
+    monkeypatch.setenv("VPC_SUBNET_IDS", "subnet-1,subnet-2")
+    monkeypatch.setenv("ENDPOINT_SECURITY_GROUP_ID", "sg-1")
+    _not_found(sm)
+    sm.stubber.add_response("create_model", {"ModelArn": MODEL_ARN}, {"ModelName": ANY, "ExecutionRoleArn": ROLE_ARN, "Containers": [{"ModelPackageName": PKG}], "VpcConfig": {"Subnets": ["subnet-1", "subnet-2"], "SecurityGroupIds": ["sg-1"]}})
+    sm.stubber.add_response("create_endpoint_config", {"EndpointConfigArn": CFG_ARN}, {"EndpointConfigName": ANY, "ProductionVariants": ANY})
+    _not_found(sm)
+    sm.stubber.add_response("create_endpoint", {"EndpointArn": EP_ARN}, {"EndpointName": "wsl-elo-endpoint", "EndpointConfigName": ANY})
+    sm.stubber.add_response("describe_endpoint", _endpoint(status="Creating"), {"EndpointName": "wsl-elo-endpoint"})
+    out = deploy_endpoint.handler({"model_package_arn": PKG, "wait": False, "lifecycle": "persistent"}, None)
+    assert out["reused"] is False
+    assert out["status"] == "Creating"
+
+def test_wait_backs_off_exponentially(sm):
+    clock = FakeClock()
+    for status in ["Creating", "Creating", "Creating", "InService"]:
+        sm.stubber.add_response("describe_endpoint", _endpoint(status=status), {"EndpointName": "wsl-elo-endpoint"})
+    lc = EndpointLifecycle(sm, sleep=clock.sleep, clock=clock)
+    assert lc.wait_in_service("wsl-elo-endpoint", timeout_s=600, initial_delay=5, max_delay=15) == "InService"
+    assert clock.sleeps == [5, 10, 15]
+
+def test_wait_raises_on_failed_endpoint(sm):
+    failed = {**_endpoint(status="Failed"), "FailureReason": "bad image"}
+    sm.stubber.add_response("describe_endpoint", failed, {"EndpointName": "wsl-elo-endpoint"})
+    with pytest.raises(EndpointFailed, match="bad image"):
+        EndpointLifecycle(sm).wait_in_service("wsl-elo-endpoint", timeout_s=60)
+
+def test_sweep_tears_down_only_expired_endpoints(sm):
+    clock = FakeClock()
+    sm.stubber.add_response(
+        "list_endpoints",
+        {"Endpoints": [{"EndpointName": "wsl-elo-endpoint", "EndpointArn": EP_ARN, "EndpointStatus": "InService", "CreationTime": "2026-01-01T00:00:00Z", "LastModifiedTime": "2026-01-01T00:00:00Z"}]},
+        {"NameContains": "wsl-"},
+    )
+    stale = str(int(clock.now - 10 * 3600))
+    sm.stubber.add_response(
+        "list_tags",
+        {"Tags": [{"Key": "wsl:managed", "Value": "true"}, {"Key": "wsl:last-used", "Value": stale}, {"Key": "wsl:ttl-hours", "Value": "8"}]},
+        {"ResourceArn": EP_ARN},
+    )
+    sm.stubber.add_response("describe_endpoint", _endpoint(), {"EndpointName": "wsl-elo-endpoint"})
+    sm.stubber.add_response(
+        "describe_endpoint_config",
+        {"EndpointConfigName": "cfg-1", "EndpointConfigArn": CFG_ARN, "ProductionVariants": [{"VariantName": "AllTraffic", "ModelName": "model-1"}], "CreationTime": "2026-01-01T00:00:00Z"},
+        {"EndpointConfigName": "cfg-1"},
+    )
+    sm.stubber.add_response("delete_endpoint", {}, {"EndpointName": "wsl-elo-endpoint"})
+    sm.stubber.add_response("delete_endpoint_config", {}, {"EndpointConfigName": "cfg-1"})
+    sm.stubber.add_response("delete_model", {}, {"ModelName": "model-1"})
+    sm.stubber.add_response("list_endpoint_configs", {"EndpointConfigs": []}, {"NameContains": "wsl-elo-endpoint-cfg-", "CreationTimeBefore": ANY})
+    assert EndpointLifecycle(sm, clock=clock).sweep(default_ttl_hours=192) == ["wsl-elo-endpoint"]
+
+def test_deploy_reuses_endpoint_serving_same_artifact_under_new_package(monkeypatch, sm):
+    monkeypatch.setattr(deploy_endpoint, "sm", sm)
+    _stub_serving(sm, PKG.replace("/3", "/2"))
+    artifact = "s3://models/train-job/output/model.tar.gz"
+    sm.stubber.add_response(
+        "describe_model_package",
+        {"ModelPackageName": "wsl-elo-models", "ModelPackageArn": PKG.replace("/3", "/2"), "CreationTime": "2026-01-01T00:00:00Z", "ModelPackageStatus": "Completed", "ModelPackageStatusDetails": {"ValidationStatuses": []}, "InferenceSpecification": {"Containers": [{"Image": "img", "ModelDataUrl": artifact}], "SupportedContentTypes": ["text/csv"], "SupportedResponseMIMETypes": ["text/csv"]}},
+        {"ModelPackageName": PKG.replace("/3", "/2")},
+    )
+    out = deploy_endpoint.handler({"model_package_arn": PKG, "model_data_url": artifact, "lifecycle": "persistent"}, None)
+    assert out["reused"] is True
+
+def _config(name, model):
+    return {"EndpointConfigName": name, "EndpointConfigArn": CFG_ARN, "ProductionVariants": [{"VariantName": "AllTraffic", "ModelName": model}], "CreationTime": "2026-01-02T00:00:00Z"}
+
+def test_prune_deletes_superseded_configs_and_models(sm):
+    current = "wsl-elo-endpoint-cfg-2"
+    sm.stubber.add_response("describe_endpoint", _endpoint(cfg=current), {"EndpointName": "wsl-elo-endpoint"})
+    sm.stubber.add_response("describe_endpoint_config", _config(current, "model-2"), {"EndpointConfigName": current})
+    listed = [{"EndpointConfigName": n, "EndpointConfigArn": CFG_ARN, "CreationTime": "2026-01-01T00:00:00Z"} for n in ("wsl-elo-endpoint-cfg-1", "other-wsl-elo-endpoint-cfg-1")]
+    sm.stubber.add_response("list_endpoint_configs", {"EndpointConfigs": listed}, {"NameContains": "wsl-elo-endpoint-cfg-", "CreationTimeBefore": ANY})
+    sm.stubber.add_response("describe_endpoint_config", _config("wsl-elo-endpoint-cfg-1", "model-1"), {"EndpointConfigName": "wsl-elo-endpoint-cfg-1"})
+    sm.stubber.add_response("delete_endpoint_config", {}, {"EndpointConfigName": "wsl-elo-endpoint-cfg-1"})
+    sm.stubber.add_client_error("delete_model", "ValidationException", "Could not find model model-1.")
+    assert EndpointLifecycle(sm).prune_superseded("wsl-elo-endpoint") == ["wsl-elo-endpoint-cfg-1"]
+
+def test_prune_waits_for_in_service(sm):
+    sm.stubber.add_response("describe_endpoint", _endpoint(status="Updating"), {"EndpointName": "wsl-elo-endpoint"})
+    assert EndpointLifecycle(sm).prune_superseded("wsl-elo-endpoint") == []
+
+def test_rating_updates_pass_only_the_secret_arn(monkeypatch):
+    monkeypatch.setenv("RATINGS_UPDATE_SECRET_ARN", "arn:aws:secretsmanager:eu-west-2:123:secret:ratings")
+    env = deploy_endpoint._container_env()
+    assert env["WSL_RATINGS_UPDATE_SECRET_ARN"] == "arn:aws:secretsmanager:eu-west-2:123:secret:ratings"
+    assert env["SAGEMAKER_MODEL_SERVER_WORKERS"] == "1"
+    assert not any(k.endswith("UPDATE_SECRET") for k in env)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import inference
+from goals import GoalsModel, outcome_probs, poisson_nll, scoreline_matrix
+from pipeline.steps.evaluate import evaluate_model
+
+def test_scoreline_matrix_is_normalised_per_fixture():
+    m = scoreline_matrix(np.array([1.5, 0.8, 2.4]), np.array([1.1, 1.9, 0.3]), rho=-0.1, max_goals=8)
+    assert m.shape == (3, 8, 8)
+    assert m.sum(axis=(1, 2)) == pytest.approx(np.ones(3))
+    p_home, p_draw, p_away = outcome_probs(m)
+    assert p_home + p_draw + p_away == pytest.approx(np.ones(3))
+    assert p_home[2] > p_away[2]
+
+def test_gradient_matches_finite_differences():
+    rng = np.random.default_rng(0)
+    h, a = rng.integers(0, 4, 30), rng.integers(0, 4, 30)
+    y_h, y_a = rng.poisson(1.4, 30).astype(float), rng.poisson(1.1, 30).astype(float)
+    params = rng.normal(0, 0.2, 10)
+    _, grad = poisson_nll(params, h, a, y_h, y_a, 4)
+    eps = 1e-6
+    numeric = [(poisson_nll(params + eps * e, h, a, y_h, y_a, 4)[0] - poisson_nll(params - eps * e, h, a, y_h, y_a, 4)[0]) / (2 * eps) for e in np.eye(10)]
+    assert grad == pytest.approx(numeric, abs=1e-6)
+
+def test_fit_ranks_the_stronger_team_and_plugs_into_evaluate(sample_match_data):
+    df = sample_match_data.rename(columns={"Home_Team_xG.1": "Away_Team_xG"})
+    df = pd.concat([df, pd.DataFrame({"Date": df["Date"], "Home": "Arsenal", "Away": "Spurs", "Home_Team_Score": 3, "Away_Team_Score": 0, "Home_Team_xG": 2.5, "Away_Team_xG": 0.4})], ignore_index=True)
+    model = GoalsModel(xg_weight=0.5).fit(df)
+
+    pred = model.predict("Arsenal", "Spurs")
+    assert pred["p_home_win"] > 0.5
+    assert pred["exp_home_goals"] > pred["exp_away_goals"]
+    assert set(evaluate_model(model, df)) == {"test_brier", "test_log_loss", "accuracy"}
+
+def test_inference_batches_goals_model(sample_match_data):
+    model = GoalsModel().fit(sample_match_data)
+    body = "gameweek,date,home,away\nGW01,2026-09-18,Chelsea,Arsenal\nGW01,2026-09-19,Liverpool,Tottenham\n"
+    preds = inference.predict_fn(inference.input_fn(body, "text/csv"), model)
+    assert preds[0] is None
+    assert preds[1] == pytest.approx(model.predict("Chelsea", "Arsenal"))
+    out, _ = inference.output_fn(preds, "text/csv")
+    assert len(out.splitlines()) == 3
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+import inference
+from leagues import LeagueModels, load_partitioned, split_by_league
+from pipeline.steps.evaluate import evaluate_leagues
+from pipeline.steps.preprocess import preprocess_pipeline
+from pipeline.steps.train import train_leagues
+from pipeline.synthetic import generate_league
+
+@pytest.fixture
+def two_leagues():
+    wsl = generate_league(400, 6, seed=1).assign(League="WSL")
+    nwsl = generate_league(300, 8, seed=2).assign(League="NWSL")
+    nwsl[["Home", "Away"]] = "N" + nwsl[["Home", "Away"]]
+    return pd.concat([wsl, nwsl], ignore_index=True).sort_values("Date", kind="stable")
+
+def test_train_and_evaluate_each_league_in_one_job(two_leagues):
+    train, val, test = preprocess_pipeline(two_leagues)
+    assert set(val["League"]) == {"WSL", "NWSL"}
+
+    model, metrics = train_leagues("elo", split_by_league(train), split_by_league(val), workers=2)
+    assert sorted(model.models) == ["NWSL", "WSL"]
+    assert set(metrics["leagues"]) == {"NWSL", "WSL"}
+
+    evaluation = evaluate_leagues(model, split_by_league(test), workers=2)
+    assert set(evaluation["leagues"]) == {"NWSL", "WSL"}
+    assert metrics["val_brier"] == metrics["val_brier"]  # not NaN
+    lo, hi = sorted(e["test_brier"] for e in evaluation["leagues"].values())
+    assert lo <= evaluation["test_brier"] <= hi
+
+def test_channel_partitions_per_league(tmp_path, two_leagues):
+    for lg, g in two_leagues.groupby("League"):
+        (tmp_path / lg).mkdir()
+        g.drop(columns="League").to_csv(tmp_path / lg / "train.csv", index=False)
+    parts = load_partitioned(tmp_path)
+    assert {k: len(v) for k, v in parts.items()} == {"NWSL": 300, "WSL": 400}
+
+def test_serving_picks_league_per_request(sample_match_data):
+    from elo import EloModel
+
+    model = LeagueModels(models={"WSL": EloModel(ratings={"Chelsea": 1700.0}), "NWSL": EloModel(ratings={"Chelsea": 1300.0})})
+    body = "GW01,2026-09-18,Chelsea,Arsenal,WSL\nGW01,2026-09-18,Chelsea,Arsenal,NWSL\n"
+    wsl, nwsl = inference.predict_fn(inference.input_fn(body, "text/csv"), model)
+    assert wsl["r_home"] == 1700.0 and nwsl["r_home"] == 1300.0
+    with pytest.raises(ValueError, match="Unknown league"):
+        inference.predict_fn({"home_team": "Chelsea", "away_team": "Arsenal"}, model)
@@ -0,0 +1,99 @@
+import json
+import pickle
+import threading
+
+import pytest
+
+import inference
+from elo import EloModel
+from live_ratings import RESULTS_CONTENT_TYPE, LiveModel, SnapshotStore, sign_results
+
+SECRET = "s3cret"
+
+def _body(results, secret=SECRET, **extra):
+    return json.dumps({"results": results, "signature": sign_results(results, secret), **extra})
+
+def _result(home="Chelsea", away="Arsenal", hs=2, as_=0, date="2025-03-01"):
+    return {"home_team": home, "away_team": away, "home_score": hs, "away_score": as_, "date": date}
+
+@pytest.fixture
+def live(monkeypatch, tmp_path):
+    monkeypatch.setenv("WSL_RATINGS_UPDATE_SECRET_ARN", "arn:aws:secretsmanager:eu-west-2:123:secret:ratings")
+    monkeypatch.setattr(inference, "_secret_value", lambda arn: SECRET)
+    monkeypatch.setattr(inference, "_update_secret", None)
+    monkeypatch.setenv("WSL_RATINGS_SNAPSHOT_URI", str(tmp_path / "snapshots"))
+    monkeypatch.setenv("WSL_RATINGS_PERSIST_EVERY_S", "3600")
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "model.pkl").write_bytes(pickle.dumps(EloModel(ratings={"Chelsea": 1600.0, "Arsenal": 1500.0})))
+    return model_dir
+
+def test_signed_results_publish_new_snapshot(live):
+    model = inference.model_fn(str(live))
+    before = model.snapshot
+    out = inference.predict_fn(inference.input_fn(_body([_result()]), RESULTS_CONTENT_TYPE), model)
+
+    assert out == {"version": 1, "applied": 1, "skipped": 0, "persisted": False}
+    expected = EloModel(ratings={"Chelsea": 1600.0, "Arsenal": 1500.0})
+    expected.update_ratings("Chelsea", "Arsenal", 2, 0, "2025-03-01")
+    pred = inference.predict_fn({"home_team": "Chelsea", "away_team": "Arsenal"}, model)
+    assert pred["r_home"] == pytest.approx(expected.get_rating("Chelsea"))
+    # The previous snapshot is untouched.
+    assert before.model.ratings["Chelsea"] == 1600.0
+
+    again = inference.predict_fn(inference.input_fn(_body([_result()]), RESULTS_CONTENT_TYPE), model)
+    assert (again["version"], again["applied"], again["skipped"]) == (1, 0, 1)
+
+def test_updates_require_valid_signature(live, monkeypatch):
+    inference.model_fn(str(live))
+    with pytest.raises(PermissionError):
+        inference.input_fn(_body([_result()], secret="wrong"), RESULTS_CONTENT_TYPE)
+    # Without a secret the plain model is served and cannot be updated.
+    monkeypatch.delenv("WSL_RATINGS_UPDATE_SECRET_ARN")
+    model = inference.model_fn(str(live))
+    assert not isinstance(model, LiveModel)
+    with pytest.raises(PermissionError):
+        inference.input_fn(_body([_result()]), RESULTS_CONTENT_TYPE)
+
+def test_update_summary_renders_as_csv(live):
+    model = inference.model_fn(str(live))
+    out = inference.predict_fn(inference.input_fn(_body([_result()]), RESULTS_CONTENT_TYPE), model)
+    body, accept = inference.output_fn(out, "text/csv")
+    assert (body, accept) == ("version,applied,skipped,persisted\n1,1,0,False\n", "text/csv")
+
+def test_persisted_snapshot_survives_restart(live, tmp_path):
+    model = inference.model_fn(str(live))
+    out = inference.predict_fn(inference.input_fn(_body([_result()], persist=True), RESULTS_CONTENT_TYPE), model)
+    assert out["persisted"] is True
+    assert len(list((tmp_path / "snapshots").glob("*/v00000001.pkl"))) == 1
+
+    restarted = inference.model_fn(str(live))
+    assert restarted.snapshot.version == 1
+    assert restarted.model.ratings == model.model.ratings
+
+def test_store_is_keyed_by_artifact(tmp_path):
+    snap = LiveModel(EloModel(), SnapshotStore(str(tmp_path), "aaaa")).snapshot
+    assert SnapshotStore(str(tmp_path), "aaaa").load_latest() is None
+    SnapshotStore(str(tmp_path), "aaaa").save(snap)
+    assert SnapshotStore(str(tmp_path), "bbbb").load_latest() is None
+
+def test_concurrent_predictions_see_whole_snapshots(live):
+    model = inference.model_fn(str(live))
+    batch = [{"home_team": "Chelsea", "away_team": "Arsenal"}] * 200
+    mixed = []
+
+    def predict():
+        for _ in range(50):
+            preds = inference.predict_fn(batch, model)
+            if len({p["r_home"] for p in preds}) != 1:
+                mixed.append(preds)
+
+    readers = [threading.Thread(target=predict) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for day in range(1, 29):
+        model.apply(inference.input_fn(_body([_result(date=f"2025-02-{day:02d}")]), RESULTS_CONTENT_TYPE))
+    for t in readers:
+        t.join()
+    assert not mixed
+    assert model.snapshot.version == 28
@@ -0,0 +1,40 @@
+import json
+
+from pipeline.local_runner import LocalStep, main, run_dag
+
+def test_independent_steps_run_concurrently(tmp_path):
+    sleep = ["python", "-c", "import time; time.sleep(0.5)"]
+    steps = [
+        LocalStep(name="A", cmd=sleep),
+        LocalStep(name="B", cmd=sleep, depends_on=["A"]),
+        LocalStep(name="C", cmd=sleep, depends_on=["A"]),
+    ]
+    results = {r["step"]: r for r in run_dag(steps, tmp_path)}
+    assert all(r["returncode"] == 0 for r in results.values())
+    assert abs(results["B"]["finished_at_s"] - results["C"]["finished_at_s"]) < 0.4
+
+def test_failure_skips_downstream_steps(tmp_path):
+    steps = [
+        LocalStep(name="A", cmd=["python", "-c", "raise SystemExit(3)"]),
+        LocalStep(name="B", cmd=["python", "-c", "pass"], depends_on=["A"]),
+    ]
+    a, b = run_dag(steps, tmp_path)
+    assert a["returncode"] == 3
+    assert b["skipped"] is True
+
+def test_full_dag_on_sample_data(tmp_path, sample_match_data):
+    data = tmp_path / "wsldata.csv"
+    sample_match_data.to_csv(data, index=False)
+    fixtures = tmp_path / "fixtures.csv"
+    fixtures.write_text("gameweek,date,home,away\nGW05,2026-09-18,Chelsea,Arsenal\n")
+    run_dir = tmp_path / "run"
+
+    assert main(["--data", str(data), "--fixtures", str(fixtures), "--gameweek", "GW05", "--run-dir", str(run_dir)]) == 0
+
+    report = json.loads((run_dir / "run_report.json").read_text())
+    assert [s["step"] for s in report["steps"]] == ["Preprocess", "Train", "Evaluate", "Register", "Predict"]
+    assert all(s["peak_rss_mb"] > 0 for s in report["steps"])
+    assert (run_dir / "registry" / "1" / "evaluation.json").exists()
+    for profile in ["preprocess/processing/profile", "train/model", "evaluate/processing/evaluation"]:
+        assert "load" in json.loads((run_dir / profile / "profile.json").read_text())["phases"]
+    assert (run_dir / "predictions" / "GW05" / "wsl_predictions.csv").read_text().count("\n") == 2
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from merge_sources import match_keys, merge_sources, merge_summary, normalize_team, parse_column_precedence
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=["Date", "Home", "Away", "Home_Team_Score", "Away_Team_Score", "Home_Team_xG"])
+
+@pytest.fixture
+def sources():
+    fbref = _frame([
+        ("2024-09-21", "Chelsea", "Arsenal", 2, 1, 1.8),
+        ("2024-09-22", "Man City", "Spurs", 3, 0, np.nan),
+        ("2024-09-29", "Arsenal", "Spurs", 1, 1, 0.9),
+    ])
+    scrape = _frame([
+        ("2024-09-21 12:30", "Chelsea FC Women", "Arsenal Women", 2, 1, 1.6),
+        ("2024-09-22", "Manchester City", "Tottenham Hotspur Women", 3, 1, 2.4),
+        ("2024-09-22", "Manchester City", "Tottenham Hotspur Women", 3, 1, 2.4),
+        ("2024-10-05", "Everton", "Chelsea", 0, 2, 0.4),
+    ])
+    return {"fbref": fbref, "scrape": scrape}
+
+ALIASES = {"Manchester City": "Man City", "Tottenham Hotspur": "Spurs"}
+
+def test_normalized_keys_match_across_spellings():
+    assert normalize_team("Chelsea FC Women", womens_only=True) == normalize_team(" chelsea ") == "chelsea"
+    assert normalize_team("Brighton & Hove Albion W.F.C.", womens_only=True) == "brighton hove albion"
+    df = pd.DataFrame({"Date": ["2024-09-22", "2024-09-22 19:00", "2024-09-23"], "Home": ["Man City", "Manchester City Women", "Man City"], "Away": ["Spurs"] * 3})
+    codes = match_keys(df, ALIASES | {"Spurs": "Spurs"}, womens_only=True)
+    assert codes[0] == codes[1] != codes[2]
+
+def test_gender_suffixes_only_dropped_for_womens_sources():
+    assert normalize_team("Chelsea FC") == "chelsea"
+    assert normalize_team("Chelsea FC Women") != normalize_team("Chelsea")
+    df = pd.DataFrame({"Date": ["2024-09-22"] * 2, "Home": ["Chelsea", "Chelsea Women"], "Away": ["Arsenal", "Arsenal Women"]})
+    codes = match_keys(df)
+    assert codes[0] != codes[1]
+
+def test_league_is_part_of_the_match_key():
+    rows = [("2024-09-22", "Rangers", "Celtic", 1, 0, 0.9)]
+    a = _frame(rows).assign(League="SWPL")
+    b = _frame(rows).assign(League="U21")
+    merged, _ = merge_sources({"a": a, "b": b})
+    assert sorted(merged["League"]) == ["SWPL", "U21"]
+    with pytest.raises(ValueError, match="League"):
+        merge_sources({"a": a, "b": _frame(rows)})
+
+def test_precedence_and_gap_filling(sources):
+    merged, conflicts = merge_sources(sources, precedence=["fbref"], column_precedence={"Home_Team_xG": ["scrape", "fbref"]}, aliases=ALIASES, womens_only=True)
+
+    assert len(merged) == 4
+    m = merged.set_index(["Home", "Away"])
+    # fbref wins the scores and its spellings become the canonical team names.
+    assert m.loc[("Man City", "Spurs"), "Away_Team_Score"] == 0
+    # xG prefers the scrape; fbref's value is used where the scrape has none.
+    assert m.loc[("Chelsea", "Arsenal"), "Home_Team_xG"] == 1.6
+    assert m.loc[("Arsenal", "Spurs"), "Home_Team_xG"] == 0.9
+    assert ("Everton", "Chelsea") in m.index
+
+    assert conflicts["match_id"].nunique() == 1
+    assert set(conflicts["source"]) == {"fbref", "scrape"}
+    assert conflicts.set_index("source").loc["fbref", "chosen"].all()
+    assert merge_summary(sources, merged, conflicts)["duplicates_dropped"] == 3
+
+def test_rows_without_a_key_pass_through_for_validation(sources):
+    sources["scrape"].loc[3, "Date"] = None
+    merged, _ = merge_sources(sources, aliases=ALIASES, womens_only=True)
+    assert merged["Date"].isna().sum() == 1
+
+def test_parse_column_precedence():
+    assert parse_column_precedence(["Home_Team_xG=a, b"]) == {"Home_Team_xG": ["a", "b"]}
+    with pytest.raises(ValueError):
+        parse_column_precedence(["Home_Team_xG"])
+
+def test_merged_dates_are_parsed_once_with_explicit_day_order():
+    rows = [("03/10/2024", "Chelsea", "Arsenal", 2, 1, 1.8), ("2024-10-03 19:00", "Chelsea", "Arsenal", 2, 1, 1.6), ("13/10/2024", "Arsenal", "Spurs", 1, 0, 0.7)]
+    merged, _ = merge_sources({"a": _frame(rows[:1] + rows[2:]), "b": _frame(rows[1:2])}, dayfirst=True)
+    assert len(merged) == 2
+    assert merged["Date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-10-03", "2024-10-13"]
+    # Month-first reads 03/10 as 10 March, a different match day.
+    merged, _ = merge_sources({"a": _frame(rows[:1]), "b": _frame(rows[1:2])})
+    assert sorted(merged["Date"].dt.strftime("%Y-%m-%d")) == ["2024-03-10", "2024-10-03"]
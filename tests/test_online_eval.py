@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+import metrics
+import online_eval
+from metrics import MemorySink
+from online_eval import MetricAccumulator
+
+PREDS = b"gameweek,date,home,away,p_home_win,p_draw,p_away_win,r_home,r_away\nGW01,2026-09-18,Chelsea,Arsenal,0.6,0.25,0.15,1550,1450\nGW01,2026-09-19,Liverpool,Tottenham,0.3,0.3,0.4,1480,1520\n"
+
+@pytest.fixture
+def eval_env(monkeypatch, fake_s3):
+    monkeypatch.setenv("PRED_BUCKET", "preds")
+    monkeypatch.setattr(online_eval, "s3", fake_s3)
+    sink = MemorySink()
+    monkeypatch.setattr(metrics, "DEFAULT_SINK", sink)
+    fake_s3.put_object(Bucket="preds", Key="predictions/GW01/wsl_predictions.csv", Body=PREDS)
+    return fake_s3, sink
+
+def _results(fake_s3, body, key="results/GW01/results.csv"):
+    fake_s3.put_object(Bucket="raw", Key=key, Body=body)
+    return {"detail": {"bucket": {"name": "raw"}, "object": {"key": key}}}
+
+def test_accumulators_merge_to_the_same_metrics_as_one_pass():
+    games = [([0.6, 0.25, 0.15], 0), ([0.3, 0.3, 0.4], 1), ([0.2, 0.3, 0.5], 2)]
+    whole, a, b = MetricAccumulator(), MetricAccumulator(), MetricAccumulator()
+    for i, (p, o) in enumerate(games):
+        whole.add(p, o)
+        (a if i < 2 else b).add(p, o)
+    merged = MetricAccumulator.from_dict(json.loads(json.dumps(a.merge(b).to_dict())))
+    assert merged.summary() == pytest.approx(whole.summary())
+    assert whole.summary()["accuracy"] == pytest.approx(2 / 3)
+
+def test_new_results_update_running_metrics_and_reuploads_replace(eval_env):
+    fake_s3, sink = eval_env
+    out = online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,2,0\n2026-09-19,Liverpool,Tottenham,,\n"), None)
+    assert out["matched"] == 1
+    assert out["running"]["brier"] == pytest.approx(0.4**2 + 0.25**2 + 0.15**2)
+    assert sink.values("OnlineBrier") == [pytest.approx(out["running"]["brier"])]
+
+    # Unchanged file: no work. Corrected/extended file: replaces GW01's contribution.
+    assert online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,2,0\n2026-09-19,Liverpool,Tottenham,,\n"), None)["skipped"]
+    out = online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,2,0\n2026-09-19,Liverpool,Tottenham,1,1\n2026-09-19,Spurs,Villa,0,0\n"), None)
+    assert out["replaced"] and out["matched"] == 2 and out["unmatched"] == 1
+    state = json.loads(fake_s3.objects[("preds", online_eval.STATE_KEY)]["Body"])
+    assert state["running"]["n"] == 2
+
+def test_totals_are_updated_incrementally_and_match_a_full_rebuild(eval_env):
+    fake_s3, _ = eval_env
+    online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,2,0\n"), None)
+    online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,0,1\n2026-09-19,Liverpool,Tottenham,1,1\n"), None)
+    online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-19,Liverpool,Tottenham,0,2\n", "results/GW01/late.csv"), None)
+    state = json.loads(fake_s3.objects[("preds", online_eval.STATE_KEY)]["Body"])
+    # Only the corrected file counts: it replaced the first upload's contribution.
+    whole = MetricAccumulator()
+    for probs, o in [([0.6, 0.25, 0.15], 2), ([0.3, 0.3, 0.4], 1), ([0.3, 0.3, 0.4], 2)]:
+        whole.add(probs, o)
+    assert MetricAccumulator.from_dict(state["total"]).summary() == pytest.approx(whole.summary())
+    assert MetricAccumulator.from_dict(state["gameweeks"]["GW01"]).summary() == pytest.approx(whole.summary())
+    assert state["running"]["n"] == 3
+    # Per-file state is compacted to the gameweek and ETag once folded into the totals.
+    assert all(set(f) == {"gameweek", "results_etag"} for f in state["files"].values())
+
+def test_reupload_rescores_the_gameweeks_other_files(eval_env):
+    fake_s3, _ = eval_env
+    online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,2,0\n"), None)
+    online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-19,Liverpool,Tottenham,1,1\n", "results/GW01/late.csv"), None)
+    out = online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,1,1\n"), None)
+    assert out["replaced"] and out["running"]["n"] == 2
+    assert out["running"]["accuracy"] == pytest.approx(0.0)
+
+def test_legacy_per_file_accumulators_are_folded_and_dropped():
+    part = MetricAccumulator()
+    part.add([0.6, 0.25, 0.15], 0)
+    state = {"files": {"s3://raw/results/GW01/results.csv": {"gameweek": "GW01", "results_etag": "x", "accumulator": part.to_dict()}}}
+    total, gameweeks = online_eval._totals(state)
+    assert total.n == 1 and gameweeks["GW01"].n == 1
+    assert state["files"]["s3://raw/results/GW01/results.csv"] == {"gameweek": "GW01", "results_etag": "x"}
+
+def test_results_match_predictions_on_date_and_league(eval_env):
+    fake_s3, _ = eval_env
+    fake_s3.put_object(Bucket="preds", Key="predictions/GW01/wsl_predictions.csv", Body=(
+        b"gameweek,date,home,away,p_home_win,p_draw,p_away_win,r_home,r_away,league\n"
+        b"GW01,2026-09-18,Chelsea,Arsenal,0.6,0.25,0.15,1550,1450,WSL\n"
+        b"GW01,2026-09-18,Chelsea,Arsenal,0.2,0.3,0.5,1450,1550,WSL2\n"
+    ))
+    out = online_eval.handler(_results(fake_s3, (
+        b"date,home,away,home_score,away_score,league\n"
+        b"2026-09-18,Chelsea,Arsenal,0,1,WSL2\n"
+        b"2026-09-25,Chelsea,Arsenal,2,0,WSL\n"
+    )), None)
+    assert out["matched"] == 1 and out["unmatched"] == 1
+    assert out["running"]["accuracy"] == pytest.approx(1.0)
+
+def test_parquet_predictions_are_read_from_the_archive(eval_env):
+    pytest.importorskip("pyarrow")
+    import archive
+
+    fake_s3, _ = eval_env
+    del fake_s3.objects[("preds", "predictions/GW01/wsl_predictions.csv")]
+    with archive.ParquetArchiveWriter(fake_s3, "preds", "GW01") as w:
+        w.writerow({"gameweek": "GW01", "date": "2026-09-18", "home": "Chelsea", "away": "Arsenal", "p_home_win": 0.6, "p_draw": 0.25, "p_away_win": 0.15, "r_home": 1550.0, "r_away": 1450.0})
+    out = online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,2,0\n"), None)
+    assert out["matched"] == 1
+
+def test_missing_predictions_fail_clearly(eval_env):
+    fake_s3, _ = eval_env
+    del fake_s3.objects[("preds", "predictions/GW01/wsl_predictions.csv")]
+    with pytest.raises(FileNotFoundError, match="GW01"):
+        online_eval.handler(_results(fake_s3, b"date,home,away,home_score,away_score\n2026-09-18,Chelsea,Arsenal,2,0\n"), None)
@@ -0,0 +1,261 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import metrics
+import predict_weekly
+import s3_stream
+from metrics import MemorySink
+from s3_stream import MultipartCsvWriter
+
+FIXTURES_CSV = b"gameweek,date,home,away\nGW01,2026-09-18,Chelsea,Arsenal\nGW01,2026-09-19,Liverpool,Tottenham\n"
+
+class FakeRuntime:
+    def __init__(self):
+        self.calls = 0
+        self.scored = 0
+
+    def invoke_endpoint(self, EndpointName, ContentType, Accept, Body):
+        self.calls += 1
+        reqs = json.loads(Body)
+        self.scored += len(reqs)
+        preds = [{"p_home_win": 0.5, "p_draw": 0.25, "p_away_win": 0.25, "r_home": 1510.0, "r_away": 1490.0} for _ in reqs]
+        return {"Body": io.BytesIO(json.dumps(preds).encode("utf-8")), "ResponseMetadata": {"RetryAttempts": 1}}
+
+class FakeSageMaker:
+    def __init__(self):
+        self.deleted = []
+
+    def describe_endpoint(self, EndpointName):
+        return {"EndpointName": EndpointName, "EndpointStatus": "InService", "EndpointConfigName": "cfg"}
+
+    def delete_endpoint(self, EndpointName):
+        self.deleted.append(EndpointName)
+
+    def describe_model_package(self, ModelPackageName):
+        # Packages "arn:pkg/<n>" and "arn:pkg/<n>b" are re-registrations of artifact <n>.
+        return {"InferenceSpecification": {"Containers": [{"ModelDataUrl": f"s3://raw/models/{ModelPackageName.split('/')[-1].rstrip('b')}.tar.gz"}]}}
+
+@pytest.fixture
+def lambda_env(monkeypatch, fake_s3):
+    monkeypatch.setenv("PRED_BUCKET", "preds")
+    fake_s3.put_object(Bucket="raw", Key="fixtures/upcoming.csv", Body=FIXTURES_CSV)
+    for n in ("1", "2"):
+        fake_s3.put_object(Bucket="raw", Key=f"models/{n}.tar.gz", Body=f"model {n}".encode("utf-8"))
+    monkeypatch.setattr(predict_weekly, "s3", fake_s3)
+    monkeypatch.setattr(predict_weekly, "rt", FakeRuntime())
+    monkeypatch.setattr(metrics, "DEFAULT_SINK", MemorySink())
+    monkeypatch.setattr(predict_weekly, "sm", FakeSageMaker())
+    return fake_s3
+
+def _event(**kwargs):
+    return {"endpoint_name": "ep", "fixtures_s3_uri": "s3://raw/fixtures/upcoming.csv", "gameweek": "GW01", "lifecycle": "persistent", **kwargs}
+
+def test_handler_streams_small_output_with_single_put(lambda_env):
+    out = predict_weekly.handler(_event(), None)
+    assert out["rows"] == 2
+    assert "create_multipart_upload" not in lambda_env.calls
+    body = lambda_env.objects[("preds", "predictions/GW01/wsl_predictions.csv")]["Body"].decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert [r["home"] for r in rows] == ["Chelsea", "Liverpool"]
+    assert list(rows[0].keys()) == predict_weekly.OUTPUT_FIELDS
+
+def test_handler_gzip_output(lambda_env):
+    out = predict_weekly.handler(_event(compression="gzip"), None)
+    assert out["output_s3_uri"].endswith(".csv.gz")
+    obj = lambda_env.objects[("preds", "predictions/GW01/wsl_predictions.csv.gz")]
+    assert obj["ContentEncoding"] == "gzip"
+    assert gzip.decompress(obj["Body"]).decode("utf-8").count("\n") == 3
+
+def test_writer_uploads_multiple_parts(monkeypatch, fake_s3):
+    monkeypatch.setattr(s3_stream, "MIN_PART_SIZE", 1)
+    with MultipartCsvWriter(fake_s3, "preds", "out.csv", ["a", "b"], part_size=64) as w:
+        for i in range(100):
+            w.writerow({"a": i, "b": "x" * 10})
+    assert fake_s3.calls.count("upload_part") > 1
+    body = fake_s3.objects[("preds", "out.csv")]["Body"].decode("utf-8")
+    assert len(list(csv.DictReader(io.StringIO(body)))) == 100
+
+def test_writer_aborts_on_error(monkeypatch, fake_s3):
+    monkeypatch.setattr(s3_stream, "MIN_PART_SIZE", 1)
+    with pytest.raises(RuntimeError):
+        with MultipartCsvWriter(fake_s3, "preds", "out.csv", ["a"], part_size=8) as w:
+            for i in range(10):
+                w.writerow({"a": i})
+            raise RuntimeError("boom")
+    assert "abort_multipart_upload" in fake_s3.calls
+    assert ("preds", "out.csv") not in fake_s3.objects
+
+def test_writer_aborts_when_completion_fails(monkeypatch, fake_s3):
+    monkeypatch.setattr(s3_stream, "MIN_PART_SIZE", 1)
+
+    def fail(**kwargs):
+        raise RuntimeError("complete failed")
+
+    monkeypatch.setattr(fake_s3, "complete_multipart_upload", fail)
+    with pytest.raises(RuntimeError, match="complete failed"):
+        with MultipartCsvWriter(fake_s3, "preds", "out.csv", ["a"], part_size=8) as w:
+            for i in range(10):
+                w.writerow({"a": i})
+    assert "abort_multipart_upload" in fake_s3.calls
+    assert not fake_s3.uploads
+
+class FakeModelRegistry(FakeSageMaker):
+    def __init__(self):
+        super().__init__()
+        self.describe_calls = 0
+
+    def describe_model_package(self, ModelPackageName):
+        self.describe_calls += 1
+        return {"InferenceSpecification": {"Containers": [{"ModelDataUrl": "s3://raw/models/model.tar.gz"}]}}
+
+@pytest.fixture
+def local_model(monkeypatch, tmp_path, lambda_env):
+    import pickle
+    import tarfile
+
+    from elo import EloModel
+
+    model = EloModel(ratings={"Chelsea": 1600.0, "Arsenal": 1450.0})
+    (tmp_path / "model.pkl").write_bytes(pickle.dumps(model))
+    with tarfile.open(tmp_path / "model.tar.gz", "w:gz") as tf:
+        tf.add(tmp_path / "model.pkl", arcname="model.pkl")
+    lambda_env.put_object(Bucket="raw", Key="models/model.tar.gz", Body=(tmp_path / "model.tar.gz").read_bytes())
+
+    registry = FakeModelRegistry()
+    monkeypatch.setattr(predict_weekly, "sm", registry)
+    monkeypatch.setattr(predict_weekly, "MODEL_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(predict_weekly, "_MODEL_DATA_URLS", {})
+    monkeypatch.setattr(predict_weekly, "_MODEL_CACHE", {})
+    return model
+
+def test_local_mode_scores_in_process_and_caches_model(lambda_env, local_model):
+    event = {"mode": "local", "model_package_arn": "arn:pkg/1", "fixtures_s3_uri": "s3://raw/fixtures/upcoming.csv", "gameweek": "GW01"}
+    predict_weekly.handler(event, None)
+    predict_weekly.handler(event, None)
+
+    assert predict_weekly.rt.scored == 0
+    assert predict_weekly.sm.deleted == []
+    assert predict_weekly.sm.describe_calls == 1
+    assert lambda_env.calls.count("download_file") == 1
+
+    body = lambda_env.objects[("preds", "predictions/GW01/wsl_predictions.csv")]["Body"].decode("utf-8")
+    row = next(csv.DictReader(io.StringIO(body)))
+    expected = local_model.predict("Chelsea", "Arsenal")
+    assert float(row["p_home_win"]) == pytest.approx(expected["p_home_win"])
+    assert float(row["r_home"]) == 1600.0
+
+def test_local_mode_rejects_goals_models(lambda_env, local_model):
+    event = {"mode": "local", "model_type": "goals", "model_package_arn": "arn:pkg/1", "fixtures_s3_uri": "s3://raw/fixtures/upcoming.csv", "gameweek": "GW01"}
+    with pytest.raises(ValueError, match="Elo models only"):
+        predict_weekly.handler(event, None)
+    assert "download_file" not in lambda_env.calls
+
+def test_rerun_with_same_model_and_fixtures_skips_scoring(lambda_env):
+    event = _event(model_package_arn="arn:pkg/1")
+    first = predict_weekly.handler(event, None)
+    second = predict_weekly.handler(event, None)
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert predict_weekly.rt.scored == 2
+
+def test_live_rating_updates_bypass_the_cache(lambda_env, monkeypatch):
+    monkeypatch.setenv("RATINGS_UPDATE_SECRET_ARN", "arn:aws:secretsmanager:eu-west-2:123:secret:ratings")
+    runtime = predict_weekly.rt
+    r_home = [1510.0]
+    invoke = runtime.invoke_endpoint
+
+    def serve(**kw):
+        resp = invoke(**kw)
+        preds = [dict(p, r_home=r_home[0]) for p in json.loads(resp["Body"].read())]
+        return dict(resp, Body=io.BytesIO(json.dumps(preds).encode("utf-8")))
+
+    monkeypatch.setattr(runtime, "invoke_endpoint", serve)
+    predict_weekly.handler(_event(model_package_arn="arn:pkg/1"), None)
+    # A signed results update changes the endpoint's ratings but not the artifact.
+    r_home[0] = 1525.0
+    out = predict_weekly.handler(_event(model_package_arn="arn:pkg/1"), None)
+    assert out["cached"] is False
+    assert runtime.scored == 4
+    body = lambda_env.objects[("preds", "predictions/GW01/wsl_predictions.csv")]["Body"].decode("utf-8")
+    assert {float(r["r_home"]) for r in csv.DictReader(io.StringIO(body))} == {1525.0}
+
+def test_reregistered_package_with_same_artifact_hits_cache(lambda_env):
+    predict_weekly.handler(_event(model_package_arn="arn:pkg/1"), None)
+    second = predict_weekly.handler(_event(model_package_arn="arn:pkg/1b"), None)
+    assert second["cached"] is True
+    assert predict_weekly.rt.scored == 2
+
+def test_reuse_distinguishes_date_and_league(lambda_env):
+    fixtures = b"gameweek,date,home,away,league\nGW01,2026-09-18,Chelsea,Arsenal,WSL\nGW01,2026-09-18,Chelsea,Arsenal,WSL2\n"
+    lambda_env.put_object(Bucket="raw", Key="fixtures/upcoming.csv", Body=fixtures)
+    predict_weekly.handler(_event(model_package_arn="arn:pkg/1"), None)
+    lambda_env.put_object(Bucket="raw", Key="fixtures/upcoming.csv", Body=fixtures + b"GW01,2026-12-01,Chelsea,Arsenal,WSL\n")
+    out = predict_weekly.handler(_event(model_package_arn="arn:pkg/1"), None)
+    # The same pairing later in the season is scored, not copied from the September one.
+    assert out["rows"] == 3
+    assert predict_weekly.rt.scored == 3
+    body = lambda_env.objects[("preds", "predictions/GW01/wsl_predictions.csv")]["Body"].decode("utf-8")
+    assert [r["league"] for r in csv.DictReader(io.StringIO(body))] == ["WSL", "WSL2", "WSL"]
+
+def test_changed_fixtures_reuse_unchanged_predictions(lambda_env):
+    predict_weekly.handler(_event(model_package_arn="arn:pkg/1"), None)
+    lambda_env.put_object(Bucket="raw", Key="fixtures/upcoming.csv", Body=FIXTURES_CSV + b"GW01,2026-09-20,Everton,Brighton\n")
+    out = predict_weekly.handler(_event(model_package_arn="arn:pkg/1"), None)
+    assert out["cached"] is False
+    assert out["rows"] == 3
+    assert predict_weekly.rt.scored == 3
+
+def test_new_model_rescores_everything(lambda_env):
+    predict_weekly.handler(_event(model_package_arn="arn:pkg/1"), None)
+    predict_weekly.handler(_event(model_package_arn="arn:pkg/2"), None)
+    assert predict_weekly.rt.scored == 4
+
+def test_handler_batches_invokes_and_emits_emf(lambda_env):
+    predict_weekly.handler(_event(batch_size=1), None)
+    sink = metrics.DEFAULT_SINK
+    assert predict_weekly.rt.calls == 2
+    assert len(sink.values("InvokeLatency")) == 2
+    assert sink.values("InvokeBatchSize") == [1.0, 1.0]
+    assert sink.values("InvokeRetries") == [1.0, 1.0]
+    assert sink.values("PredictionsGenerated") == [2.0]
+    rec = sink.records[0]
+    assert rec["Function"] == "PredictWeekly"
+    names = {m["Name"] for m in rec["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+    assert {"S3ReadTime", "InvokeTime", "SerializeTime", "S3WriteTime"} <= names
+
+def test_emf_splits_large_distributions():
+    sink = MemorySink()
+    m = metrics.MetricsLogger("Test", sink=sink)
+    for i in range(250):
+        m.put("InvokeLatency", i, "Milliseconds")
+    m.flush()
+    assert len(sink.lines) == 3
+    assert len(sink.values("InvokeLatency")) == 250
+
+def test_date_and_league_are_sent_with_each_request(lambda_env, monkeypatch):
+    bodies = []
+    runtime = FakeRuntime()
+    invoke = runtime.invoke_endpoint
+    monkeypatch.setattr(runtime, "invoke_endpoint", lambda **kw: bodies.append(json.loads(kw["Body"])) or invoke(**kw))
+    monkeypatch.setattr(predict_weekly, "rt", runtime)
+    lambda_env.put_object(Bucket="raw", Key="fixtures/leagues.csv", Body=b"gameweek,date,home,away,league\nGW01,2026-09-18,Chelsea,Arsenal,WSL\n")
+
+    predict_weekly.handler(_event(fixtures_s3_uri="s3://raw/fixtures/leagues.csv"), None)
+    assert bodies == [[{"home_team": "Chelsea", "away_team": "Arsenal", "date": "2026-09-18", "league": "WSL"}]]
+
+def test_parquet_output_is_archived_and_cached(lambda_env):
+    pytest.importorskip("pyarrow")
+    event = _event(model_package_arn="arn:pkg/1", format="parquet")
+    out = predict_weekly.handler(event, None)
+    assert out["output_s3_uri"] == "s3://preds/predictions/archive/season=2026-27/gameweek=GW01/part-0.parquet"
+    assert ("preds", "predictions/GW01/wsl_predictions.csv") not in lambda_env.objects
+    manifest = json.loads(lambda_env.objects[("preds", "predictions/archive/manifest.json")]["Body"])
+    assert manifest["partitions"][0]["rows"] == 2
+
+    again = predict_weekly.handler(event, None)
+    assert again["cached"] is True
+    assert again["output_s3_uri"] == out["output_s3_uri"]
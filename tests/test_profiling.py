@@ -0,0 +1,24 @@
+import json
+
+from profiling import StepProfiler
+
+def test_phases_accumulate_and_report_throughput(tmp_path):
+    prof = StepProfiler("train", top_n=0)
+    for _ in range(2):
+        with prof.phase("replay") as ph:
+            sum(range(10000))
+            ph.add_rows(100)
+
+    report = json.loads(prof.write(tmp_path).read_text())
+    replay = report["phases"]["replay"]
+    assert replay["calls"] == 2
+    assert replay["rows"] == 200
+    assert replay["rows_per_s"] > 0
+    assert report["peak_rss_mb"] > 0
+    assert report["hot_functions"] == []
+
+def test_top_n_lists_hot_functions():
+    prof = StepProfiler("evaluate", top_n=3)
+    with prof.phase("score"):
+        sorted(str(i) for i in range(10000))
+    assert len(prof.report()["hot_functions"]) == 3
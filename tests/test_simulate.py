@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from elo import EloModel
+from simulate import build_spec, run_simulation, summarise
+
+@pytest.fixture
+def season():
+    teams = ["Arsenal", "Chelsea", "Spurs", "Villa"]
+    rows = [{"home": h, "away": a} for h in teams for a in teams if h != a]
+    fx = pd.DataFrame(rows)
+    fx["home_score"] = np.nan
+    fx["away_score"] = np.nan
+    # Chelsea have already won their first two.
+    fx.loc[0, ["home", "away", "home_score", "away_score"]] = ["Chelsea", "Arsenal", 2, 0]
+    fx.loc[1, ["home", "away", "home_score", "away_score"]] = ["Chelsea", "Spurs", 1, 0]
+    return fx.drop_duplicates(["home", "away"])
+
+def test_position_probabilities_are_distributions(season):
+    model = EloModel(ratings={"Chelsea": 1700.0, "Arsenal": 1550.0, "Spurs": 1450.0, "Villa": 1400.0})
+    spec = build_spec(model, season)
+    table = summarise(spec, run_simulation(spec, n_sims=2000, workers=1, seed=1, chunk_size=500))
+
+    pos = table[[f"pos_{k}" for k in range(1, 5)]]
+    assert pos.sum(axis=1).to_numpy() == pytest.approx(np.ones(4))
+    assert pos.sum(axis=0).to_numpy() == pytest.approx(np.ones(4))
+    assert table.iloc[0]["team"] == "Chelsea"
+    assert table.set_index("team").loc["Chelsea", "current_points"] == 6
+
+def test_results_independent_of_worker_count(season):
+    model = EloModel(ratings={"Chelsea": 1600.0})
+    spec = build_spec(model, season, update_ratings=True)
+    one = run_simulation(spec, n_sims=1000, workers=1, seed=7, chunk_size=250)
+    two = run_simulation(spec, n_sims=1000, workers=2, seed=7, chunk_size=250)
+    assert (one["positions"] == two["positions"]).all()
+    assert one["points"] == pytest.approx(two["points"])
+
+def test_remaining_fixtures_are_simulated_in_date_order(season):
+    fx = season.assign(date=pd.date_range("2026-09-01", periods=len(season), freq="D").strftime("%Y-%m-%d")).iloc[::-1]
+    spec = build_spec(EloModel(), fx, update_ratings=True)
+    remaining = fx[fx["home_score"].isna()].sort_values("date")
+    assert [spec.teams[i] for i in spec.home_idx] == remaining["home"].tolist()
+    assert [spec.teams[i] for i in spec.away_idx] == remaining["away"].tolist()
@@ -0,0 +1,47 @@
+import csv
+import json
+import pickle
+
+import pytest
+
+import inference
+from elo import EloModel
+from pipeline.local_transform import run_transform
+
+@pytest.fixture
+def model_dir(tmp_path):
+    d = tmp_path / "model"
+    d.mkdir()
+    (d / "model.pkl").write_bytes(pickle.dumps(EloModel(ratings={"Chelsea": 1600.0, "Arsenal": 1450.0})))
+    return d
+
+def test_csv_batch_keeps_one_output_line_per_input_line(model_dir):
+    model = inference.model_fn(str(model_dir))
+    body = "gameweek,date,home,away\nGW01,2026-09-18,Chelsea,Arsenal\nGW01,2026-09-19,Liverpool,Tottenham\n"
+    out, accept = inference.output_fn(inference.predict_fn(inference.input_fn(body, "text/csv"), model), "text/csv")
+    lines = out.splitlines()
+    assert accept == "text/csv"
+    assert lines[0] == ",".join(inference.PREDICTION_COLUMNS)
+    assert len(lines) == 3
+    assert float(lines[1].split(",")[3]) == 1600.0
+
+def test_jsonlines_round_trip(model_dir):
+    model = inference.model_fn(str(model_dir))
+    body = '{"home_team": "Chelsea", "away_team": "Arsenal"}\n{"home_team": "Arsenal", "away_team": "Chelsea"}\n'
+    out, _ = inference.output_fn(inference.predict_fn(inference.input_fn(body, "application/jsonlines"), model), "application/jsonlines")
+    preds = [json.loads(line) for line in out.splitlines()]
+    assert preds[0]["p_home_win"] > preds[1]["p_home_win"]
+
+def test_local_transform_joins_input_and_output(tmp_path, model_dir):
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for gw in ("GW01", "GW02"):
+        (in_dir / f"{gw}.csv").write_text(f"gameweek,date,home,away\n{gw},2026-09-18,Chelsea,Arsenal\n{gw},2026-09-19,Liverpool,Tottenham\n")
+
+    results = run_transform(in_dir, tmp_path / "out", model_dir, workers=2, batch_lines=2)
+
+    assert sum(r["records"] for r in results) == 6
+    rows = list(csv.DictReader((tmp_path / "out" / "GW02.csv.out").open()))
+    assert list(rows[0].keys()) == inference.FIXTURE_COLUMNS + inference.PREDICTION_COLUMNS
+    assert rows[0]["gameweek"] == "GW02"
+    assert float(rows[0]["r_home"]) == 1600.0